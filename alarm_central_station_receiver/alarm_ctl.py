@@ -18,8 +18,9 @@ import argparse
 from os import geteuid
 import sys
 import json
+import time
 
-from alarm_central_station_receiver.json_ipc import send_client_msg
+from alarm_central_station_receiver.json_ipc import send_client_msg, send_client_stream
 
 
 def check_running_root():
@@ -28,6 +29,39 @@ def check_running_root():
         sys.exit(-1)
 
 
+def print_list(key, entries):
+    sys.stdout.write('%s:%s\n' % (key.replace('_', ' ').title(),
+                                   '' if entries else ' None'))
+    for entry in entries:
+        if key == 'schedule':
+            when = time.localtime(entry['time'])
+            entry = '%s  %-6s (%s)' % (
+                time.strftime('%a %b %d %I:%M %p', when),
+                entry['action'].title(), entry['rule'])
+
+        sys.stdout.write('    %s\n' % entry)
+
+
+def stream(request_msg):
+    """
+    Write the data streamed after the response to `request_msg`, for
+    export and metrics, to stdout
+    """
+    rsp, chunks, serr = send_client_stream(request_msg)
+    if serr:
+        sys.stderr.write('%s\n' % serr)
+        return -1
+
+    if rsp.get('error'):
+        sys.stderr.write('Error: %s\n' % rsp.get('error'))
+        return -1
+
+    for chunk in chunks:
+        sys.stdout.buffer.write(chunk)
+
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog='alarm-ctl', formatter_class=argparse.RawTextHelpFormatter)
@@ -36,13 +70,40 @@ def main():
 The auto-disarm command only disarms, if auto-arm was used to arm.
 This is useful if you want to have a cron job automatically arm/disrm
 the system daily, but want to skip disarming if the system was armed
-on the keypad, or with the regular arm command.
+on the keypad, or with the regular arm command.  The [Schedule] config
+section does the same from within alarmd, without cron.
 """
 
-    parser.add_argument('command', choices=['arm', 'disarm', 'auto-arm', 'auto-disarm', 'status', 'history'],
+    parser.add_argument('command', choices=['arm', 'disarm', 'auto-arm', 'auto-disarm', 'status', 'history', 'export', 'search', 'zones', 'stats', 'timings', 'trace', 'metrics', 'profile', 'reload'],
                         help=help_text)
+    parser.add_argument('action', nargs='?', choices=['start', 'stop', 'dump'],
+                        help='profile: start or stop profiling alarmd, or '
+                             'dump the profile so far.  Profiles and memory '
+                             'snapshots are written to data_file_path')
+    parser.add_argument('--trace-id',
+                        help='trace: the ID of a recent call, or of one of '
+                             'its events, to show the timings, events and '
+                             'notifications of')
     parser.add_argument('--offset', type=int)
     parser.add_argument('--limit', type=int)
+    parser.add_argument('--query',
+                        help='Words and field:value terms to search for, '
+                             'fields are event, zone, user and type')
+    parser.add_argument('--start', type=float,
+                        help='Only search or export events at or after this '
+                             'time, in seconds since the epoch')
+    parser.add_argument('--end', type=float,
+                        help='Only search or export events at or before this '
+                             'time')
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson',
+                        help='export format')
+    parser.add_argument('--granularity', choices=['hourly', 'daily'],
+                        default='daily',
+                        help='stats: hourly or daily event counts')
+    parser.add_argument('--since', type=float,
+                        help='stats: only count buckets from this time on, '
+                             'in seconds since the epoch.  --limit sets how '
+                             'many, newest first')
 
     args = parser.parse_args()
     check_running_root()
@@ -59,6 +120,48 @@ on the keypad, or with the regular arm command.
                    'limit': args.limit
                    }
         request_msg['options'] = options
+    elif args.command == 'search':
+        if not args.query:
+            sys.stderr.write('Error: query required with search command\n')
+            return -1
+
+        options = {'query': args.query,
+                   'start': args.start,
+                   'end': args.end,
+                   'offset': args.offset or 0,
+                   'limit': args.limit or 10
+                   }
+        request_msg['options'] = options
+
+    elif args.command == 'profile':
+        if not args.action:
+            sys.stderr.write('Error: start, stop or dump required with '
+                             'profile command\n')
+            return -1
+
+        request_msg['options'] = {'action': args.action}
+
+    elif args.command == 'stats':
+        request_msg['options'] = {'granularity': args.granularity,
+                                  'since': args.since,
+                                  'limit': args.limit
+                                  }
+
+    elif args.command == 'trace':
+        if not args.trace_id:
+            sys.stderr.write('Error: trace-id required with trace command\n')
+            return -1
+
+        request_msg['options'] = {'trace_id': args.trace_id}
+
+    elif args.command == 'export':
+        request_msg['options'] = {'format': args.format,
+                                  'start': args.start,
+                                  'end': args.end
+                                  }
+        return stream(request_msg)
+    elif args.command == 'metrics':
+        return stream(request_msg)
 
     rsp, serr = send_client_msg(request_msg)
     if serr:
@@ -72,9 +175,14 @@ on the keypad, or with the regular arm command.
 
     if args.command == 'status':
         for key, value in rsp.get('response').items():
-            sys.stdout.write('%s: %s\n' %
-                             (key.replace('_', ' ').title(), str(value).title()))
-    elif args.command == 'history':
+            if isinstance(value, list):
+                print_list(key, value)
+            else:
+                sys.stdout.write('%s: %s\n' %
+                                 (key.replace('_', ' ').title(),
+                                  str(value).title()))
+    elif args.command in ['history', 'search', 'zones', 'stats', 'timings',
+                          'trace', 'profile']:
         sys.stdout.write('%s\n' % json.dumps(rsp.get('response'), indent=4))
     else:
         sys.stdout.write('%s\n' % rsp.get('response'))
@@ -0,0 +1,182 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import time
+
+from datetime import date, datetime, timedelta
+from itertools import islice, takewhile
+
+from alarm_central_station_receiver.singleton import Singleton
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.scheduler import Scheduler
+from alarm_central_station_receiver.system import AlarmSystem
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+DAY_GROUPS = {
+    'daily': list(range(7)),
+    'weekdays': list(range(5)),
+    'weekends': [5, 6],
+}
+
+ACTIONS = ['arm', 'disarm']
+
+# Entries shown by status
+UPCOMING = 5
+
+# Holidays can skip every day for a while, look no further than a year
+SEARCH_DAYS = 366
+
+# The wall clock is checked at least this often, it can be set while
+# alarmd runs, e.g. by NTP after a Raspberry Pi boots
+RECHECK = 15 * 60
+
+# Entries missed by more than this, e.g. due to the clock jumping forward,
+# are skipped rather than run late
+LATE_LIMIT = 5 * 60
+
+
+def parse_days(spec):
+    """
+    Weekday numbers, Monday is 0, of a spec such as 'mon-fri', 'sat,sun',
+    'weekdays' or 'daily'
+    """
+    days = set()
+    for part in spec.lower().split(','):
+        part = part.strip()
+        if part in DAY_GROUPS:
+            days.update(DAY_GROUPS[part])
+        elif '-' in part:
+            first, last = [DAYS.index(day.strip())
+                           for day in part.split('-', 1)]
+            if last < first:
+                last += 7
+
+            days.update(day % 7 for day in range(first, last + 1))
+        else:
+            days.add(DAYS.index(part))
+
+    return days
+
+
+def parse_rule(name, value):
+    """
+    Parse a '<arm|disarm> <days> <HH:MM>' rule
+
+    :raises ValueError: if the rule isn't valid
+    """
+    parts = value.split()
+    if len(parts) != 3 or parts[0].lower() not in ACTIONS:
+        raise ValueError(value)
+
+    at_time = datetime.strptime(parts[2], '%H:%M').time()
+    return at_time, name, parts[0].lower(), parse_days(parts[1])
+
+
+@Singleton
+class ArmSchedule(object):
+    """
+    Arms and disarms the system at the times in the [Schedule] section,
+    as auto-arm and auto-disarm do, except on holidays.  Entries are in
+    local time, the next one is kept on the main loop's scheduler.
+    """
+
+    def __init__(self):
+        self.timer = None
+        self.configure()
+
+    def configure(self):
+        self.rules = []
+        self.holidays = set()
+        for name, value in AlarmConfig.settings.section('Schedule').items():
+            if name == 'holidays':
+                for day in value.split(','):
+                    try:
+                        self.holidays.add(
+                            datetime.strptime(day.strip(), '%Y-%m-%d').date())
+                    except ValueError:
+                        logging.error('Invalid schedule holiday %s, expected '
+                                      'YYYY-MM-DD', day.strip())
+                continue
+
+            try:
+                self.rules.append(parse_rule(name, value))
+            except ValueError:
+                logging.error('Invalid schedule %s = %s, expected '
+                              '<arm|disarm> <days> <HH:MM>', name, value)
+
+        self.rules.sort()
+        self.checked = time.time()
+        self.schedule()
+
+    def entries(self, after):
+        """
+        Yield the schedule's entries after time `after`, in order
+        """
+        first_day = date.fromtimestamp(after)
+        for offset in range(SEARCH_DAYS):
+            day = first_day + timedelta(days=offset)
+            if day in self.holidays:
+                continue
+
+            for at_time, name, action, days in self.rules:
+                if day.weekday() not in days:
+                    continue
+
+                when = time.mktime(
+                    datetime.combine(day, at_time).timetuple())
+                if when > after:
+                    yield {'time': when, 'action': action, 'rule': name}
+
+    def upcoming(self, count=UPCOMING):
+        return list(islice(self.entries(time.time()), count))
+
+    def schedule(self):
+        if self.timer:
+            Scheduler().cancel(self.timer)
+            self.timer = None
+
+        if not self.rules:
+            return
+
+        entry = next(self.entries(self.checked), None)
+        if entry:
+            delay = min(max(entry['time'] - time.time(), 0), RECHECK)
+            self.timer = Scheduler().call_later(delay, self.run_due)
+
+    def run_due(self):
+        self.timer = None
+        now = time.time()
+        for entry in list(takewhile(lambda entry: entry['time'] <= now,
+                                    self.entries(self.checked))):
+            if now - entry['time'] > LATE_LIMIT:
+                logging.warning('Skipping scheduled %s (%s) missed by %ds',
+                                entry['action'], entry['rule'],
+                                now - entry['time'])
+                continue
+
+            logging.info('Scheduled %s (%s)', entry['action'], entry['rule'])
+            if entry['action'] == 'arm':
+                status = AlarmSystem().arm(auto_arm=True)
+            else:
+                status = AlarmSystem().disarm(auto_arm=True)
+
+            if status is None:
+                logging.error('Scheduled %s failed, arm/disarm is not set up',
+                              entry['action'])
+
+        self.checked = now
+        self.schedule()
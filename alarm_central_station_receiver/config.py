@@ -17,6 +17,8 @@ import configparser
 import shutil
 import os.path
 
+from types import MappingProxyType
+
 CONFIG_MAP = {
     'Main': {
         'required': True,
@@ -24,15 +26,72 @@ CONFIG_MAP = {
             'phone_number': True,
             'data_file_path': True,
             'notify_auto_events': True,
+        },
+        'types': {'notify_auto_events': 'boolean'}
+    },
+
+    # Any number of [Line <name>] sections, one per TigerJet phone line
+    'Line': {
+        'required': False,
+        'prefix': True,
+        'keys': {
+            'device': True,
+            'phone_number': False,
+            'account': False,
+            'panel': False,
         }
     },
 
     'RpiArmDisarm': {
         'required': False,
-        'keys': {'gpio_pin': True}
+        'keys': {'gpio_pin': True},
+        'types': {'gpio_pin': 'int'}
+    },
+
+    'Deduplication': {
+        'required': False,
+        'keys': {
+            'window_seconds': False,
+            'max_entries': False,
+        },
+        'types': {'window_seconds': 'int', 'max_entries': 'int'}
+    },
+
+    'Durability': {
+        'required': False,
+        'keys': {
+            'mode': False,
+            'fsync_interval_ms': False,
+        },
+        'types': {'fsync_interval_ms': 'int'}
+    },
+
+    'Retention': {
+        'required': False,
+        'keys': {
+            'max_age_days': False,
+            'max_events': False,
+            'test_max_age_days': False,
+            'keep_alarms': False,
+            'compression': False,
+            'interval_minutes': False,
+        },
+        'types': {
+            'max_age_days': 'float',
+            'max_events': 'int',
+            'test_max_age_days': 'float',
+            'keep_alarms': 'boolean',
+            'interval_minutes': 'float',
+        }
     },
 
+    # Any number of '<name> = <arm|disarm> <days> <HH:MM>' rules, and
+    # a list of holidays
+    'Schedule': {'required': False},
+
     'ZoneMapping': {'required': False},
+    'PanelProfiles': {'required': False},
+    'PanelDictionaries': {'required': False},
     'EmailNotification': {
         'required': False,
         'keys': {
@@ -43,7 +102,8 @@ CONFIG_MAP = {
             'notification_email': True,
             'notification_subject': True,
             'tls': True
-        }
+        },
+        'types': {'tls': 'boolean', 'port': 'int'}
     },
 
     'PushoverNotification': {
@@ -53,40 +113,186 @@ CONFIG_MAP = {
             'token': True,
             'priority': False,
             'device': False
-        }
+        },
+        'types': {'priority': 'int'}
     },
 }
 
 
+def to_boolean(value):
+    state = configparser.ConfigParser.BOOLEAN_STATES.get(value.lower())
+    if state is None:
+        raise ValueError('Not a boolean: %s' % value)
+
+    return state
+
+
+CONVERTERS = {
+    'boolean': to_boolean,
+    'int': int,
+    'float': float,
+}
+
+
+def section_map(name):
+    """
+    The CONFIG_MAP entry for section `name`, which may be prefixed
+    """
+    if name in CONFIG_MAP:
+        return CONFIG_MAP[name]
+
+    prefix = name.split(' ', 1)[0]
+    section = CONFIG_MAP.get(prefix, {})
+    return section if section.get('prefix') else {}
+
+
+class Settings(object):
+    """
+    Read only snapshot of the configuration, each value converted to its
+    type in CONFIG_MAP.  Empty values of typed keys are None.  A new
+    snapshot replaces the old one as a whole when the configuration is
+    reloaded, so code holding one always sees a consistent set of values.
+    """
+    __slots__ = ['sections']
+
+    def __init__(self, config):
+        """
+        :raises ValueError: listing every value not of its type
+        """
+        sections = {}
+        invalid = []
+        for name in config.sections():
+            types = section_map(name).get('types', {})
+            values = {}
+            for key, value in config.items(name):
+                value_type = types.get(key)
+                if value_type and value.strip():
+                    try:
+                        value = CONVERTERS[value_type](value.strip())
+                    except ValueError:
+                        invalid.append('[%s] Section: %s must be %s' %
+                                       (name, key, value_type))
+                elif value_type:
+                    value = None
+
+                values[key] = value
+
+            sections[name] = MappingProxyType(values)
+
+        if invalid:
+            raise ValueError(invalid)
+
+        object.__setattr__(self, 'sections', MappingProxyType(sections))
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('Settings are read only')
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def section(self, name):
+        return self.sections.get(name, MappingProxyType({}))
+
+    def get(self, name, key, fallback=None):
+        value = self.section(name).get(key)
+        return fallback if value is None else value
+
+
 class AlarmConfig(object):
+    # The parsed file, and its typed snapshot
     config = None
+    settings = None
+    path = None
+    errors = []
+
+    # Called after each reload, to drop anything cached from the settings
+    reload_callbacks = []
 
     @staticmethod
     def exists(path):
         return os.path.isfile(path)
 
+    @classmethod
+    def read(klass, path):
+        """
+        Returns the parsed config file at `path`, its settings, and a list
+        of any missing or invalid configuration
+        """
+        config = configparser.ConfigParser()
+        config.read(path)
+        errors = klass.missing_config(config)
+        try:
+            settings = Settings(config)
+        except ValueError as exc:
+            settings = None
+            errors.extend(exc.args[0])
+
+        return config, settings, errors
+
     @classmethod
     def load(klass, path):
-        klass.config = configparser.ConfigParser()
-        klass.config.read(path)
+        klass.path = path
+        klass.config, klass.settings, klass.errors = klass.read(path)
+
+    @classmethod
+    def reload(klass):
+        """
+        Re-read the config file, and switch over to it if it's valid.
+
+        :returns: list of the missing or invalid configuration, the current
+                  configuration is kept if there's any
+        """
+        config, settings, errors = klass.read(klass.path)
+        if errors:
+            return errors
+
+        klass.config = config
+        klass.settings = settings
+        for callback in klass.reload_callbacks:
+            callback()
+
+        return []
+
+    @classmethod
+    def on_reload(klass, callback):
+        klass.reload_callbacks.append(callback)
+
+    @staticmethod
+    def prefixed_sections(prefix, config=None):
+        """
+        Return the names of all sections named '<prefix> <name>'
+        """
+        config = config or AlarmConfig.config
+        return [sec_name for sec_name in config.sections()
+                if sec_name.startswith(prefix + ' ')]
 
     @classmethod
     def validate(klass):
+        return klass.errors
+
+    @classmethod
+    def missing_config(klass, config):
         missing_config = []
 
         for sec_name, section in CONFIG_MAP.items():
-            required = section.get('required')
-            missing = sec_name not in klass.config
-
-            # If an entire section is missing, and its an optional
-            # section, skip validation.
-            if missing and not required:
-                continue
-
-            for key, key_required in section.get('keys', {}).items():
-                cfg_value = klass.config.get(sec_name, key, fallback=None)
-                if key_required and not cfg_value:
-                    missing_config.append('[%s] Section: %s' % (sec_name, key))
+            if section.get('prefix'):
+                sec_names = klass.prefixed_sections(sec_name, config)
+            else:
+                sec_names = [sec_name]
+
+            for name in sec_names:
+                required = section.get('required')
+                missing = name not in config
+
+                # If an entire section is missing, and its an optional
+                # section, skip validation.
+                if missing and not required:
+                    continue
+
+                for key, key_required in section.get('keys', {}).items():
+                    cfg_value = config.get(name, key, fallback=None)
+                    if key_required and not cfg_value:
+                        missing_config.append('[%s] Section: %s' % (name, key))
 
         return missing_config
 
@@ -0,0 +1,55 @@
+"""
+Ademco / Honeywell (Vista) Contact ID Codes to Descriptions
+
+Only codes the Vista panels report differently from the standard table
+are listed, everything else falls back to contact_id/standard.py
+"""
+
+EVENTS = {
+    '110ZZZ': {'1': ('A', 'Fire')},
+    '121UUU': {'1': ('A', 'Duress')},
+    '122ZZZ': {'1': ('A', 'Silent Panic')},
+    '131ZZZ': {'1': ('A', 'Perimeter Burglary')},
+    '132ZZZ': {'1': ('A', 'Interior Burglary')},
+    '134ZZZ': {'1': ('A', 'Entry/Exit Burglary')},
+    '135ZZZ': {'1': ('A', 'Day/Night Alarm')},
+    '143ZZZ': {'1': ('MA', 'Expansion Module Failure')},
+    '145ZZZ': {'1': ('T', 'Expansion Module Tamper')},
+    '150ZZZ': {'1': ('A', '24 Hour Auxiliary')},
+    '301000': {'1': ('MA', 'AC Power Loss')},
+    '302000': {'1': ('MA', 'Low System Battery')},
+    '305000': {'1': ('MA', 'System Reset')},
+    '306000': {'1': ('T', 'Program Tamper')},
+    '333ZZZ': {'1': ('MA', 'Expansion Module Failure')},
+    '344ZZZ': {'1': ('MA', 'RF Receiver Jam')},
+    '351000': {'1': ('MA', 'Telco Line Fault')},
+    '353000': {'1': ('MA', 'Long Range Radio Trouble')},
+    '373ZZZ': {'1': ('MA', 'Fire Loop Trouble')},
+    '374ZZZ': {'1': ('A', 'Exit Error Alarm')},
+    '380ZZZ': {'1': ('MA', 'Trouble')},
+    '381ZZZ': {'1': ('MA', 'RF Supervision Loss')},
+    '383ZZZ': {'1': ('T', 'RF Sensor Tamper')},
+    '384ZZZ': {'1': ('MA', 'RF Sensor Low Battery')},
+    '401UUU': {'1': ('O', 'Disarmed'),
+               '3': ('C', 'Armed Away')},
+    '403UUU': {'1': ('O', 'Schedule Disarmed'),
+               '3': ('C', 'Schedule Armed')},
+    '406UUU': {'1': ('E', 'Alarm Cancelled')},
+    '407UUU': {'1': ('O', 'Remote Disarmed'),
+               '3': ('C', 'Remote Armed')},
+    '408UUU': {'1': ('O', 'Quick Disarmed'),
+               '3': ('C', 'Quick Armed Away')},
+    '409UUU': {'1': ('O', 'Keyswitch Disarmed'),
+               '3': ('C', 'Keyswitch Armed')},
+    '441UUU': {'1': ('O', 'Disarmed from Stay'),
+               '3': ('C', 'Armed Stay')},
+    '570ZZZ': {'1': ('E', 'Zone Bypass')},
+    '602000': {'1': ('E', 'Periodic Test')},
+    '606000': {'1': ('E', 'AAV to Follow')},
+    '607UUU': {'1': ('E', 'Walk Test'),
+               '3': ('R', 'Walk Test End')},
+    '623000': {'1': ('MA', 'Event Log 80% Full')},
+    '625UUU': {'1': ('E', 'Real-Time Clock Changed')},
+    '627000': {'1': ('MA', 'Program Mode Entry')},
+    '628000': {'1': ('MA', 'Program Mode Exit')},
+}
@@ -0,0 +1,141 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from itertools import islice
+
+from alarm_central_station_receiver.contact_id import panels
+from alarm_central_station_receiver.contact_id.decoder import decode_code, zone_of
+
+BATCH_SIZE = 10000
+
+# Maps each hex digit to its checksum value, 0 is treated as 10
+CHECKSUM_DIGITS = bytes.maketrans(
+    b'0123456789abcdefABCDEF',
+    bytes([10, 1, 2, 3, 4, 5, 6, 7, 8, 9,
+           10, 11, 12, 13, 14, 15,
+           10, 11, 12, 13, 14, 15]))
+
+
+def valid_checksum(code):
+    try:
+        digits = code.encode('ascii')
+    except UnicodeEncodeError:
+        # Not Contact ID digits at all
+        return False
+
+    return sum(digits.translate(CHECKSUM_DIGITS)) % 15 == 0
+
+
+def valid_checksums(codes):
+    """
+    Checksum a batch of raw codes at once, returning a list of whether
+    each code's checksum is valid.  Same result as callup.calc_checksum,
+    without converting each digit in Python.  Codes that aren't ASCII are
+    invalid.
+    """
+    try:
+        return [sum(code.encode('ascii').translate(CHECKSUM_DIGITS)) %
+                15 == 0 for code in codes]
+    except UnicodeEncodeError:
+        return [valid_checksum(code) for code in codes]
+
+
+def read_codes(file_desc):
+    """
+    Yields the raw codes in `file_desc`, one per line
+    """
+    for line in file_desc:
+        code = line.strip()
+        if code:
+            yield code
+
+
+def batches(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def decode_batch(codes, line_panel=None):
+    """
+    Decode a list of raw codes, returning a list of
+    (code, valid, report type, event, description, zone) tuples
+    """
+    reports = []
+    account_panels = {}
+    for code, valid in zip(codes, valid_checksums(codes)):
+        account = code[:4]
+        panel = account_panels.get(account)
+        if panel is None:
+            panel = account_panels[account] = \
+                panels.panel_for(code, line_panel)
+
+        reports.append((code, valid) + decode_code(code, valid, panel) +
+                       (zone_of(code, panel),))
+
+    return reports
+
+
+def decode_stream(codes, line_panel=None):
+    """
+    Decode an iterable of raw codes in batches, yielding a record dict for
+    each code, in order.  Memory use is bounded by the batch size.
+    """
+    for batch in batches(codes):
+        for code, valid, report_type, event, description, zone in \
+                decode_batch(batch, line_panel):
+            yield {
+                'id': code,
+                'valid': valid,
+                'type': report_type,
+                'event': event,
+                'description': description,
+                'zone': zone,
+            }
+
+
+def redecode_events(events, line_panel=None):
+    """
+    Re-decode the `id` of each stored event in place with the current
+    event tables and zone names.  Events that didn't come from the alarm,
+    like the arm/disarm timeouts, are left alone, as is the automatic
+    arm/disarm marking.
+
+    :returns: number of events whose description changed
+    """
+    changed = 0
+    decodable = (event for event in events if len(event['id']) >= 15)
+    for batch in batches(decodable):
+        reports = decode_batch([event['id'] for event in batch], line_panel)
+        for event, report in zip(batch, reports):
+            _, _, report_type, event_code, description, zone = report
+            if event['type'] in ['AO', 'AC'] and report_type in ['O', 'C']:
+                report_type = 'A' + report_type
+                description = 'Automatic ' + description
+
+            if event['description'] != description or \
+                    event['type'] != report_type:
+                changed += 1
+
+            event['type'] = report_type
+            event['event'] = event_code
+            event['description'] = description
+            event['zone'] = zone
+
+    return changed
@@ -16,6 +16,7 @@ limitations under the License.
 import logging
 import re
 from alarm_central_station_receiver.contact_id import handshake
+from alarm_central_station_receiver.timing import CallTimer
 
 
 def calc_checksum(code):
@@ -53,28 +54,33 @@ def parse_alarm_codes(code_str):
     return codes
 
 
-def collect_alarm_codes(fd):
+def collect_alarm_codes(fd, dev_index, timer):
     logging.info("Collecting Alarm Codes")
     code_str = ''
 
     # Play the alarm handshake to start getting the codes
-    with handshake.Handshake():
+    with handshake.Handshake(dev_index, timer):
         off_hook, digit = get_phone_status(fd)
         while off_hook:
-            code_str += format(digit, 'x') if digit != -1 else ''
+            if digit != -1:
+                code_str += format(digit, 'x')
+                timer.digit()
+
             off_hook, digit = get_phone_status(fd)
 
+        timer.mark('hang_up')
         logging.info("Alarm Hung Up")
 
     logging.info('Code String: %s', code_str)
     return code_str
 
 
-def validate_alarm_call_in(fd, expected):
+def validate_alarm_call_in(fd, expected, timer):
     number = '000'
     off_hook, digit = get_phone_status(fd)
 
     if off_hook:
+        timer.mark('off_hook')
         logging.info("Phone Off The Hook")
 
     while off_hook:
@@ -84,6 +90,7 @@ def validate_alarm_call_in(fd, expected):
             logging.debug("Number %s", number)
 
         if number == expected:
+            timer.mark('call_in_validated')
             logging.info("Alarm Call In Received")
             break
 
@@ -107,10 +114,12 @@ def get_phone_status(fd):
     return (off_hook, digit)
 
 
-def handle_alarm_calling(fd, number):
+def handle_alarm_calling(fd, number, dev_index=None, timer=None):
     codes = []
-    if validate_alarm_call_in(fd, number):
-        code_str = collect_alarm_codes(fd)
+    timer = timer or CallTimer()
+    if validate_alarm_call_in(fd, number, timer):
+        code_str = collect_alarm_codes(fd, dev_index, timer)
         codes = parse_alarm_codes(code_str)
+        timer.mark_messages(code_str, codes)
 
     return codes
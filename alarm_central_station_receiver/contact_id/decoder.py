@@ -15,26 +15,45 @@ limitations under the License.
 """
 import time
 
-from alarm_central_station_receiver.contact_id import dsc
+from alarm_central_station_receiver.contact_id import panels
 from alarm_central_station_receiver.events import create_event
 
 
-def decode(raw_events):
-    decoded_events = []
+def decode_code(code, valid, panel):
+    """
+    Returns the report type, event and description of a single raw code
+    decoded with the `panel` event table
+    """
+    if len(code) < 15:
+        return 'U', '', 'Invalid Length: %s (len %d)' % (code, len(code))
+
+    # Attempt to decode even with a bad checksum
+    report_type, event, description = panel.digits_to_alarmreport(code)
+    if not valid:
+        description += ' -- Checksum Mismatch! %s' % code
+
+    return report_type, event, description
+
 
-    for code, valid in raw_events:
-        if len(code) < 15:
-            report_type = 'U'
-            event = ''
-            description = 'Invalid Length: %s (len %d)' % (code, len(code))
-        else:
-            # Attempt to decode even with a bad checksum
-            report_type, event, description = dsc.digits_to_alarmreport(code)
-            if not valid:
-                description += ' -- Checksum Mismatch! %s' % code
+def zone_of(code, panel):
+    return panel.zone_of(code) if len(code) >= 15 else None
+
+
+def decode(raw_events, line_panel=None, call_id=None):
+    """
+    Decode the raw codes of a call.  With the call's `call_id` its events
+    are traced as '<call_id>-<n>', otherwise each gets its own trace ID.
+    """
+    decoded_events = []
 
+    for index, (code, valid) in enumerate(raw_events):
+        panel = panels.panel_for(code, line_panel)
+        report_type, event, description = decode_code(code, valid, panel)
+        trace_id = '%s-%d' % (call_id, index) if call_id else None
         decoded_events.append(create_event(report_type,
                                            event,
                                            description,
-                                           code))
+                                           code,
+                                           zone_of(code, panel),
+                                           trace_id))
     return decoded_events
@@ -1,8 +1,6 @@
 """
 DSC Contact ID Codes to Descriptions
 """
-from alarm_central_station_receiver.config import AlarmConfig
-
 EVENTS = {
     '100000': {'1': ('A', 'Aux Key Alarm')},
     '100ZZZ': {'1': ('A', '24 Hr Medical')},
@@ -79,77 +77,3 @@ EVENTS = {
     '654000': {'1': ('MA', 'Delinquency')}
 }
 
-
-def create_event_description(event_type, event):
-    """
-    Create the alarm description by using the '1' event type
-    description and appending the appropriate event type
-    name to it for the passed in `event_type`
-    """
-    _, description = event.get('1')
-    if event_type == '1':
-        event_type_name = 'E'
-    elif event_type == '3':
-        event_type_name = 'R'
-        description += ' Restoral'
-    elif event_type == '6':
-        event_type_name = 'S'
-        description += ' Status'
-    else:
-        event_type_name = 'U'
-        description += 'Unknown Event Type (%s)' % event_type
-
-    return event_type_name, description
-
-
-def get_zone_name(sensor_code):
-    zone_name = AlarmConfig.config.get('ZoneMapping',
-                                       sensor_code,
-                                       fallback=None)
-    if not zone_name:
-        zone_name = 'Zone %s' % sensor_code
-
-    return zone_name
-
-
-def digits_to_alarmreport(code):
-    """
-    Given a raw contact id DTMF string from a DSC alarm,
-    return the alarm description and event type.
-
-    4567 18 1 570 00 016 4
-    ACCT MT Q CCC GG ZZZ S
-    NNNN 18 1 = new event
-            3 = restore or closing
-            6 = still present (status report)
-    """
-    event_type = code[6]
-    event_code = code[7:10]
-    sensor_code = code[12:15]
-
-    event_type_name = 'U'
-    description = 'Unknown Event - %s' % code
-    extra_desc = ''
-
-    event = EVENTS.get(event_code + sensor_code)
-    if not event:
-        zone_event = EVENTS.get(event_code + 'ZZZ')
-        user_event = EVENTS.get(event_code + 'UUU')
-        if zone_event:
-            event = zone_event
-            zone_name = get_zone_name(sensor_code)
-            extra_desc = ' %s (%s)' % (zone_name, sensor_code)
-        elif user_event:
-            event = user_event
-            extra_desc = ' User %s' % sensor_code
-
-    if event:
-        if event_type in event:
-            event_type_name, description = event.get(event_type)
-        else:
-            event_type_name, description = \
-                create_event_description(event_type, event)
-
-        description += extra_desc
-
-    return event_type_name, event_code + sensor_code, description
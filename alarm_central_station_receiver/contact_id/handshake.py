@@ -16,17 +16,28 @@ limitations under the License.
 import logging
 import wave
 import time
+import re
 import os.path
+import threading
 from pyaudio import PyAudio, paContinue
 
 TJ_DEV_INDEX = -1
 
+# PortAudio is initialized once, by initialize().  Opening and closing
+# streams isn't thread safe, each phone line takes the lock to do so.
+PYAUDIO = None
+PYAUDIO_LOCK = threading.Lock()
+
+# Maps the sysfs USB device path of each TigerJet to its audio output index
+TJ_DEV_INDEXES = {}
+
 
 class Handshake(object):
-    def __init__(self):
+    def __init__(self, dev_index=None, timer=None):
         self.wf = ''
         self.stream = ''
-        self.p = ''
+        self.dev_index = TJ_DEV_INDEX if dev_index is None else dev_index
+        self.timer = timer
 
     def __enter__(self):
         """
@@ -45,45 +56,87 @@ class Handshake(object):
                     'handshake16k.wav')),
             'rb')
 
-        self.p = PyAudio()
+        frame_width = self.wf.getsampwidth() * self.wf.getnchannels()
 
         def play_alarm(in_data, frame_count, time_info, status):
             data = self.wf.readframes(frame_count)
+            if self.timer and len(data) < frame_count * frame_width:
+                self.timer.mark('handshake_end')
+                self.timer = None
+
             return (data, paContinue)
 
-        self.stream = self.p.open(
-            format=self.p.get_format_from_width(
-                self.wf.getsampwidth()),
-            channels=self.wf.getnchannels(),
-            rate=self.wf.getframerate(),
-            output=True,
-            stream_callback=play_alarm,
-            output_device_index=TJ_DEV_INDEX)
+        with PYAUDIO_LOCK:
+            self.stream = PYAUDIO.open(
+                format=PYAUDIO.get_format_from_width(
+                    self.wf.getsampwidth()),
+                channels=self.wf.getnchannels(),
+                rate=self.wf.getframerate(),
+                output=True,
+                stream_callback=play_alarm,
+                output_device_index=self.dev_index)
+
+            if self.timer:
+                self.timer.mark('handshake_start')
 
-        self.stream.start_stream()
+            self.stream.start_stream()
 
     def __exit__(self, exc_type, exc_value, traceback):
         while self.stream.is_active():
             time.sleep(0.3)
 
-        self.stream.stop_stream()
-        self.stream.close()
-        self.wf.close()
+        with PYAUDIO_LOCK:
+            self.stream.stop_stream()
+            self.stream.close()
 
-        self.p.terminate()
+        self.wf.close()
         logging.info("Handshake Complete")
 
 
+def sound_card_usb_path(name):
+    """
+    Return the sysfs USB device path of the ALSA card named in the PyAudio
+    device `name`, e.g. 'TigerJet 560B: USB Audio (hw:1,0)'
+    """
+    match = re.search(r'\(hw:(\d+),', name)
+    if not match:
+        return None
+
+    card = os.path.realpath('/sys/class/sound/card%s/device' % match.group(1))
+    return os.path.dirname(card)
+
+
 def find_tigerjet_audio_device():
-    p = PyAudio()
-    for dev_idx in range(0, p.get_device_count()):
-        if 'TigerJet' in p.get_device_info_by_index(dev_idx).get('name'):
-            global TJ_DEV_INDEX
+    TJ_DEV_INDEXES.clear()
+    for dev_idx in range(0, PYAUDIO.get_device_count()):
+        name = PYAUDIO.get_device_info_by_index(dev_idx).get('name')
+        if 'TigerJet' not in name:
+            continue
+
+        global TJ_DEV_INDEX
+        if TJ_DEV_INDEX == -1:
             TJ_DEV_INDEX = dev_idx
-            break
-    else:
+
+        usb_path = sound_card_usb_path(name)
+        if usb_path and usb_path not in TJ_DEV_INDEXES:
+            TJ_DEV_INDEXES[usb_path] = dev_idx
+
+    if TJ_DEV_INDEX == -1:
         raise RuntimeError('TigerJet audio output device not found!')
 
 
+def audio_device_index(usb_path):
+    """
+    Return the audio output device index of the TigerJet at `usb_path`.
+    Falls back to the first TigerJet found, which is always correct for
+    single line receivers.
+    """
+    return TJ_DEV_INDEXES.get(usb_path, TJ_DEV_INDEX)
+
+
 def initialize():
+    global PYAUDIO
+    if PYAUDIO is None:
+        PYAUDIO = PyAudio()
+
     find_tigerjet_audio_device()
@@ -0,0 +1,184 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+from alarm_central_station_receiver.config import AlarmConfig
+
+# Event qualifiers compiled ahead of time, others are decoded on demand
+QUALIFIERS = ['1', '3', '6']
+
+# Upper bound on the number of reports cached as they are first seen
+MAX_ENTRIES = 50000
+
+
+def create_event_description(event_type, event):
+    """
+    Create the alarm description by using the '1' event type
+    description and appending the appropriate event type
+    name to it for the passed in `event_type`
+    """
+    _, description = event.get('1')
+    if event_type == '1':
+        event_type_name = 'E'
+    elif event_type == '3':
+        event_type_name = 'R'
+        description += ' Restoral'
+    elif event_type == '6':
+        event_type_name = 'S'
+        description += ' Status'
+    else:
+        event_type_name = 'U'
+        description += 'Unknown Event Type (%s)' % event_type
+
+    return event_type_name, description
+
+
+def get_zone_name(sensor_code):
+    zone_name = AlarmConfig.settings.get('ZoneMapping', sensor_code)
+    if not zone_name:
+        zone_name = 'Zone %s' % sensor_code
+
+    return zone_name
+
+
+def has_event(events, code):
+    event_code = code[7:10]
+    return (event_code + code[12:15] in events or
+            event_code + 'ZZZ' in events or
+            event_code + 'UUU' in events)
+
+
+def decode_alarmreport(events, code):
+    """
+    Given a raw contact id DTMF string, look it up in the `events` table
+    and return the alarm description and event type.
+
+    4567 18 1 570 00 016 4
+    ACCT MT Q CCC GG ZZZ S
+    NNNN 18 1 = new event
+            3 = restore or closing
+            6 = still present (status report)
+    """
+    event_type = code[6]
+    event_code = code[7:10]
+    sensor_code = code[12:15]
+
+    event_type_name = 'U'
+    description = 'Unknown Event - %s' % code
+    extra_desc = ''
+
+    event = events.get(event_code + sensor_code)
+    if not event:
+        zone_event = events.get(event_code + 'ZZZ')
+        user_event = events.get(event_code + 'UUU')
+        if zone_event:
+            event = zone_event
+            zone_name = get_zone_name(sensor_code)
+            extra_desc = ' %s (%s)' % (zone_name, sensor_code)
+        elif user_event:
+            event = user_event
+            extra_desc = ' User %s' % sensor_code
+
+    if event:
+        if event_type in event:
+            event_type_name, description = event.get(event_type)
+        else:
+            event_type_name, description = \
+                create_event_description(event_type, event)
+
+        description += extra_desc
+
+    return event_type_name, event_code + sensor_code, description
+
+
+class CompiledEvents(object):
+    """
+    An `events` table compiled into a single dict, keyed on the qualifier,
+    event code and sensor digits of a raw code, holding the finished
+    report with any zone name already filled in.
+
+    Exact codes and the named zones from [ZoneMapping] are compiled up
+    front, other zones and users are added the first time they are seen.
+    The table is rebuilt whenever the configuration is reloaded.
+
+    Codes missing from `events` are decoded by the table returned by
+    calling `fallback`, so it is only loaded once it is needed.
+    """
+
+    def __init__(self, events, fallback=None):
+        self.events = events
+        self.fallback = fallback
+        self.table = {}
+        self.config = None
+
+    def decode(self, code):
+        if self.fallback and not has_event(self.events, code):
+            return self.fallback().decode(code)
+
+        return decode_alarmreport(self.events, code)
+
+    def zone_of(self, code):
+        """
+        Returns the zone number of `code`, or None if it isn't reporting
+        on a zone.
+        """
+        event_code = code[7:10]
+        sensor_code = code[12:15]
+        if event_code + sensor_code in self.events:
+            return None
+
+        if event_code + 'ZZZ' in self.events:
+            return sensor_code
+
+        if self.fallback and not has_event(self.events, code):
+            return self.fallback().zone_of(code)
+
+        return None
+
+    def compile(self):
+        self.config = AlarmConfig.settings
+        zones = list(self.config.section('ZoneMapping'))
+
+        table = {}
+        for key in self.events:
+            event_code, sensor_code = key[:3], key[3:]
+            if sensor_code == 'ZZZ':
+                sensor_codes = zones
+            elif sensor_code == 'UUU':
+                sensor_codes = []
+            else:
+                sensor_codes = [sensor_code]
+
+            for sensor_code in sensor_codes:
+                for qualifier in QUALIFIERS:
+                    code = '000018%s%s00%s' % (qualifier, event_code,
+                                               sensor_code)
+                    table[qualifier + event_code + sensor_code] = \
+                        decode_alarmreport(self.events, code)
+
+        self.table = table
+
+    def digits_to_alarmreport(self, code):
+        if self.config is not AlarmConfig.settings:
+            self.compile()
+
+        key = code[6:10] + code[12:15]
+        report = self.table.get(key)
+        if report is None:
+            report = self.decode(code)
+            # Unknown reports include the whole code, so can't be shared
+            if report[0] != 'U' and len(self.table) < MAX_ENTRIES:
+                self.table[key] = report
+
+        return report
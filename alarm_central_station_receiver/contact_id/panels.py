@@ -0,0 +1,126 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import importlib
+import json
+import logging
+
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.contact_id.lookup import CompiledEvents
+
+# Built in panel event tables.  Each module is only imported the first
+# time a message from that type of panel is decoded.
+PANEL_MODULES = {
+    'contact_id': 'alarm_central_station_receiver.contact_id.standard',
+    'dsc': 'alarm_central_station_receiver.contact_id.dsc',
+    'ademco': 'alarm_central_station_receiver.contact_id.ademco',
+}
+
+DEFAULT_PANEL = 'dsc'
+STANDARD_PANEL = 'contact_id'
+
+PANELS = {}
+ACCOUNT_PANELS = {}
+ACCOUNT_CONFIG = None
+
+
+def load_events(name):
+    """
+    Load the event table for panel type `name`, either a built in table,
+    or a JSON file listed in the [PanelDictionaries] section.
+
+    :raises ValueError: if the panel type is unknown
+    """
+    if name in PANEL_MODULES:
+        return importlib.import_module(PANEL_MODULES[name]).EVENTS
+
+    path = AlarmConfig.settings.get('PanelDictionaries', name)
+    if not path:
+        raise ValueError('Unknown panel type %s' % name)
+
+    with open(path, 'r') as file_desc:
+        events = json.load(file_desc)
+
+    return dict((key, dict((event_type, tuple(report))
+                           for event_type, report in event.items()))
+                for key, event in events.items())
+
+
+def standard_panel():
+    return get_panel(STANDARD_PANEL)
+
+
+def get_panel(name):
+    """
+    Returns the compiled event table for panel type `name`, loading it
+    on first use.  Codes the panel's table doesn't know are decoded using
+    the standard Contact ID table.
+    """
+    panel = PANELS.get(name)
+    if panel:
+        return panel
+
+    try:
+        events = load_events(name)
+    except (ValueError, IOError) as exc:
+        logging.error('Unable to load panel type %s: %s, using %s',
+                      name, exc, DEFAULT_PANEL)
+        panel = get_panel(DEFAULT_PANEL)
+    else:
+        logging.info('Loaded %s panel event table', name)
+        fallback = None if name == STANDARD_PANEL else standard_panel
+        panel = CompiledEvents(events, fallback)
+
+    PANELS[name] = panel
+    return panel
+
+
+def account_panels():
+    """
+    The [PanelProfiles] section as a dict of account number to panel type,
+    cached until the configuration is reloaded.
+    """
+    global ACCOUNT_CONFIG
+    if ACCOUNT_CONFIG is not AlarmConfig.settings:
+        ACCOUNT_PANELS.clear()
+        ACCOUNT_PANELS.update(AlarmConfig.settings.section('PanelProfiles'))
+        ACCOUNT_CONFIG = AlarmConfig.settings
+
+    return ACCOUNT_PANELS
+
+
+def reset():
+    """
+    Drop the loaded panel tables, so that changed [PanelDictionaries] files
+    are read again after a reload
+    """
+    PANELS.clear()
+
+
+def default_panel():
+    return get_panel(account_panels().get('default', DEFAULT_PANEL))
+
+
+def panel_for(code, line_panel=None):
+    """
+    Returns the compiled event table for the panel that sent `code`.  A
+    panel type set for the account takes precedence over the one set for
+    the phone line, followed by the [PanelProfiles] default.
+    """
+    name = account_panels().get(code[:4]) or line_panel
+    if not name:
+        return default_panel()
+
+    return get_panel(name)
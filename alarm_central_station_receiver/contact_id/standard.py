@@ -0,0 +1,252 @@
+"""
+Standard (SIA DC-05) Contact ID Codes to Descriptions
+
+Used for any panel type, and as the fallback for codes missing from a
+panel specific table.
+"""
+
+EVENTS = {
+    # Medical Alarms
+    '100ZZZ': {'1': ('A', 'Medical')},
+    '101ZZZ': {'1': ('A', 'Personal Emergency')},
+    '102ZZZ': {'1': ('A', 'Fail to Report In')},
+
+    # Fire Alarms
+    '110ZZZ': {'1': ('A', 'Fire Alarm')},
+    '111ZZZ': {'1': ('A', 'Smoke')},
+    '112ZZZ': {'1': ('A', 'Combustion')},
+    '113ZZZ': {'1': ('A', 'Water Flow')},
+    '114ZZZ': {'1': ('A', 'Heat')},
+    '115ZZZ': {'1': ('A', 'Pull Station')},
+    '116ZZZ': {'1': ('A', 'Duct')},
+    '117ZZZ': {'1': ('A', 'Flame')},
+    '118ZZZ': {'1': ('A', 'Fire Near Alarm')},
+
+    # Panic Alarms
+    '120ZZZ': {'1': ('A', 'Panic Alarm')},
+    '121UUU': {'1': ('A', 'Duress')},
+    '122ZZZ': {'1': ('A', 'Silent Panic')},
+    '123ZZZ': {'1': ('A', 'Audible Panic')},
+
+    # Burglar Alarms
+    '130ZZZ': {'1': ('A', 'Burglary')},
+    '131ZZZ': {'1': ('A', 'Perimeter Burglary')},
+    '132ZZZ': {'1': ('A', 'Interior Burglary')},
+    '133ZZZ': {'1': ('A', '24 Hour Burglary')},
+    '134ZZZ': {'1': ('A', 'Entry/Exit Burglary')},
+    '135ZZZ': {'1': ('A', 'Day/Night Burglary')},
+    '136ZZZ': {'1': ('A', 'Outdoor Burglary')},
+    '137ZZZ': {'1': ('T', 'Burglary Tamper')},
+    '138ZZZ': {'1': ('A', 'Burglary Near Alarm')},
+    '139ZZZ': {'1': ('A', 'Intrusion Verifier')},
+
+    # General Alarms
+    '140ZZZ': {'1': ('A', 'General Alarm')},
+    '141ZZZ': {'1': ('MA', 'Polling Loop Open')},
+    '142ZZZ': {'1': ('MA', 'Polling Loop Short')},
+    '143ZZZ': {'1': ('MA', 'Expansion Module Failure')},
+    '144ZZZ': {'1': ('T', 'Sensor Tamper')},
+    '145ZZZ': {'1': ('T', 'Expansion Module Tamper')},
+    '146ZZZ': {'1': ('A', 'Silent Burglary')},
+    '147ZZZ': {'1': ('MA', 'Sensor Supervision Failure')},
+
+    # 24 Hour Non-Burglary
+    '150ZZZ': {'1': ('A', '24 Hour Non-Burglary')},
+    '151ZZZ': {'1': ('A', 'Gas Detected')},
+    '152ZZZ': {'1': ('A', 'Refrigeration')},
+    '153ZZZ': {'1': ('A', 'Loss of Heat')},
+    '154ZZZ': {'1': ('A', 'Water Leakage')},
+    '155ZZZ': {'1': ('A', 'Foil Break')},
+    '156ZZZ': {'1': ('MA', 'Day Trouble')},
+    '157ZZZ': {'1': ('MA', 'Low Bottled Gas Level')},
+    '158ZZZ': {'1': ('A', 'High Temperature')},
+    '159ZZZ': {'1': ('A', 'Low Temperature')},
+    '161ZZZ': {'1': ('A', 'Loss of Air Flow')},
+    '162ZZZ': {'1': ('A', 'Carbon Monoxide Detected')},
+    '163ZZZ': {'1': ('MA', 'Tank Level')},
+
+    # Fire Supervisory
+    '200ZZZ': {'1': ('A', 'Fire Supervisory')},
+    '201ZZZ': {'1': ('MA', 'Low Water Pressure')},
+    '202ZZZ': {'1': ('MA', 'Low CO2')},
+    '203ZZZ': {'1': ('MA', 'Gate Valve Sensor')},
+    '204ZZZ': {'1': ('MA', 'Low Water Level')},
+    '205ZZZ': {'1': ('MA', 'Pump Activated')},
+    '206ZZZ': {'1': ('MA', 'Pump Failure')},
+
+    # System Troubles
+    '300000': {'1': ('MA', 'System Trouble')},
+    '301000': {'1': ('MA', 'AC Loss')},
+    '302000': {'1': ('MA', 'Low System Battery')},
+    '303000': {'1': ('MA', 'RAM Checksum Bad')},
+    '304000': {'1': ('MA', 'ROM Checksum Bad')},
+    '305000': {'1': ('MA', 'System Reset')},
+    '306000': {'1': ('MA', 'Panel Programming Changed')},
+    '307000': {'1': ('MA', 'Self-Test Failure')},
+    '308000': {'1': ('MA', 'System Shutdown')},
+    '309000': {'1': ('MA', 'Battery Test Failure')},
+    '310000': {'1': ('MA', 'Ground Fault')},
+    '311000': {'1': ('MA', 'Battery Missing/Dead')},
+    '312000': {'1': ('MA', 'Power Supply Overcurrent')},
+    '313UUU': {'1': ('E', 'Engineer Reset')},
+
+    # Sounder / Relay Troubles
+    '320000': {'1': ('MA', 'Sounder/Relay Trouble')},
+    '321000': {'1': ('MA', 'Bell 1 Trouble')},
+    '322000': {'1': ('MA', 'Bell 2 Trouble')},
+    '323000': {'1': ('MA', 'Alarm Relay Trouble')},
+    '324000': {'1': ('MA', 'Trouble Relay Trouble')},
+    '325000': {'1': ('MA', 'Reversing Relay Trouble')},
+
+    # System Peripheral Troubles
+    '330ZZZ': {'1': ('MA', 'System Peripheral Trouble')},
+    '331ZZZ': {'1': ('MA', 'Polling Loop Open')},
+    '332ZZZ': {'1': ('MA', 'Polling Loop Short')},
+    '333ZZZ': {'1': ('MA', 'Expansion Module Failure')},
+    '334ZZZ': {'1': ('MA', 'Repeater Failure')},
+    '335000': {'1': ('MA', 'Local Printer Out of Paper')},
+    '336000': {'1': ('MA', 'Local Printer Failure')},
+    '337ZZZ': {'1': ('MA', 'Expansion Module DC Loss')},
+    '338ZZZ': {'1': ('MA', 'Expansion Module Low Battery')},
+    '339ZZZ': {'1': ('MA', 'Expansion Module Reset')},
+    '341ZZZ': {'1': ('T', 'Expansion Module Tamper')},
+    '342ZZZ': {'1': ('MA', 'Expansion Module AC Loss')},
+    '343ZZZ': {'1': ('MA', 'Expansion Module Self-Test Failure')},
+    '344ZZZ': {'1': ('MA', 'RF Receiver Jam Detect')},
+
+    # Communication Troubles
+    '350000': {'1': ('MA', 'Communication Trouble')},
+    '351000': {'1': ('MA', 'Telco 1 Fault')},
+    '352000': {'1': ('MA', 'Telco 2 Fault')},
+    '353000': {'1': ('MA', 'Long Range Radio Trouble')},
+    '354000': {'1': ('MA', 'Failure to Communicate')},
+    '355000': {'1': ('MA', 'Loss of Radio Supervision')},
+    '356000': {'1': ('MA', 'Loss of Central Polling')},
+
+    # Protection Loop Troubles
+    '370ZZZ': {'1': ('MA', 'Protection Loop Trouble')},
+    '371ZZZ': {'1': ('MA', 'Protection Loop Open')},
+    '372ZZZ': {'1': ('MA', 'Protection Loop Short')},
+    '373ZZZ': {'1': ('MA', 'Fire Trouble')},
+    '374ZZZ': {'1': ('A', 'Exit Error Alarm')},
+    '375ZZZ': {'1': ('MA', 'Panic Zone Trouble')},
+    '376ZZZ': {'1': ('MA', 'Hold-Up Zone Trouble')},
+    '377ZZZ': {'1': ('MA', 'Swinger Trouble')},
+    '378ZZZ': {'1': ('MA', 'Cross-Zone Trouble')},
+
+    # Sensor Troubles
+    '380ZZZ': {'1': ('MA', 'Sensor Trouble')},
+    '381ZZZ': {'1': ('MA', 'Loss of RF Supervision')},
+    '382ZZZ': {'1': ('MA', 'Loss of RPM Supervision')},
+    '383ZZZ': {'1': ('T', 'Sensor Tamper')},
+    '384ZZZ': {'1': ('MA', 'RF Low Battery')},
+    '385ZZZ': {'1': ('MA', 'Smoke Detector High Sensitivity')},
+    '386ZZZ': {'1': ('MA', 'Smoke Detector Low Sensitivity')},
+    '387ZZZ': {'1': ('MA', 'Intrusion Detector High Sensitivity')},
+    '388ZZZ': {'1': ('MA', 'Intrusion Detector Low Sensitivity')},
+    '389ZZZ': {'1': ('MA', 'Sensor Self-Test Failure')},
+    '391ZZZ': {'1': ('MA', 'Sensor Watch Trouble')},
+    '392ZZZ': {'1': ('MA', 'Drift Compensation Error')},
+    '393ZZZ': {'1': ('MA', 'Maintenance Alert')},
+
+    # Open / Close
+    '400UUU': {'1': ('O', 'Disarmed'),
+               '3': ('C', 'Armed')},
+    '401UUU': {'1': ('O', 'Disarmed by User'),
+               '3': ('C', 'Armed by User')},
+    '402UUU': {'1': ('O', 'Group Disarmed'),
+               '3': ('C', 'Group Armed')},
+    '403UUU': {'1': ('O', 'Automatic Disarm'),
+               '3': ('C', 'Automatic Arm')},
+    '404UUU': {'1': ('O', 'Late to Disarm'),
+               '3': ('C', 'Late to Arm')},
+    '405UUU': {'1': ('E', 'Deferred Open/Close')},
+    '406UUU': {'1': ('E', 'Alarm Cancelled')},
+    '407UUU': {'1': ('O', 'Remote Disarm'),
+               '3': ('C', 'Remote Arm')},
+    '408UUU': {'1': ('O', 'Quick Disarm'),
+               '3': ('C', 'Quick Arm')},
+    '409UUU': {'1': ('O', 'Keyswitch Disarm'),
+               '3': ('C', 'Keyswitch Arm')},
+
+    # Remote Access
+    '411000': {'1': ('E', 'Callback Request Made')},
+    '412000': {'1': ('E', 'Successful Download/Access')},
+    '413000': {'1': ('MA', 'Unsuccessful Access')},
+    '414000': {'1': ('MA', 'System Shutdown Command Received')},
+    '415000': {'1': ('MA', 'Dialer Shutdown Command Received')},
+    '416000': {'1': ('E', 'Successful Upload')},
+
+    # Special Arming
+    '441UUU': {'1': ('O', 'Disarmed from Stay'),
+               '3': ('C', 'Armed Stay')},
+    '442UUU': {'1': ('O', 'Keyswitch Disarmed from Stay'),
+               '3': ('C', 'Keyswitch Armed Stay')},
+
+    # Open / Close Exceptions
+    '450UUU': {'1': ('E', 'Exception Open/Close')},
+    '451UUU': {'1': ('E', 'Early Open/Close')},
+    '452UUU': {'1': ('E', 'Late Open/Close')},
+    '453UUU': {'1': ('E', 'Failed to Open')},
+    '454UUU': {'1': ('E', 'Failed to Close')},
+    '455UUU': {'1': ('MA', 'Auto-Arm Failed')},
+    '456UUU': {'1': ('C', 'Partial Arm')},
+    '457UUU': {'1': ('E', 'Exit Error')},
+    '458UUU': {'1': ('E', 'User on Premises')},
+    '459UUU': {'1': ('A', 'Recent Close')},
+    '461ZZZ': {'1': ('T', 'Wrong Code Entry')},
+    '462UUU': {'1': ('E', 'Legal Code Entry')},
+    '463UUU': {'1': ('E', 'Re-arm After Alarm')},
+    '464UUU': {'1': ('E', 'Auto-Arm Time Extended')},
+    '465ZZZ': {'1': ('E', 'Panic Alarm Reset')},
+    '466UUU': {'1': ('E', 'Service On/Off Premises')},
+
+    # Bypasses
+    '570ZZZ': {'1': ('E', 'Zone Bypass')},
+    '571ZZZ': {'1': ('E', 'Fire Bypass')},
+    '572ZZZ': {'1': ('E', '24 Hour Zone Bypass')},
+    '573ZZZ': {'1': ('E', 'Burglary Bypass')},
+    '574UUU': {'1': ('E', 'Group Bypass')},
+    '575ZZZ': {'1': ('E', 'Swinger Bypass')},
+
+    # Test / Misc
+    '601000': {'1': ('E', 'Manual Trigger Test')},
+    '602000': {'1': ('E', 'Periodic Test')},
+    '603000': {'1': ('E', 'Periodic RF Transmission')},
+    '604UUU': {'1': ('E', 'Fire Test')},
+    '605000': {'1': ('E', 'Status Report to Follow')},
+    '606000': {'1': ('E', 'Listen-in to Follow')},
+    '607UUU': {'1': ('E', 'Walk Test Mode'),
+               '3': ('R', 'Walk Test Mode End')},
+    '608000': {'1': ('MA', 'Periodic Test - System Trouble Present')},
+    '609000': {'1': ('E', 'Video Transmitter Active')},
+    '611ZZZ': {'1': ('E', 'Point Tested OK')},
+    '612ZZZ': {'1': ('MA', 'Point Not Tested')},
+    '613ZZZ': {'1': ('E', 'Intrusion Zone Walk Tested')},
+    '614ZZZ': {'1': ('E', 'Fire Zone Walk Tested')},
+    '615ZZZ': {'1': ('E', 'Panic Zone Walk Tested')},
+    '616000': {'1': ('MA', 'Service Request')},
+
+    # Event Log
+    '621000': {'1': ('E', 'Event Log Reset')},
+    '622000': {'1': ('E', 'Event Log 50% Full')},
+    '623000': {'1': ('MA', 'Event Log 90% Full')},
+    '624000': {'1': ('MA', 'Event Log Overflow')},
+    '625UUU': {'1': ('E', 'Time/Date Reset')},
+    '626000': {'1': ('MA', 'Time/Date Inaccurate')},
+    '627000': {'1': ('MA', 'Program Mode Entry')},
+    '628000': {'1': ('MA', 'Program Mode Exit')},
+    '629000': {'1': ('E', '32 Hour Event Log Marker')},
+
+    # Scheduling
+    '630000': {'1': ('E', 'Schedule Change')},
+    '631000': {'1': ('E', 'Exception Schedule Change')},
+    '632000': {'1': ('E', 'Access Schedule Change')},
+
+    # Personnel Monitoring
+    '641000': {'1': ('E', 'Senior Watch Trouble')},
+    '642UUU': {'1': ('E', 'Latch-Key Supervision')},
+
+    # Misc
+    '654000': {'1': ('MA', 'System Inactivity')},
+}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import json
+import socket
+import sys
+import time
+
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.json_ipc import start_socket_client
+from alarm_central_station_receiver.contact_id import bulk
+from alarm_central_station_receiver.history import decode
+
+
+def alarmd_running():
+    try:
+        start_socket_client().close()
+        return True
+    except socket.error:
+        return False
+
+
+def decode_file(file_desc, line_panel):
+    """
+    :returns: number of codes decoded, and of those the number malformed
+              or with a bad checksum
+    """
+    count = 0
+    invalid = 0
+    records = bulk.decode_stream(bulk.read_codes(file_desc), line_panel)
+    for batch in bulk.batches(records):
+        sys.stdout.write(''.join('%s\n' % json.dumps(record)
+                                 for record in batch))
+        count += len(batch)
+        invalid += sum(1 for record in batch if not record['valid'])
+
+    return count, invalid
+
+
+def rewrite_history(line_panel):
+    # Imported here, AlarmStatus creates the data directory when loaded
+    from alarm_central_station_receiver.status import AlarmStatus
+
+    alarm = AlarmStatus()
+    history = alarm.history
+    counts = {'total': 0, 'changed': 0}
+
+    def redecoded(events):
+        for batch in bulk.batches(events):
+            counts['total'] += len(batch)
+            counts['changed'] += bulk.redecode_events(batch, line_panel)
+            for event in batch:
+                yield event
+
+    for name, _ in history.segments():
+        with history.open_segment(name) as file_desc:
+            history.rewrite_segment(name, redecoded(
+                decode(line) for line in file_desc))
+
+    history.rewrite(redecoded(history))
+    alarm.rebuild_zones()
+    alarm.rebuild_stats()
+    alarm.mark_dirty()
+    # There's no main loop to run a periodic sync
+    alarm.flush(sync=True)
+
+    return counts['total'], counts['changed']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='alarmd-decode',
+        description='Decode raw Contact ID codes in bulk, or re-decode the '
+                    'stored alarm history with the current configuration')
+    parser.add_argument('codes_file',
+                        nargs='?',
+                        default='-',
+                        help='File of raw codes, one per line, decoded as '
+                             'JSON lines to stdout.  Defaults to stdin')
+    parser.add_argument('-c', '--config',
+                        default='/etc/alarmd_config.ini',
+                        metavar='config_path',
+                        dest='config_path',
+                        help='Alarm config file path and filename')
+    parser.add_argument('--panel',
+                        help='Panel type for accounts without a '
+                             '[PanelProfiles] entry')
+    parser.add_argument('--rewrite-history',
+                        action='store_true',
+                        default=False,
+                        help='Re-decode the event descriptions in the alarm '
+                             'history and its archive in place.  alarmd '
+                             'must be stopped.')
+    args = parser.parse_args()
+
+    if not AlarmConfig.exists(args.config_path):
+        sys.stderr.write('Error: %s not found\n' % args.config_path)
+        return -1
+
+    AlarmConfig.load(args.config_path)
+    errors = AlarmConfig.validate()
+    if errors:
+        sys.stderr.write('Error: missing or invalid configuration in %s: %s\n'
+                         % (args.config_path, ', '.join(errors)))
+        return -1
+
+    start = time.time()
+
+    if args.rewrite_history:
+        if alarmd_running():
+            sys.stderr.write(
+                'Error: alarmd is running, stop it before rewriting history\n')
+            return -1
+
+        total, changed = rewrite_history(args.panel)
+        sys.stderr.write('Re-decoded %d events, %d changed in %.2fs\n' %
+                         (total, changed, time.time() - start))
+    else:
+        # Undecodable bytes become invalid codes rather than an error
+        if args.codes_file == '-':
+            sys.stdin.reconfigure(errors='replace')
+            count, invalid = decode_file(sys.stdin, args.panel)
+        else:
+            with open(args.codes_file, 'r', errors='replace') as file_desc:
+                count, invalid = decode_file(file_desc, args.panel)
+
+        sys.stderr.write('Decoded %d codes, %d invalid, in %.2fs\n' %
+                         (count, invalid, time.time() - start))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import time
+
+from collections import OrderedDict
+
+from alarm_central_station_receiver.singleton import Singleton
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.metrics import Metrics
+
+
+def zone_key(code):
+    """
+    The account, event code and zone of a Contact ID message, everything
+    identifying what it reports on but its qualifier
+    """
+    return (code[:4], code[7:10], code[12:15])
+
+
+@Singleton
+class DuplicateFilter(object):
+    """
+    Suppresses Contact ID messages the panel retransmits, or resends when
+    it redials after a failed call.
+
+    Messages are keyed on their account and raw code, and remembered for
+    `window_seconds`.  The index is insertion ordered, so expiring old
+    entries only ever looks at the front of it.  A message for the same
+    zone and event with a new qualifier, e.g. the restoral of an alarm,
+    forgets the zone's earlier messages, so a real re-alarm is passed on.
+    """
+
+    def __init__(self):
+        self.configure()
+        self.seen = OrderedDict()
+        # zone_key -> (qualifier, keys in seen)
+        self.zones = {}
+        self.suppressed = 0
+
+    def configure(self):
+        settings = AlarmConfig.settings
+        self.window = settings.get('Deduplication', 'window_seconds', 60)
+        self.max_entries = settings.get('Deduplication', 'max_entries', 1000)
+
+    def expire(self, now):
+        while self.seen:
+            seen_at = next(iter(self.seen.values()))
+            if now - seen_at < self.window and \
+                    len(self.seen) <= self.max_entries:
+                break
+
+            key, _ = self.seen.popitem(last=False)
+            zone = zone_key(key[1])
+            if zone in self.zones:
+                _, keys = self.zones[zone]
+                keys.discard(key)
+                if not keys:
+                    del self.zones[zone]
+
+    def forget_changed(self, code):
+        """
+        Forget the messages seen for the zone and event of `code`, if they
+        were sent with a different qualifier
+        """
+        zone = zone_key(code)
+        qualifier, keys = self.zones.get(zone, (code[6], ()))
+        if qualifier == code[6]:
+            return
+
+        for key in keys:
+            del self.seen[key]
+
+        del self.zones[zone]
+
+    def filter(self, raw_events):
+        """
+        Return `raw_events` with any already seen messages removed.  Only
+        messages with a valid checksum are deduplicated, a corrupted
+        message is always passed on.
+        """
+        if self.window <= 0:
+            return raw_events
+
+        now = time.monotonic()
+        self.expire(now)
+
+        unique_events = []
+        for code, valid in raw_events:
+            key = (code[:4], code)
+            # Too short to carry a qualifier, but may pass the checksum
+            tracked = valid and len(code) >= 15
+            if tracked:
+                self.forget_changed(code)
+
+            if valid and key in self.seen:
+                self.suppressed += 1
+                Metrics().duplicates_suppressed.inc()
+                logging.info('Suppressed duplicate message %s', code)
+                continue
+
+            if valid:
+                self.seen[key] = now
+                if tracked:
+                    _, keys = self.zones.setdefault(zone_key(code),
+                                                    (code[6], set()))
+                    keys.add(key)
+
+                self.expire(now)
+
+            unique_events.append((code, valid))
+
+        return unique_events
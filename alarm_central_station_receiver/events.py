@@ -14,13 +14,127 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import time
+import uuid
 
+from itertools import count
+from sys import intern
 
-def create_event(rtype, event, description, raw_code):
-    return {
-        'timestamp': time.time(),
-        'type': rtype,
-        'event': event,
-        'description': description,
-        'id': raw_code,
-    }
+FIELDS = ('timestamp', 'type', 'event', 'description', 'id', 'zone',
+          'trace_id')
+
+# Fields only some events carry, left out of their dicts when unset
+OPTIONAL_FIELDS = ('zone', 'trace_id')
+
+
+# Trace IDs are this process's random prefix and a count, unique across
+# restarts without the cost of a uuid4() per event
+TRACE_PREFIX = uuid.uuid4().hex[:6]
+TRACE_COUNTER = count(1)
+
+
+def new_trace_id():
+    """
+    Identifies an alarm call, or an event that didn't come from one.  The
+    events of a call are traced as '<call trace ID>-<n>'.
+    """
+    return '%s%06x' % (TRACE_PREFIX, next(TRACE_COUNTER))
+
+
+def call_trace_id(trace_id):
+    """
+    The trace ID of the call the event with `trace_id` came from
+    """
+    return trace_id.split('-', 1)[0]
+
+
+class Event(object):
+    """
+    A single alarm event.
+
+    Events live as long as the history does, so rather than a dict each
+    they use __slots__, with the strings interned so the same report type,
+    code and description are shared between events.  They still support
+    the dict style access the rest of alarmd uses, and are converted to
+    and from plain dicts when stored or sent over IPC.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, timestamp, rtype, event, description, raw_code,
+                 zone=None, trace_id=None):
+        self.timestamp = timestamp
+        self.type = intern(rtype)
+        self.event = intern(event)
+        self.description = intern(description)
+        self.id = intern(raw_code)
+        self.zone = intern(zone) if zone else None
+        # Unique to the event, so not interned.  Events from before trace
+        # IDs were added have none.
+        self.trace_id = trace_id
+
+    @classmethod
+    def from_dict(klass, data):
+        return klass(data['timestamp'],
+                     data['type'],
+                     data['event'],
+                     data['description'],
+                     data['id'],
+                     data.get('zone'),
+                     data.get('trace_id'))
+
+    def to_dict(self):
+        data = {
+            'timestamp': self.timestamp,
+            'type': self.type,
+            'event': self.event,
+            'description': self.description,
+            'id': self.id,
+        }
+        # Only zone events carry a zone number
+        if self.zone:
+            data['zone'] = self.zone
+
+        if self.trace_id:
+            data['trace_id'] = self.trace_id
+
+        return data
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+
+        if isinstance(value, str) and key != 'trace_id':
+            value = intern(value)
+
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS and (key not in OPTIONAL_FIELDS or
+                                  getattr(self, key) is not None)
+
+    def __repr__(self):
+        return 'Event(%r)' % self.to_dict()
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in FIELDS else default
+
+
+def to_json(obj):
+    """
+    `default` hook for json.dump, to serialize events as plain dicts
+    """
+    if isinstance(obj, Event):
+        return obj.to_dict()
+
+    raise TypeError('%r is not JSON serializable' % obj)
+
+
+def create_event(rtype, event, description, raw_code, zone=None,
+                 trace_id=None):
+    return Event(time.time(), rtype, event, description, raw_code, zone,
+                 trace_id or new_trace_id())
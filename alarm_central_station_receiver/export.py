@@ -0,0 +1,115 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import csv
+import io
+import logging
+import socket
+import threading
+import time
+
+from itertools import islice
+
+from alarm_central_station_receiver.events import FIELDS
+from alarm_central_station_receiver.history import encode, decode
+
+FORMATS = ['ndjson', 'csv']
+
+# Events encoded per write to the client
+CHUNK_EVENTS = 1000
+
+
+def in_range(events, start=None, end=None):
+    for event in events:
+        if (start is None or event['timestamp'] >= start) and \
+                (end is None or event['timestamp'] <= end):
+            yield event
+
+
+def encode_csv(events, header=False):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(FIELDS)
+
+    for event in events:
+        writer.writerow([event[field] for field in FIELDS])
+
+    return buf.getvalue().encode()
+
+
+def export_chunks(events, export_format):
+    """
+    Encode `events` in `export_format`, yielding a chunk of bytes per
+    CHUNK_EVENTS events
+    """
+    events = iter(events)
+    header = export_format == 'csv'
+    while True:
+        chunk = list(islice(events, CHUNK_EVENTS))
+        if not chunk and not header:
+            return
+
+        if export_format == 'csv':
+            yield encode_csv(chunk, header)
+            header = False
+        else:
+            yield b''.join(encode(event) for event in chunk)
+
+
+class ExportStream(threading.Thread):
+    """
+    Streams the whole history, archive first then the live history, oldest
+    first, to an IPC client and closes the connection.  Runs apart from
+    the main loop so a large export doesn't hold up alarm calls.
+    """
+
+    def __init__(self, conn, history, export_format, start=None, end=None):
+        super(ExportStream, self).__init__(name='export')
+        self.daemon = True
+        self.conn = conn
+        self.history = history
+        self.export_format = export_format
+        self.start_time = start
+        self.end_time = end
+
+    def chunks(self):
+        if self.export_format == 'ndjson' and \
+                self.start_time is None and self.end_time is None:
+            # Stored the same way, no need to decode
+            lines = self.history.all_lines()
+            while True:
+                chunk = b''.join(islice(lines, CHUNK_EVENTS))
+                if not chunk:
+                    return
+
+                yield chunk
+
+        events = (decode(line) for line in self.history.all_lines())
+        events = in_range(events, self.start_time, self.end_time)
+        for chunk in export_chunks(events, self.export_format):
+            yield chunk
+
+    def run(self):
+        start = time.time()
+        try:
+            for chunk in self.chunks():
+                self.conn.sendall(chunk)
+
+            logging.info('History exported in %.2fs', time.time() - start)
+        except (socket.error, IOError, OSError) as exc:
+            logging.error('History export failed: %s', str(exc))
+        finally:
+            self.conn.close()
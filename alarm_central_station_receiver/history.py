@@ -0,0 +1,620 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import gzip
+import json
+import logging
+import lzma
+import re
+import threading
+import time
+
+from array import array
+from datetime import datetime
+from os import path, remove, fsync, fstat, listdir, makedirs, \
+    open as os_open, close, O_RDONLY
+from itertools import islice
+from shutil import move, copyfileobj
+
+from alarm_central_station_receiver.events import Event
+
+
+def fsync_file(file_path):
+    if not path.isfile(file_path):
+        return
+
+    with open(file_path, 'rb') as file_desc:
+        fsync(file_desc.fileno())
+
+
+def fsync_dir(file_path):
+    """
+    fsync the directory holding `file_path`, so a rename into it is durable
+    """
+    dir_fd = os_open(path.dirname(path.abspath(file_path)), O_RDONLY)
+    try:
+        fsync(dir_fd)
+    finally:
+        close(dir_fd)
+
+
+# Archive segment compression, by config name: (file suffix, opener)
+ARCHIVE_FORMATS = {
+    'gzip': ('gz', gzip.open),
+    'lzma': ('xz', lzma.open),
+}
+
+# Events encoded per write when the history is rewritten
+WRITE_BATCH = 10000
+
+# alarmd.history.<archived at>.<event count>.<suffix>
+SEGMENT_NAME = re.compile(r'^alarmd\.history\.(\d{8}-\d{12})\.(\d+)\.(gz|xz)$')
+
+
+def encode(event):
+    return (json.dumps(event.to_dict(), sort_keys=True) + '\n').encode()
+
+
+def decode(line):
+    return Event.from_dict(json.loads(line.decode()))
+
+
+class EventHistory(object):
+    """
+    The event history, kept on disk with one JSON encoded event per line,
+    oldest first.
+
+    Nothing is read when alarmd starts.  The first query builds an index
+    of the offset of each line, after which any page of the history is
+    read straight from the file.  New events are held in `pending` until
+    `flush()` appends them to the file, and to the index once it exists.
+
+    Events expired by the retention policy are moved by `compact()` into
+    compressed archive segments in `archive_dir`.  Queries that page past
+    the live history carry on into the segments, newest first.
+
+    `compact()` runs in the compactor thread, `lock` is held wherever the
+    live file or index change.
+
+    `generation` counts the times the live file was replaced, by
+    `rewrite()` or `compact()`.  Anything holding a position in the file,
+    like the search index, is stale once it changes.  When compaction only
+    archives the oldest events, the generation stays the same and
+    `trimmed` and `trimmed_bytes` count the events and bytes taken off the
+    start of the file instead.  Positions counted from the start of the
+    generation, rather than the file, hold across those compactions.  All
+    three are kept next to the file in <file>.generation.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.generation_path = '.'.join([file_path, 'generation'])
+        self.generation, self.trimmed, self.trimmed_bytes = \
+            self.read_generation()
+        self.archive_dir = path.join(path.dirname(file_path), 'archive')
+        self.offsets = None
+        self.end = 0
+        self.pending = []
+        # Set while events are written to the file but not yet fsynced
+        self.unsynced = False
+        self.lock = threading.RLock()
+        self.flush_callbacks = []
+
+    def read_generation(self):
+        """
+        :returns: generation, and the events and bytes trimmed from the
+                  start of the live file in it
+        """
+        try:
+            with open(self.generation_path, 'r') as file_desc:
+                values = [int(value) for value in file_desc.read().split()]
+        except (IOError, ValueError):
+            values = []
+
+        return tuple((values + [0, 0, 0])[:3])
+
+    def write_generation(self, generation, trimmed, trimmed_bytes):
+        tmp_path = '.'.join([self.generation_path, 'tmp'])
+        with open(tmp_path, 'w') as file_desc:
+            file_desc.write('%d %d %d\n' % (generation, trimmed,
+                                              trimmed_bytes))
+            file_desc.flush()
+            fsync(file_desc.fileno())
+
+        move(tmp_path, self.generation_path)
+        fsync_dir(self.generation_path)
+
+    def next_generation(self):
+        """
+        Count a replacement of the live file.  Saved before the file is
+        replaced, a crash in between only costs a needless rebuild.
+        """
+        self.write_generation(self.generation + 1, 0, 0)
+        self.generation += 1
+        self.trimmed = 0
+        self.trimmed_bytes = 0
+
+    def load_index(self):
+        with self.lock:
+            self.flush()
+            if self.offsets is not None:
+                return
+
+            start = time.time()
+            self.offsets = array('Q')
+            self.end = 0
+            if path.isfile(self.file_path):
+                with open(self.file_path, 'rb') as file_desc:
+                    for line in file_desc:
+                        self.offsets.append(self.end)
+                        self.end += len(line)
+
+        logging.info('Indexed %d history events in %.3fs',
+                     len(self.offsets), time.time() - start)
+
+    def __len__(self):
+        self.load_index()
+        return len(self.offsets)
+
+    def __iter__(self):
+        """
+        Stream the live events, oldest first
+        """
+        return (decode(line) for line in self.lines())
+
+    def lines(self):
+        """
+        Stream the encoded live events, oldest first
+        """
+        with self.lock:
+            self.flush()
+            if not path.isfile(self.file_path):
+                return
+
+            # Still readable if compact() replaces the file meanwhile
+            file_desc = open(self.file_path, 'rb')
+
+        with file_desc:
+            for line in file_desc:
+                yield line
+
+    def events_after(self, end):
+        """
+        Stream the live events after the first `end` bytes of the file
+        """
+        with self.lock:
+            self.flush()
+            if not path.isfile(self.file_path):
+                return
+
+            file_desc = open(self.file_path, 'rb')
+
+        with file_desc:
+            file_desc.seek(end)
+            for line in file_desc:
+                yield decode(line)
+
+    def latest(self, offset, limit):
+        """
+        Returns up to `limit` events, newest first, skipping the `offset`
+        newest events.  Archived events follow the live history.
+        """
+        events = []
+        with self.lock:
+            self.load_index()
+            live = len(self.offsets)
+            first = live - offset - 1
+            last = max(first - limit, -1)
+
+            if first >= 0:
+                with open(self.file_path, 'rb') as file_desc:
+                    for index in range(first, last, -1):
+                        file_desc.seek(self.offsets[index])
+                        events.append(decode(file_desc.readline()))
+
+        if len(events) < limit:
+            events.extend(self.latest_archived(max(offset - live, 0),
+                                               limit - len(events)))
+
+        return events
+
+    def events_at(self, positions):
+        """
+        The live events at each of `positions`
+        """
+        events = []
+        if not positions:
+            return events
+
+        with self.lock:
+            self.load_index()
+            with open(self.file_path, 'rb') as file_desc:
+                for position in positions:
+                    file_desc.seek(self.offsets[position])
+                    events.append(decode(file_desc.readline()))
+
+        return events
+
+    def segments(self):
+        """
+        Returns (file name, event count) of each archive segment, newest
+        first
+        """
+        if not path.isdir(self.archive_dir):
+            return []
+
+        found = []
+        for name in listdir(self.archive_dir):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                found.append((name, int(match.group(2))))
+
+        return sorted(found, reverse=True)
+
+    def open_segment(self, name):
+        opener = dict(ARCHIVE_FORMATS.values())[name.rsplit('.', 1)[1]]
+        return opener(path.join(self.archive_dir, name), 'rb')
+
+    def latest_archived(self, offset, limit):
+        events = []
+        for name, count in self.segments():
+            if offset >= count:
+                offset -= count
+                continue
+
+            # Streamed up to the page, only the page is kept
+            first = count - offset - 1
+            last = max(first - (limit - len(events)), -1)
+            with self.open_segment(name) as file_desc:
+                lines = list(islice(file_desc, last + 1, first + 1))
+
+            for line in reversed(lines):
+                events.append(decode(line))
+
+            offset = 0
+            if len(events) >= limit:
+                break
+
+        return events
+
+    def archived(self):
+        """
+        Stream the archived events, oldest segment first
+        """
+        return (decode(line) for line in self.archived_lines())
+
+    def archived_lines(self):
+        for name, _ in reversed(self.segments()):
+            with self.open_segment(name) as file_desc:
+                for line in file_desc:
+                    yield line
+
+    def all_lines(self):
+        """
+        Stream every encoded event, archive first then the live history,
+        oldest first
+        """
+        return self.snapshot()[2]
+
+    def snapshot(self, archived=True):
+        """
+        Take the archive segments and the live file as they are now, to
+        stream their events later.  They're taken together, so events
+        compacted meanwhile are neither missed nor repeated.
+
+        :returns: generation, the end of the live file in bytes from the
+                  start of the generation, and a generator of the encoded
+                  events, oldest first
+        """
+        with self.lock:
+            self.flush()
+            segments = self.segments() if archived else []
+            end = 0
+            file_desc = None
+            if path.isfile(self.file_path):
+                # Still readable if compact() replaces the file meanwhile
+                file_desc = open(self.file_path, 'rb')
+                end = fstat(file_desc.fileno()).st_size
+
+            generation = self.generation
+            trimmed_bytes = self.trimmed_bytes
+
+        return generation, trimmed_bytes + end, \
+            self.snapshot_lines(segments, file_desc, end)
+
+    def snapshot_lines(self, segments, file_desc, end):
+        try:
+            for name, _ in reversed(segments):
+                with self.open_segment(name) as segment:
+                    for line in segment:
+                        yield line
+
+            if file_desc is not None:
+                while file_desc.tell() < end:
+                    yield file_desc.readline()
+        finally:
+            if file_desc is not None:
+                file_desc.close()
+
+    def append(self, event):
+        with self.lock:
+            self.pending.append(encode(event))
+
+    def flush(self, sync=False):
+        """
+        Append the pending events to the file in one write.  With `sync`
+        the file is fsynced, including events flushed earlier without it,
+        e.g. by the export or compactor threads.
+        """
+        with self.lock:
+            if not self.pending:
+                if sync and self.unsynced:
+                    fsync_file(self.file_path)
+                    self.unsynced = False
+
+                return
+
+            with open(self.file_path, 'ab') as file_desc:
+                start = self.trimmed_bytes + file_desc.tell()
+                file_desc.write(b''.join(self.pending))
+                if sync:
+                    file_desc.flush()
+                    fsync(file_desc.fileno())
+
+            self.unsynced = not sync
+
+            if self.offsets is not None:
+                for line in self.pending:
+                    self.offsets.append(self.end)
+                    self.end += len(line)
+
+            lines, self.pending = self.pending, []
+            for callback in self.flush_callbacks:
+                callback(lines, start)
+
+    def on_flush(self, callback):
+        """
+        Call `callback(lines, start)` with the encoded events each flush
+        appends, and where they start in bytes from the start of the
+        generation.  Called with `lock` held.
+        """
+        self.flush_callbacks.append(callback)
+
+    def rewrite(self, events):
+        """
+        Replace the history with the `events` iterable, which may be
+        streamed from this history.  Always synced.
+        """
+        with self.lock:
+            self.flush()
+            tmp_path = '.'.join([self.file_path, 'tmp'])
+            try:
+                with open(tmp_path, 'wb') as file_desc:
+                    events = iter(events)
+                    while True:
+                        batch = [encode(event)
+                                 for event in islice(events, WRITE_BATCH)]
+                        if not batch:
+                            break
+
+                        file_desc.write(b''.join(batch))
+
+                    file_desc.flush()
+                    fsync(file_desc.fileno())
+
+                self.next_generation()
+                move(tmp_path, self.file_path)
+                fsync_dir(self.file_path)
+                self.unsynced = False
+            finally:
+                if path.isfile(tmp_path):
+                    remove(tmp_path)
+
+            self.offsets = None
+
+    def rewrite_segment(self, name, events):
+        """
+        Replace archive segment `name` with the `events` iterable, which
+        may be streamed from the segment.  The event count in its name
+        must stay the same.  Always synced.
+        """
+        segment_path = path.join(self.archive_dir, name)
+        tmp_path = '.'.join([segment_path, 'tmp'])
+        opener = dict(ARCHIVE_FORMATS.values())[name.rsplit('.', 1)[1]]
+        try:
+            with opener(tmp_path, 'wb') as file_desc:
+                events = iter(events)
+                while True:
+                    batch = [encode(event)
+                             for event in islice(events, WRITE_BATCH)]
+                    if not batch:
+                        break
+
+                    file_desc.write(b''.join(batch))
+
+            fsync_file(tmp_path)
+            move(tmp_path, segment_path)
+            fsync_dir(segment_path)
+        finally:
+            if path.isfile(tmp_path):
+                remove(tmp_path)
+
+    def read_lines(self, end):
+        """
+        The encoded live events in the first `end` bytes of the file
+        """
+        with open(self.file_path, 'rb') as file_desc:
+            while file_desc.tell() < end:
+                yield file_desc.readline()
+
+    def compact(self, select, compression='gzip'):
+        """
+        Move the live events picked by `select` into a new archive segment.
+
+        `select` is given the live events, oldest first, and returns a
+        flag for each, true to archive it.  The live file is only locked
+        while the events appended since compaction started are copied
+        over.  The segment is written before the live file is replaced, a
+        crash in between leaves events in both rather than losing them.
+
+        When only the oldest events are archived the file is trimmed, and
+        the generation is kept.  It's bumped on disk while the file is
+        replaced, so a crash in between still costs a rebuild rather than
+        leaving positions in the file off.
+
+        :returns: number of events archived
+        """
+        with self.lock:
+            self.flush()
+            if not path.isfile(self.file_path):
+                return 0
+
+            end = path.getsize(self.file_path)
+
+        flags = select(decode(line) for line in self.read_lines(end))
+        count = sum(flags)
+        if not count:
+            return 0
+
+        trim = all(flags[:count])
+        removed_bytes = 0
+
+        suffix, opener = ARCHIVE_FORMATS[compression]
+        if not path.exists(self.archive_dir):
+            makedirs(self.archive_dir, mode=0o755)
+
+        segment_path = path.join(self.archive_dir, 'alarmd.history.%s.%d.%s' % (
+            datetime.now().strftime('%Y%m%d-%H%M%S%f'), count, suffix))
+        segment_tmp = '.'.join([segment_path, 'tmp'])
+        live_tmp = '.'.join([self.file_path, 'compact'])
+        try:
+            with opener(segment_tmp, 'wb') as segment, \
+                    open(live_tmp, 'wb') as live:
+                for line, expired in zip(self.read_lines(end), flags):
+                    if expired:
+                        segment.write(line)
+                        removed_bytes += len(line)
+                    else:
+                        live.write(line)
+
+            fsync_file(segment_tmp)
+
+            with self.lock:
+                # The segment appears with the live file's replacement,
+                # for snapshot()
+                move(segment_tmp, segment_path)
+                fsync_dir(segment_path)
+                self.flush()
+                with open(self.file_path, 'rb') as file_desc, \
+                        open(live_tmp, 'ab') as live:
+                    file_desc.seek(end)
+                    copyfileobj(file_desc, live)
+                    live.flush()
+                    fsync(live.fileno())
+
+                if trim:
+                    self.write_generation(self.generation + 1, 0, 0)
+                else:
+                    self.next_generation()
+
+                move(live_tmp, self.file_path)
+                fsync_dir(self.file_path)
+                self.unsynced = False
+                if trim:
+                    self.trimmed += count
+                    self.trimmed_bytes += removed_bytes
+                    self.write_generation(self.generation, self.trimmed,
+                                          self.trimmed_bytes)
+                    if self.offsets is not None:
+                        self.offsets = array('Q', (
+                            offset - removed_bytes
+                            for offset in self.offsets[count:]))
+                        self.end -= removed_bytes
+                else:
+                    self.offsets = None
+        finally:
+            for tmp_path in [segment_tmp, live_tmp]:
+                if path.isfile(tmp_path):
+                    remove(tmp_path)
+
+        logging.info('Archived %d history events to %s', count, segment_path)
+        return count
+
+
+class Replay(threading.Thread):
+    """
+    Builds state from a snapshot of the history in the background, so
+    alarmd doesn't wait on reading the whole history to start.
+
+    The state starts as `new()`, and `apply(state, event)` adds each event
+    to it.  Events added while the snapshot is replayed are held back by
+    `hold()`, and applied after it.  `finish(state)` is then called with
+    `lock` held, so nothing is added until it returns.
+    """
+
+    def __init__(self, name, history, new, apply, finish, archived=False):
+        super(Replay, self).__init__(name=name)
+        self.daemon = True
+        self.new = new
+        self.apply = apply
+        self.finish = finish
+        self.lock = threading.Lock()
+        self.backlog = []
+        self.done = False
+        self.generation, self.end, self.lines = history.snapshot(archived)
+
+    def hold(self, event):
+        """
+        Hold back `event` until the snapshot is replayed.
+
+        :returns: False once it's been replayed, the event is then the
+                  caller's to apply
+        """
+        with self.lock:
+            if not self.done:
+                self.backlog.append(event)
+
+            return not self.done
+
+    def wait(self):
+        """
+        Wait for the replay to finish, if it's running in the background
+        """
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        start = time.time()
+        state = self.new()
+        count = 0
+        try:
+            for line in self.lines:
+                self.apply(state, decode(line))
+                count += 1
+        except (IOError, OSError, ValueError) as exc:
+            # Carry on with what was read, rather than never being ready
+            logging.error('Unable to replay the history for the %s: %s',
+                          self.name, str(exc))
+
+        with self.lock:
+            for event in self.backlog:
+                self.apply(state, event)
+
+            self.backlog = []
+            self.finish(state)
+            self.done = True
+
+        logging.info('Replayed %d history events for the %s in %.2fs',
+                     count, self.name, time.time() - start)
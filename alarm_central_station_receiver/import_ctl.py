@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import argparse
+import gzip
+import heapq
+import re
+import sys
+import time
+
+from collections import Counter
+
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.decode_ctl import alarmd_running
+from alarm_central_station_receiver.events import Event
+
+# Lines written by status.log_event, e.g.
+# Jun 01 18 01:02:03 PM alarmd[123]: [status.INFO] A: Zone Alarm Door (001)
+EVENT_LINE = re.compile(
+    r'^(?P<date>\w{3} \d{2} \d{2}) (?P<hour>\d{2}):(?P<minute>\d{2}):'
+    r'(?P<second>\d{2}) (?P<ampm>[AP]M) alarmd\[\d+\]: \[status\.INFO\] '
+    r'(?P<type>[A-Z]{1,2}): (?P<description>.*?)'
+    r'(?: - Automatic event, skipping notification)? ?$')
+
+ZONE = re.compile(r'\((\d{3})\)$')
+
+MONTHS = dict((month, index + 1) for index, month in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']))
+
+
+class LogClock(object):
+    """
+    Converts the log's local time stamps to epoch seconds.  Only the start
+    of each hour goes through mktime, log lines come in runs of the same
+    hour.
+    """
+
+    def __init__(self):
+        self.hours = {}
+
+    def timestamp(self, date, hour, minute, second, ampm):
+        hour = int(hour) % 12 + (12 if ampm == 'PM' else 0)
+        key = (date, hour)
+        start = self.hours.get(key)
+        if start is None:
+            month, day, year = date.split(' ')
+            start = self.hours[key] = time.mktime(
+                (2000 + int(year), MONTHS[month], int(day), hour, 0, 0,
+                 0, 0, -1))
+
+        return start + int(minute) * 60 + int(second)
+
+
+def open_log(log_path):
+    with open(log_path, 'rb') as file_desc:
+        gzipped = file_desc.read(2) == b'\x1f\x8b'
+
+    if gzipped:
+        return gzip.open(log_path, 'rt', errors='replace')
+
+    return open(log_path, 'r', errors='replace')
+
+
+def parse_log(log_path, clock):
+    """
+    Yields the events logged in `log_path`, oldest first
+    """
+    with open_log(log_path) as file_desc:
+        for line in file_desc:
+            if '[status.INFO] ' not in line:
+                continue
+
+            match = EVENT_LINE.match(line.rstrip('\n'))
+            if not match:
+                continue
+
+            description = match.group('description')
+            zone = ZONE.search(description)
+            yield Event(clock.timestamp(match.group('date'),
+                                        match.group('hour'),
+                                        match.group('minute'),
+                                        match.group('second'),
+                                        match.group('ampm')),
+                        match.group('type'),
+                        '',
+                        description,
+                        '',
+                        zone.group(1) if zone else None)
+
+
+def event_key(event):
+    return int(event['timestamp']), event['type'], event['description']
+
+
+def present_key(present, event):
+    """
+    The key `event` is counted under in `present`, or None.  An event's
+    time is taken when decoded and its log line's when logged, which may
+    be the next second, so keys a second either side match too.
+    """
+    second, report_type, description = event_key(event)
+    for offset in [0, -1, 1]:
+        key = (second + offset, report_type, description)
+        if present[key]:
+            return key
+
+    return None
+
+
+def new_events(events, present, counts):
+    """
+    Drop `events` already in the history, `present` counts the history's
+    events by key.
+    """
+    for event in events:
+        key = present_key(present, event)
+        if key is not None:
+            present[key] -= 1
+            counts['duplicate'] += 1
+            continue
+
+        counts['imported'] += 1
+        yield event
+
+
+def import_logs(log_paths, dry_run=False):
+    # Imported here, AlarmStatus creates the data directory when loaded
+    from alarm_central_station_receiver.status import AlarmStatus
+
+    alarm = AlarmStatus()
+    alarm.wait_ready()
+    present = Counter(event_key(event) for event in alarm.history)
+    present.update(event_key(event) for event in alarm.history.archived())
+
+    clock = LogClock()
+    counts = Counter()
+    imported = new_events(
+        heapq.merge(*[parse_log(log_path, clock) for log_path in log_paths],
+                    key=lambda event: event['timestamp']),
+        present, counts)
+
+    if dry_run:
+        for _ in imported:
+            pass
+
+        return counts
+
+    # Merge by time with the history, written out in batches in one pass.
+    # The imported events are added to the statistics, and to the zone
+    # table unless it has a newer state for the zone.
+    def merged(events):
+        for event in events:
+            zone = alarm.zones.get(event['zone'])
+            if not zone or zone['timestamp'] <= event['timestamp']:
+                alarm.update_zone(event)
+
+            alarm.stats.add(event)
+            yield event
+
+    alarm.history.rewrite(heapq.merge(
+        merged(imported), alarm.history,
+        key=lambda event: event['timestamp']))
+    alarm.mark_dirty()
+    # There's no main loop to run a periodic sync
+    alarm.flush(sync=True)
+    alarm.stats.save()
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='alarmd-import',
+        description='Import the events logged in alarmd.log into the alarm '
+                    'history.  Events already in the history are skipped.')
+    parser.add_argument('log_files',
+                        nargs='*',
+                        default=['/var/log/alarmd.log'],
+                        help='alarmd logs to import, rotated and gzipped logs '
+                             'included.  Defaults to /var/log/alarmd.log')
+    parser.add_argument('-c', '--config',
+                        default='/etc/alarmd_config.ini',
+                        metavar='config_path',
+                        dest='config_path',
+                        help='Alarm config file path and filename')
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        default=False,
+                        help='Count the events that would be imported')
+    args = parser.parse_args()
+
+    if not AlarmConfig.exists(args.config_path):
+        sys.stderr.write('Error: %s not found\n' % args.config_path)
+        return -1
+
+    AlarmConfig.load(args.config_path)
+    errors = AlarmConfig.validate()
+    if errors:
+        sys.stderr.write('Error: missing or invalid configuration in %s: %s\n'
+                         % (args.config_path, ', '.join(errors)))
+        return -1
+
+    if not args.dry_run and alarmd_running():
+        sys.stderr.write('Error: alarmd is running, stop it before importing\n')
+        return -1
+
+    start = time.time()
+    counts = import_logs(args.log_files, args.dry_run)
+    sys.stderr.write('%s %d events, skipped %d already present in %.2fs\n' %
+                     ('Found' if args.dry_run else 'Imported',
+                      counts['imported'], counts['duplicate'],
+                      time.time() - start))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
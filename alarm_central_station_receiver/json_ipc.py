@@ -17,8 +17,13 @@ import socket
 import json
 import os
 
+from alarm_central_station_receiver.events import to_json
+
 SOCKFILE = "/tmp/alarm_socket"
 
+# Messages are framed with their length in 5 digits
+MAX_MESSAGE = 99999
+
 
 class ServerSock(object):
     def __init__(self):
@@ -50,6 +55,40 @@ def send_client_msg(request):
     return rsp, serr
 
 
+def send_client_stream(request):
+    """
+    Send a request whose response is followed by a stream of data.
+
+    :returns: response, generator of the streamed chunks, and an error
+              message when alarmd couldn't be reached
+    """
+    try:
+        s = start_socket_client()
+        send(s, request)
+        rsp = recv(s)
+    except socket.error as exc:
+        serr = 'Exception: %s\nUnable to open socket, is alarmd running?' % exc
+        return None, None, serr
+
+    if rsp.get('error'):
+        s.close()
+        return rsp, None, None
+
+    return rsp, recv_stream(s), None
+
+
+def recv_stream(sock, chunk_size=65536):
+    try:
+        while True:
+            chunk = sock.recv(chunk_size)
+            if not chunk:
+                return
+
+            yield chunk
+    finally:
+        sock.close()
+
+
 def start_socket_client():
     s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -58,7 +97,14 @@ def start_socket_client():
 
 
 def send(sock, obj):
-    msg = json.dumps(obj)
+    """
+    :raises ValueError: if the encoded message is longer than MAX_MESSAGE
+    """
+    msg = json.dumps(obj, default=to_json)
+    if len(msg) > MAX_MESSAGE:
+        raise ValueError('Message of %d bytes is too long to send, the most '
+                         'is %d' % (len(msg), MAX_MESSAGE))
+
     packet = '%05d%s' % (len(msg), msg)
     sock.sendall(packet.encode())
 
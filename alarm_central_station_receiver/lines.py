@@ -0,0 +1,197 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import os
+import threading
+import time
+
+from queue import Queue, Empty
+
+from alarm_central_station_receiver import tigerjet
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.contact_id import handshake, callup
+from alarm_central_station_receiver.timing import CallTimer
+from alarm_central_station_receiver.logs import log_context
+from alarm_central_station_receiver.metrics import Metrics
+
+
+class CallQueue(object):
+    """
+    Hands the codes collected by each phone line over to the main loop.
+
+    Every call written to the queue also writes a byte to a pipe, so the
+    queue can be waited on with select() next to the control socket.
+    """
+
+    def __init__(self):
+        self.calls = Queue()
+        self.read_fd = None
+        self.write_fd = None
+
+    def __enter__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+    def fileno(self):
+        return self.read_fd
+
+    def put(self, line, raw_events, timer):
+        self.calls.put((line, raw_events, timer))
+        os.write(self.write_fd, b'\0')
+
+    def get_all(self):
+        os.read(self.read_fd, 4096)
+        calls = []
+        while True:
+            try:
+                calls.append(self.calls.get_nowait())
+            except Empty:
+                return calls
+
+
+def count_call(line_name, timer, raw_events):
+    metrics = Metrics()
+    if timer.has_phase('call_in_validated'):
+        metrics.calls_answered.inc(line=line_name)
+
+    if raw_events:
+        metrics.messages_received.inc(len(raw_events), line=line_name)
+
+    failures = sum(1 for _, valid in raw_events if not valid)
+    if failures:
+        metrics.checksum_failures.inc(failures, line=line_name)
+
+
+class SimulatedLine(object):
+    """
+    Where calls injected into alarmd --simulate come from
+    """
+    line_name = 'simulated'
+    account = None
+    panel = None
+
+
+class PhoneLine(threading.Thread):
+    """
+    Answers the alarm calls coming in on a single TigerJet.  Each line
+    runs in its own thread so that a call on one line never holds up
+    another.
+    """
+
+    def __init__(self, name, tj_id, phone_number, account, panel, calls):
+        super(PhoneLine, self).__init__(name='line-%s' % name)
+        self.daemon = True
+        self.line_name = name
+        self.tj_id = tj_id
+        self.phone_number = phone_number
+        self.account = account
+        self.panel = panel
+        self.calls = calls
+
+        self.hidraw = tigerjet.hidraw_path(tj_id)
+        usb_path = tigerjet.usb_device_path(tj_id)
+        self.dev_index = handshake.audio_device_index(usb_path)
+        if len(tigerjet.TJ_IDS) > 1 and \
+                usb_path not in handshake.TJ_DEV_INDEXES:
+            logging.warning(
+                'Line %s: no audio device paired with TigerJet %s, '
+                'using audio device %d', name, tj_id, self.dev_index)
+
+    def check_account(self, raw_events):
+        for code, _ in raw_events:
+            if self.account and code[:4] != self.account:
+                logging.warning(
+                    'Line %s: received account %s, expected account %s',
+                    self.line_name, code[:4], self.account)
+
+    def answer_calls(self):
+        with open(self.hidraw, 'rb') as alarmhid:
+            while True:
+                timer = CallTimer(self.line_name)
+                with log_context(call_id=timer.call_id, line=self.line_name):
+                    raw_events = callup.handle_alarm_calling(
+                        alarmhid, self.phone_number, self.dev_index, timer)
+                    self.check_account(raw_events)
+
+                count_call(self.line_name, timer, raw_events)
+                self.calls.put(self, raw_events, timer)
+
+    def run(self):
+        logging.info('Line %s listening on %s for calls to %s',
+                     self.line_name,
+                     self.hidraw,
+                     self.phone_number)
+        while True:
+            try:
+                self.answer_calls()
+            except (IOError, OSError) as exc:
+                logging.error('Line %s: %s, retrying', self.line_name, exc)
+                time.sleep(5)
+
+
+def find_device(device):
+    """
+    Return the TigerJet id matching the configured `device`, which is
+    either a hiddev number or the TigerJet's USB port.
+    """
+    for tj_id in tigerjet.TJ_IDS:
+        usb_port = os.path.basename(tigerjet.usb_device_path(tj_id))
+        if device in [tj_id, usb_port]:
+            return tj_id
+
+    return None
+
+
+def create_lines(calls):
+    """
+    Create a `PhoneLine` for each configured [Line <name>] section.  With
+    no lines configured, a single line answers calls on the first TigerJet.
+
+    :raises ValueError: if none of the configured lines could be found
+    """
+    settings = AlarmConfig.settings
+    phone_number = settings.get('Main', 'phone_number')
+    sections = AlarmConfig.prefixed_sections('Line')
+    if not sections:
+        return [PhoneLine('main', tigerjet.TJ_ID, phone_number, None, None,
+                          calls)]
+
+    lines = []
+    for section in sections:
+        name = section[len('Line '):].strip()
+        device = settings.get(section, 'device')
+        tj_id = find_device(device)
+        if tj_id is None:
+            logging.error('Line %s: TigerJet %s not found, skipping',
+                          name, device)
+            continue
+
+        lines.append(PhoneLine(
+            name,
+            tj_id,
+            settings.get(section, 'phone_number') or phone_number,
+            settings.get(section, 'account'),
+            settings.get(section, 'panel'),
+            calls))
+
+    if not lines:
+        raise ValueError('None of the configured phone lines were found')
+
+    return lines
@@ -0,0 +1,137 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from alarm_central_station_receiver.events import to_json
+
+LOG_FORMATS = ['text', 'json']
+
+# Record attributes added by log_context, or logging's extra argument
+CONTEXT_FIELDS = ['call_id', 'line', 'event', 'trace_id', 'trace_ids']
+
+CONTEXT = threading.local()
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Add `fields` to every record this thread logs within the block
+    """
+    previous = getattr(CONTEXT, 'fields', {})
+    CONTEXT.fields = dict(previous, **fields)
+    try:
+        yield
+    finally:
+        CONTEXT.fields = previous
+
+
+class ContextFilter(logging.Filter):
+    """
+    Copies the logging thread's context onto its records.  Must run in
+    the thread that logs, i.e. on the handler that records are sent to.
+    """
+
+    def filter(self, record):
+        for key, value in getattr(CONTEXT, 'fields', {}).items():
+            setattr(record, key, value)
+
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the call and event it was logged for
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': record.created,
+            'level': record.levelname,
+            'module': record.module,
+            'thread': record.threadName,
+            'process': record.process,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, sort_keys=True, default=to_json)
+
+
+def text_formatter():
+    # alarmd-import parses event lines in this format
+    return logging.Formatter(
+        fmt='%(asctime)s alarmd[%(process)d]: [%(module)s.%(levelname)s] %(message)s',
+        datefmt='%b %d %y %I:%M:%S %p')
+
+
+# Writes out the queued records, once start_queue has been called
+LISTENER = None
+
+
+def start_queue():
+    """
+    Move the root logger's handlers behind a queue, so logging only costs
+    the caller formatting the message.  A listener thread does the writes.
+    Threads don't survive a fork, start it once the daemon is running.
+    """
+    root_logger = logging.getLogger('')
+    handlers = root_logger.handlers[:]
+    records = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    for handler in handlers:
+        root_logger.removeHandler(handler)
+
+    root_logger.addHandler(queue_handler)
+    global LISTENER
+    LISTENER = QueueListener(records, *handlers, respect_handler_level=True)
+    LISTENER.start()
+
+    # Write out whatever is still queued on exit
+    atexit.register(LISTENER.stop)
+
+    return LISTENER
+
+
+def forked():
+    """
+    In a process forked from alarmd, log straight to the handlers again.
+    The listener thread doesn't exist in the child, so nothing would
+    write out its queue.
+    """
+    if LISTENER is None:
+        return
+
+    root_logger = logging.getLogger('')
+    for handler in root_logger.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root_logger.removeHandler(handler)
+
+    for handler in LISTENER.handlers:
+        root_logger.addHandler(handler)
@@ -20,30 +20,49 @@ import logging
 import sys
 import signal
 import socket
+import time
+
+import os
+import re
 
 from os import geteuid
 from select import select
 
 from alarm_central_station_receiver import tigerjet
 from alarm_central_station_receiver import json_ipc
-from alarm_central_station_receiver.contact_id import handshake, decoder, callup
+from alarm_central_station_receiver import lines
+from alarm_central_station_receiver import export
+from alarm_central_station_receiver import logs
+from alarm_central_station_receiver import profiling
+from alarm_central_station_receiver import system
+from alarm_central_station_receiver import stats
+from alarm_central_station_receiver.contact_id import handshake, callup, decoder, panels, lookup
 from alarm_central_station_receiver.status import AlarmStatus
 from alarm_central_station_receiver.system import AlarmSystem
 from alarm_central_station_receiver.config import AlarmConfig
-from alarm_central_station_receiver.notifications import notify, notify_test
+from alarm_central_station_receiver.timing import CallTimer, CallTimings
+from alarm_central_station_receiver.dedup import DuplicateFilter
+from alarm_central_station_receiver.retention import RetentionPolicy, Compactor
+from alarm_central_station_receiver.scheduler import Scheduler
+from alarm_central_station_receiver.arm_schedule import ArmSchedule
+from alarm_central_station_receiver.metrics import Metrics
+from alarm_central_station_receiver.profiling import Profiler
+from alarm_central_station_receiver.notifications import notify, notify_test, collect_results, RESULT_PIPES
 
 
-def init_logging(stdout_only, debug_logs):
+def init_logging(stdout_only, debug_logs, log_format='text'):
     root_logger = logging.getLogger('')
     log_level = logging.DEBUG if debug_logs else logging.INFO
     root_logger.setLevel(log_level)
-    formatter = logging.Formatter(
-        fmt='%(asctime)s alarmd[%(process)d]: [%(module)s.%(levelname)s] %(message)s',
-        datefmt='%b %d %y %I:%M:%S %p')
+    if log_format == 'json':
+        formatter = logs.JsonFormatter()
+    else:
+        formatter = logs.text_formatter()
 
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(log_level)
     console.setFormatter(formatter)
+    console.addFilter(logs.ContextFilter())
     root_logger.addHandler(console)
 
     log_fd = None
@@ -51,12 +70,63 @@ def init_logging(stdout_only, debug_logs):
         log_file = logging.FileHandler('/var/log/alarmd.log')
         log_file.setLevel(log_level)
         log_file.setFormatter(formatter)
+        log_file.addFilter(logs.ContextFilter())
         root_logger.addHandler(log_file)
         log_fd = log_file.stream
 
     return log_fd
 
 
+RELOAD_REQUESTED = False
+
+# Set by --simulate, no TigerJet or GPIO is used and calls are injected
+# over IPC instead
+SIMULATE = False
+
+DIGITS = re.compile('^[0-9a-f]+$')
+
+# Seconds to wait for the alarm to report an arm/disarm
+ARM_TIMEOUT = 300
+
+
+class SignalWakeup(object):
+    """
+    Pipe Python writes to when a signal arrives, so select wakes up for
+    the signal handlers' requests.
+    """
+
+    def __enter__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+        signal.set_wakeup_fd(self.write_fd)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        signal.set_wakeup_fd(-1)
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+    def fileno(self):
+        return self.read_fd
+
+    def drain(self):
+        try:
+            while os.read(self.read_fd, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def sighup_handler(*_):
+    """
+    Reload the configuration, from the main loop.  The signal's wakeup fd
+    breaks it out of select.
+    """
+    global RELOAD_REQUESTED
+    RELOAD_REQUESTED = True
+
+
 def sigcleanup_handler(signum, _):
     sig_name = next(v for v, k in signal.__dict__.items() if k == signum)
     logging.info("Received %s, exiting", sig_name)
@@ -78,17 +148,52 @@ def create_or_check_required_config(path):
     missing_config = AlarmConfig.validate()
     if missing_config:
         logging.error(
-            'The following required configuration is missing from %s\n\n',
+            'The following required configuration is missing or invalid '
+            'in %s\n\n',
             path)
         logging.error('\n'.join(missing_config))
         logging.error('\n\nExiting\n\n')
         sys.exit(-1)
 
 
+def reload_config():
+    """
+    Switch to the current config file.  Phone lines, the data directory
+    and the arm/disarm GPIO pin only change on restart.
+    """
+    errors = AlarmConfig.reload()
+    if errors:
+        logging.error('Configuration not reloaded, missing or invalid: %s',
+                      ', '.join(errors))
+    else:
+        logging.info('Configuration reloaded from %s', AlarmConfig.path)
+
+    return errors
+
+
 def initialize(config_path):
     create_or_check_required_config(config_path)
-    tigerjet.initialize()
-    handshake.initialize()
+    AlarmConfig.on_reload(panels.reset)
+    AlarmConfig.on_reload(DuplicateFilter().configure)
+    panels.default_panel().compile()
+
+
+def initialize_devices():
+    """
+    Set up the TigerJets and PortAudio.  Called once daemonized, as the
+    daemon context closes the file descriptors opened before it.
+    """
+    if SIMULATE:
+        system.simulate_gpio()
+        return
+
+    try:
+        tigerjet.initialize()
+        handshake.initialize()
+    except (ValueError, RuntimeError) as exc:
+        # Daemonized, so only the log would show a traceback
+        logging.error('%s, exiting', str(exc))
+        sys.exit(-1)
 
 
 def write_config_exit(config_path):
@@ -114,15 +219,71 @@ def notification_test_exit(config_path):
 
 def process_alarm_timeout(alarm_system):
     logging.info('Arm/Disarm request timeout!')
+    alarm_system.arm_timer = None
     notify_events = alarm_system.abort_arm_disarm()
+    alarm_system.alarm.flush()
     notify(notify_events)
 
 
-def process_alarm_event(alarmhid, phone_number, alarm_status):
-    raw_events = callup.handle_alarm_calling(alarmhid, phone_number)
-    events = decoder.decode(raw_events)
-    notify_events = alarm_status.add_new_events(events)
-    notify(notify_events)
+def process_alarm_event(line, raw_events, timer, alarm_status):
+    with logs.log_context(call_id=timer.call_id, line=line.line_name):
+        logging.info('Processing call %s from line %s', timer.call_id,
+                     line.line_name)
+        raw_events = DuplicateFilter().filter(raw_events)
+        events = decoder.decode(raw_events, line.panel, timer.call_id)
+        timer.mark('decode_done')
+        unknown = sum(1 for event in events if event['type'] == 'U')
+        if unknown:
+            Metrics().unknown_events.inc(unknown, line=line.line_name)
+
+        notify_events = alarm_status.add_new_events(events)
+        alarm_status.flush()
+        timer.mark('status_saved')
+        notify(notify_events)
+        timer.mark('notifications_queued')
+
+    if timer.has_phase('call_in_validated'):
+        CallTimings().record(timer, events)
+
+
+def inject_call(digits, alarm_status):
+    """
+    Process `digits` as if they were collected from an alarm call, for
+    alarmd --simulate
+    """
+    line = lines.SimulatedLine()
+    timer = CallTimer(line.line_name)
+    timer.mark('call_in_validated')
+    raw_events = callup.parse_alarm_codes(digits)
+    timer.mark('hang_up')
+    lines.count_call(line.line_name, timer, raw_events)
+    process_alarm_event(line, raw_events, timer, alarm_status)
+    return len(raw_events)
+
+
+def process_alarm_events(call_queue, alarm_status):
+    for line, raw_events, timer in call_queue.get_all():
+        process_alarm_event(line, raw_events, timer, alarm_status)
+
+
+def zone_table(alarm_status):
+    zones = {}
+    for zone, state in alarm_status.zones.items():
+        zones[zone] = dict(state, name=lookup.get_zone_name(zone))
+
+    return zones
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_timestamp(value):
+    """
+    True for an optional start/end time, seconds since the epoch
+    """
+    return value is None or \
+        isinstance(value, (int, float)) and not isinstance(value, bool)
 
 
 def process_sock_request(sockfd, alarm_system):
@@ -145,7 +306,11 @@ def process_sock_request(sockfd, alarm_system):
                     'arm_status': alarm_system.alarm.arm_status,
                     'arm_status_time': alarm_system.alarm.arm_status_time,
                     'auto_arm': alarm_system.alarm.auto_arm,
-                    'system_status': alarm_system.alarm.system_status
+                    'system_status': alarm_system.alarm.system_status,
+                    'duplicates_suppressed': DuplicateFilter().suppressed,
+                    'zones_ready': alarm_system.alarm.zones_ready(),
+                    'stats_ready': alarm_system.alarm.stats.ready(),
+                    'schedule': ArmSchedule().upcoming()
                 }
             }
         elif command in ['history']:
@@ -160,54 +325,234 @@ def process_sock_request(sockfd, alarm_system):
             else:
                 rsp = {
                     'error': False,
-                    'response': alarm_system.alarm.history[::-1][offset:limit]
+                    'response': alarm_system.alarm.history.latest(
+                        offset, limit - offset)
                 }
+        elif command in ['export']:
+            options = msg.get('options') or {}
+            export_format = options.get('format', 'ndjson')
+
+            if export_format not in export.FORMATS:
+                rsp = {'error': 'Format must be one of %s' %
+                                ', '.join(export.FORMATS)}
+            elif not is_timestamp(options.get('start')) or \
+                    not is_timestamp(options.get('end')):
+                rsp = {'error': 'Start and end must be timestamps'}
+            else:
+                # The events follow the response unframed, until the
+                # export thread closes the connection
+                json_ipc.send(conn, {'error': False,
+                                     'response': {'format': export_format}})
+                export.ExportStream(conn,
+                                    alarm_system.alarm.history,
+                                    export_format,
+                                    start=options.get('start'),
+                                    end=options.get('end')).start()
+                return command
+        elif command in ['search']:
+            options = msg.get('options') or {}
+            query = options.get('query', '')
+            offset = options.get('offset', 0)
+            limit = options.get('limit', 10)
+
+            if not isinstance(query, str):
+                rsp = {'error': 'Query must be a string'}
+            elif not is_int(offset) or offset < 0:
+                rsp = {'error': 'Offset must be 0 or greater'}
+            elif not is_int(limit) or limit < 1:
+                rsp = {'error': 'Limit must be 1 or greater'}
+            elif not is_timestamp(options.get('start')) or \
+                    not is_timestamp(options.get('end')):
+                rsp = {'error': 'Start and end must be timestamps'}
+            else:
+                total, events = alarm_system.alarm.search.search(
+                    query,
+                    start=options.get('start'),
+                    end=options.get('end'),
+                    offset=offset,
+                    limit=limit)
+                rsp = {
+                    'error': False,
+                    'response': {'total': total, 'events': events}
+                }
+        elif command in ['zones']:
+            if not alarm_system.alarm.zones_ready():
+                rsp = {'error': 'The zone table is being built from the '
+                                'history, try again shortly'}
+            else:
+                rsp = {'error': False,
+                       'response': zone_table(alarm_system.alarm)}
+        elif command in ['reload']:
+            errors = reload_config()
+            if errors:
+                rsp = {'error': 'Configuration not reloaded, missing or '
+                                'invalid: %s' % ', '.join(errors)}
+            else:
+                rsp = {'error': False, 'response': 'Configuration reloaded'}
+        elif command in ['stats']:
+            options = msg.get('options') or {}
+            granularity = options.get('granularity', 'daily')
+            limit = options.get('limit') or stats.QUERY_BUCKETS
+
+            if not alarm_system.alarm.stats.ready():
+                rsp = {'error': 'The statistics are being built from the '
+                                'history, try again shortly'}
+            elif granularity not in stats.GRANULARITIES:
+                rsp = {'error': 'Granularity must be one of %s' %
+                                ', '.join(stats.GRANULARITIES)}
+            elif not 1 <= limit <= stats.MAX_QUERY_BUCKETS:
+                rsp = {'error': 'Limit must be from 1 to %d' %
+                                stats.MAX_QUERY_BUCKETS}
+            else:
+                rsp = {
+                    'error': False,
+                    'response': stats.query(alarm_system.alarm.stats.rollups,
+                                            granularity,
+                                            since=options.get('since'),
+                                            limit=limit)
+                }
+        elif command in ['timings']:
+            rsp = {'error': False, 'response': CallTimings().summary()}
+        elif command in ['trace']:
+            trace_id = msg.get('options', {}).get('trace_id')
+            call = None
+            if isinstance(trace_id, str):
+                call = CallTimings().trace(trace_id)
+
+            if call is None:
+                rsp = {'error': 'No recent call traced by %s' % trace_id}
+            else:
+                rsp = {'error': False, 'response': call}
+        elif command in ['metrics']:
+            # The text follows the response unframed, like export, as it
+            # grows with the labelled series past what a message can hold
+            text = Metrics().render().encode()
+            json_ipc.send(conn, {'error': False,
+                                 'response': {'bytes': len(text)}})
+            conn.sendall(text)
+            conn.close()
+            return command
+        elif command in ['inject']:
+            digits = msg.get('options', {}).get('digits')
+            if not SIMULATE:
+                rsp = {'error': 'Calls can only be injected into alarmd '
+                                '--simulate'}
+            elif not isinstance(digits, str) or not DIGITS.match(digits):
+                rsp = {'error': 'Digits must be a string of DTMF digits 0-f'}
+            else:
+                rsp = {'error': False,
+                       'response': {
+                           'messages': inject_call(digits, alarm_system.alarm)
+                       }}
+        elif command in ['profile']:
+            action = msg.get('options', {}).get('action')
+            if action not in profiling.ACTIONS:
+                rsp = {'error': 'Action must be one of %s' %
+                                ', '.join(profiling.ACTIONS)}
+            else:
+                try:
+                    rsp = {'error': False,
+                           'response': getattr(Profiler(), action)()}
+                except (IOError, OSError) as exc:
+                    rsp = {'error': 'Unable to write profile: %s' % str(exc)}
         else:
             rsp = {'error': 'Invalid command %s' % command}
+            command = 'invalid'
+
+        try:
+            json_ipc.send(conn, rsp)
+        except ValueError as exc:
+            logging.error('Unable to respond to %s: %s', command, str(exc))
+            json_ipc.send(conn, {'error': str(exc)})
 
-        json_ipc.send(conn, rsp)
         conn.close()
 
+        return command
+
     except socket.timeout:
         logging.error("Timed out receiving data from client")
+        return 'timeout'
 
 
-def get_alarm_timeout(alarm_system):
-    return 300 if alarm_system.alarm.arm_status in [
-        'arming', 'disarming'] else None
+def watch_arm_timeout(alarm_system):
+    """
+    Keep the arm/disarm timeout scheduled from the request until the
+    alarm confirms it, whatever else the main loop handles meanwhile.
+    """
+    waiting = alarm_system.alarm.arm_status in ['arming', 'disarming']
+    if waiting and alarm_system.arm_timer is None:
+        alarm_system.arm_timer = Scheduler().call_later(
+            ARM_TIMEOUT, process_alarm_timeout, alarm_system)
+    elif not waiting and alarm_system.arm_timer is not None:
+        Scheduler().cancel(alarm_system.arm_timer)
+        alarm_system.arm_timer = None
 
 
-def alarm_main_loop():
-    phone_number = AlarmConfig.config.get('Main', 'phone_number')
+def alarm_main_loop(start_time):
+    global RELOAD_REQUESTED
     alarm_status = AlarmStatus()
     alarm_system = AlarmSystem()
+    # Created before the phone line threads, which update it
+    metrics = Metrics()
 
-    with open(tigerjet.hidraw_path(), 'rb') as alarmhid:
+    with lines.CallQueue() as call_queue, SignalWakeup() as wakeup:
         with json_ipc.ServerSock() as sockfd:
-            logging.info("Ready, listening for alarms")
-            timeout = get_alarm_timeout(alarm_system)
-            logging.debug('Timeout: %s', timeout)
-
-            while True:
-                read = []
-                read, _, _ = select([alarmhid, sockfd], [], [], timeout)
-                if alarmhid in read:
-                    process_alarm_event(alarmhid, phone_number, alarm_status)
-
-                if sockfd in read:
-                    process_sock_request(sockfd, alarm_system)
-
-                if not read:
-                    # Arm/disarm event from alarm system never came
-                    process_alarm_timeout(alarm_system)
-
-                timeout = get_alarm_timeout(alarm_system)
-                logging.debug('Timeout: %s', timeout)
+            if SIMULATE:
+                logging.info('Simulating, calls are injected over IPC')
+            else:
+                for line in lines.create_lines(call_queue):
+                    line.start()
+
+            retention = RetentionPolicy()
+            AlarmConfig.on_reload(retention.configure)
+            AlarmConfig.on_reload(alarm_status.configure)
+            Compactor(alarm_status.history, retention).start()
+            AlarmConfig.on_reload(ArmSchedule().configure)
+
+            logging.info("Ready, listening for alarms (%.3fs after start)",
+                         time.time() - start_time)
+            scheduler = Scheduler()
+            watch_arm_timeout(alarm_system)
+
+            try:
+                while True:
+                    timeout = scheduler.timeout()
+                    logging.debug('Timeout: %s', timeout)
+                    read, _, _ = select([call_queue, sockfd, wakeup] +
+                                        list(RESULT_PIPES), [], [], timeout)
+                    if wakeup in read:
+                        wakeup.drain()
+
+                    if RELOAD_REQUESTED:
+                        RELOAD_REQUESTED = False
+                        reload_config()
+
+                    if call_queue in read:
+                        process_alarm_events(call_queue, alarm_status)
+
+                    if sockfd in read:
+                        start = time.monotonic()
+                        command = process_sock_request(sockfd, alarm_system)
+                        metrics.ipc_request_seconds.observe(
+                            time.monotonic() - start, command=command)
+
+                    collect_results([results for results in read
+                                     if results in RESULT_PIPES])
+
+                    scheduler.run_due()
+
+                    # One write per loop iteration, however many changes
+                    alarm_status.flush()
+                    watch_arm_timeout(alarm_system)
+            finally:
+                # Stopped by a signal's sys.exit()
+                alarm_status.close()
 
     return 0
 
 
 def main():
+    start_time = time.time()
     parser = argparse.ArgumentParser(prog='alarmd')
     parser.add_argument(
         '--no-fork',
@@ -220,6 +565,12 @@ def main():
         action='store_true',
         default=False,
         help='Log at debug level')
+    parser.add_argument(
+        '--log-format',
+        choices=logs.LOG_FORMATS,
+        default='text',
+        help='Log as text, or as JSON lines with the call and event each '
+             'record was logged for')
 
     parser.add_argument('-c', '--config',
                         default='/etc/alarmd_config.ini',
@@ -234,10 +585,19 @@ def main():
                         action='store_true',
                         default=False,
                         help='Send a test notification, and exit.')
+    parser.add_argument('--simulate',
+                        action='store_true',
+                        default=False,
+                        help='Run without a TigerJet or GPIO pins, for load '
+                             'testing.  Calls are injected with the inject '
+                             'IPC command, and arm/disarm uses a simulated '
+                             'keyswitch.')
     args = parser.parse_args()
 
+    global SIMULATE
+    SIMULATE = args.simulate
     check_running_root()
-    log_fd = init_logging(args.no_fork, args.debug)
+    log_fd = init_logging(args.no_fork, args.debug, args.log_format)
 
     if args.create_config:
         write_config_exit(args.config_path)
@@ -257,14 +617,18 @@ def main():
         stdout=(
             sys.stdout if args.no_fork else None))
     context.signal_map = {signal.SIGTERM: sigcleanup_handler,
-                          signal.SIGINT: sigcleanup_handler}
+                          signal.SIGINT: sigcleanup_handler,
+                          signal.SIGHUP: sighup_handler}
 
     with context:
+        logs.start_queue()
         logging.info('Python %s', sys.version)
         logging.info(
-            "Starting in %s mode",
-            'no-fork' if args.no_fork else 'daemonized')
-        alarm_main_loop()
+            "Starting in %s mode%s",
+            'no-fork' if args.no_fork else 'daemonized',
+            ', simulating' if SIMULATE else '')
+        initialize_devices()
+        alarm_main_loop(start_time)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import threading
+
+from bisect import bisect_left
+
+from alarm_central_station_receiver.singleton import Singleton
+
+# Upper bounds, in seconds, of the latency histograms' buckets
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(value)
+
+
+class Counter(object):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, lock, labelled=False):
+        self.name = name
+        self.help_text = help_text
+        self.lock = lock
+        self.values = {} if labelled else {(): 0}
+
+    def inc(self, amount=1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, key, value
+
+
+class Histogram(object):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, lock, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.lock = lock
+        self.buckets = buckets
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # A count per bucket and one above them, then the sum
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0]
+
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def samples(self):
+        for key, counts in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '%s_bucket' % self.name, key + (('le', format_value(
+                    float(bound))),), cumulative
+
+            yield '%s_sum' % self.name, key, counts[-1]
+            yield '%s_count' % self.name, key, cumulative
+
+
+@Singleton
+class Metrics(object):
+    """
+    Counters and histograms of alarmd's work, rendered in the Prometheus
+    text format.  Phone line threads update them too, so every update is
+    made under one lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls_answered = Counter(
+            'alarmd_calls_answered_total',
+            'Alarm calls answered', self.lock, labelled=True)
+        self.messages_received = Counter(
+            'alarmd_messages_received_total',
+            'Contact ID messages received', self.lock, labelled=True)
+        self.checksum_failures = Counter(
+            'alarmd_checksum_failures_total',
+            'Contact ID messages received with a bad checksum', self.lock,
+            labelled=True)
+        self.duplicates_suppressed = Counter(
+            'alarmd_duplicates_suppressed_total',
+            'Repeated Contact ID messages suppressed', self.lock)
+        self.unknown_events = Counter(
+            'alarmd_unknown_events_total',
+            'Events decoded with an unknown event code', self.lock,
+            labelled=True)
+        self.ipc_request_seconds = Histogram(
+            'alarmd_ipc_request_seconds',
+            'Control socket requests, by command, and their latency',
+            self.lock)
+        self.save_seconds = Histogram(
+            'alarmd_save_seconds',
+            'Time taken to save the alarm state', self.lock)
+        self.save_bytes = Counter(
+            'alarmd_save_bytes_total',
+            'Bytes written saving the alarm state', self.lock)
+        self.notifications = Counter(
+            'alarmd_notifications_total',
+            'Notifications sent, by notifier and outcome', self.lock,
+            labelled=True)
+        self.notification_seconds = Histogram(
+            'alarmd_notification_seconds',
+            'Time taken to send notifications, by notifier', self.lock)
+
+        self.metrics = [self.calls_answered,
+                        self.messages_received,
+                        self.checksum_failures,
+                        self.duplicates_suppressed,
+                        self.unknown_events,
+                        self.ipc_request_seconds,
+                        self.save_seconds,
+                        self.save_bytes,
+                        self.notifications,
+                        self.notification_seconds]
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append('# HELP %s %s' % (metric.name, metric.help_text))
+                lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+                for name, labels, value in metric.samples():
+                    lines.append('%s%s %s' % (name, format_labels(labels),
+                                              format_value(value)))
+
+        return '\n'.join(lines) + '\n'
@@ -41,20 +41,24 @@ def create_message(events):
 
 
 def notify(events):
+    """
+    Returns 'sent' or 'failed', or None if email isn't configured
+    """
     if not events:
-        return
+        return None
 
-    if 'EmailNotification' not in AlarmConfig.config:
-        return
+    if 'EmailNotification' not in AlarmConfig.settings:
+        return None
 
     logging.info("Sending email...")
-    username = AlarmConfig.config.get('EmailNotification', 'username')
-    password = AlarmConfig.config.get('EmailNotification', 'password')
-    to_addr = AlarmConfig.config.get('EmailNotification', 'notification_email')
-    subject = AlarmConfig.config.get('EmailNotification', 'notification_subject')
-    tls = AlarmConfig.config.getboolean('EmailNotification', 'tls')
-    server = AlarmConfig.config.get('EmailNotification', 'server_address')
-    server_port = AlarmConfig.config.get('EmailNotification', 'port')
+    config = AlarmConfig.settings.section('EmailNotification')
+    username = config['username']
+    password = config['password']
+    to_addr = config['notification_email']
+    subject = config['notification_subject']
+    tls = config['tls']
+    server = config['server_address']
+    server_port = config['port']
 
     msg = MIMEMultipart('alternative')
     msg['From'] = username
@@ -74,5 +78,7 @@ def notify(events):
         s.sendmail(username, [to_addr], msg.as_string())
         s.quit()
         logging.info("Email send complete")
-    except smtplib.SMTPException as exc:
+        return 'sent'
+    except (smtplib.SMTPException, OSError) as exc:
         logging.error("Error sending email: %s", str(exc))
+        return 'failed'
@@ -29,41 +29,52 @@ def create_message(events):
 
 def create_params(events):
     timestamp, message = create_message(events)
+    config = AlarmConfig.settings.section('PushoverNotification')
     data = {
-        'token': AlarmConfig.config.get('PushoverNotification', 'token'),
-        'user': AlarmConfig.config.get('PushoverNotification', 'user'),
+        'token': config['token'],
+        'user': config['user'],
         'timestamp': timestamp,
         'title': 'Alarm Notification',
         'message': message,
     }
 
-    device = AlarmConfig.config.get('PushoverNotification', 'device', fallback=None)
+    device = config.get('device')
     if device:
         data['device'] = device
 
-    priority = AlarmConfig.config.get('PushoverNotification', 'priority', fallback=None)
-    if priority:
+    priority = config.get('priority')
+    if priority is not None:
         data['priority'] = priority
 
     return data
 
 
 def notify(events):
+    """
+    Returns 'sent' or 'failed', or None if pushover isn't configured
+    """
     if not events:
-        return
+        return None
 
-    if 'PushoverNotification' not in AlarmConfig.config:
-        return
+    if 'PushoverNotification' not in AlarmConfig.settings:
+        return None
 
     logging.info("Sending pushover notification...")
 
     data = create_params(events)
     pushover_uri = 'https://api.pushover.net/1/messages.json'
-    response = requests.post(pushover_uri, data=data)
+    try:
+        response = requests.post(pushover_uri, data=data)
+    except requests.exceptions.RequestException as exc:
+        logging.error('Error sending pushover notification: %s', str(exc))
+        return 'failed'
+
     if response.status_code == 200:
         logging.info("Sending complete")
-    else:
-        err_list = response.json().get('errors')
-        status_code = response.status_code
-        logging.error('Error sending pushover notification HTTP %s: %s',
-                      status_code, ', '.join(err_list))
+        return 'sent'
+
+    err_list = response.json().get('errors')
+    status_code = response.status_code
+    logging.error('Error sending pushover notification HTTP %s: %s',
+                  status_code, ', '.join(err_list))
+    return 'failed'
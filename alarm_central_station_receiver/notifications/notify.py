@@ -17,6 +17,9 @@ import logging
 import time
 import multiprocessing
 
+from alarm_central_station_receiver import logs
+from alarm_central_station_receiver.metrics import Metrics
+from alarm_central_station_receiver.timing import CallTimings
 from alarm_central_station_receiver.notifications.notifiers import emailer, pushover
 
 
@@ -39,19 +42,77 @@ def notify_test():
     notify_async(events)
 
 
-def notify_async(events):
-    logging.info("Sending notifications...")
-    emailer.notify(events)
-    pushover.notify(events)
+# Read ends of the pipes notification processes report their outcomes on,
+# with the trace IDs of the events sent and when they were queued
+RESULT_PIPES = {}
+
+NOTIFIERS = [('email', emailer), ('pushover', pushover)]
+
+
+def trace_ids_of(events):
+    return [event.get('trace_id') for event in events if event.get('trace_id')]
+
+
+def notify_async(events, results=None):
+    logs.forked()
+    trace_ids = trace_ids_of(events)
+    with logs.log_context(trace_ids=trace_ids):
+        logging.info("Sending notifications for %s...",
+                     ', '.join(trace_ids) or 'test events')
+        outcomes = []
+        for notifier, module in NOTIFIERS:
+            start = time.monotonic()
+            outcome = module.notify(events)
+            if outcome:
+                outcomes.append((notifier, outcome,
+                                 time.monotonic() - start))
+
+    if results:
+        results.send(outcomes)
+        results.close()
 
 
 def notify(events):
     """
-    Asynchronously send out configured notifications
+    Asynchronously send out configured notifications.  The outcomes come
+    back on a pipe in RESULT_PIPES, for the main loop to pass to
+    `collect_results` once it's readable.
     """
     if not events:
         logging.info("No events for notification")
         return
 
-    notify_proc = multiprocessing.Process(target=notify_async, args=(events,))
+    results, child_results = multiprocessing.Pipe(duplex=False)
+    notify_proc = multiprocessing.Process(target=notify_async,
+                                          args=(events, child_results))
     notify_proc.start()
+    child_results.close()
+    RESULT_PIPES[results] = (trace_ids_of(events), time.monotonic())
+
+
+def collect_results(ready):
+    """
+    Count and time the outcomes reported on the `ready` result pipes, and
+    add them to the traces of the calls notified about
+    """
+    metrics = Metrics()
+    for results in ready:
+        trace_ids, queued = RESULT_PIPES.pop(results)
+        with logs.log_context(trace_ids=trace_ids):
+            try:
+                outcomes = results.recv()
+            except EOFError:
+                logging.error('Notification process exited without a result')
+                outcomes = [('process', 'crashed', 0)]
+
+            for notifier, outcome, seconds in outcomes:
+                logging.debug('Notification by %s %s in %.3fs', notifier,
+                              outcome, seconds)
+                metrics.notifications.inc(notifier=notifier, outcome=outcome)
+                if notifier != 'process':
+                    metrics.notification_seconds.observe(seconds,
+                                                         notifier=notifier)
+
+        CallTimings().add_notifications(trace_ids, outcomes,
+                                        time.monotonic() - queued)
+        results.close()
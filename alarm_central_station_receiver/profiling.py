@@ -0,0 +1,100 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import cProfile
+import logging
+import time
+import tracemalloc
+
+from os import path
+
+from alarm_central_station_receiver.singleton import Singleton
+from alarm_central_station_receiver.config import AlarmConfig
+
+ACTIONS = ['start', 'stop', 'dump']
+
+# Allocation sites listed by a dump, by growth since profiling started
+TOP_ALLOCATIONS = 10
+
+
+@Singleton
+class Profiler(object):
+    """
+    cProfile of the main loop, and tracemalloc snapshots, turned on and
+    off over IPC.  Nothing is hooked while profiling is off.  Dumps are
+    written to data_file_path, the .pstats files can be read with pstats
+    or snakeviz, and the .tracemalloc snapshots with
+    tracemalloc.Snapshot.load.
+    """
+
+    def __init__(self):
+        self.profile = None
+        self.baseline = None
+        self.started = None
+
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        if self.running():
+            return {'profiling': True, 'started': self.started}
+
+        logging.info('Profiling started')
+        tracemalloc.start()
+        self.baseline = tracemalloc.take_snapshot()
+        self.started = time.time()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return {'profiling': True, 'started': self.started}
+
+    def dump(self):
+        """
+        Write out the profile and a memory snapshot, profiling continues
+        """
+        if not self.running():
+            return {'profiling': False, 'files': []}
+
+        self.profile.disable()
+        name = path.join(AlarmConfig.settings.get('Main', 'data_file_path'),
+                         time.strftime('alarmd-%Y%m%d-%H%M%S'))
+        try:
+            self.profile.dump_stats(name + '.pstats')
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(name + '.tracemalloc')
+            top = snapshot.compare_to(self.baseline,
+                                      'lineno')[:TOP_ALLOCATIONS]
+        finally:
+            self.profile.enable()
+
+        logging.info('Profile written to %s.pstats', name)
+        return {
+            'profiling': True,
+            'started': self.started,
+            'files': [name + '.pstats', name + '.tracemalloc'],
+            'top_allocations': [str(stat) for stat in top],
+        }
+
+    def stop(self):
+        if not self.running():
+            return {'profiling': False, 'files': []}
+
+        rsp = self.dump()
+        self.profile.disable()
+        self.profile = None
+        self.baseline = None
+        tracemalloc.stop()
+        logging.info('Profiling stopped')
+        rsp['profiling'] = False
+        return rsp
@@ -0,0 +1,122 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import logging
+import threading
+import time
+
+from array import array
+
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.history import ARCHIVE_FORMATS
+from alarm_central_station_receiver.scheduler import Scheduler
+
+# Test reports: System Test, Periodic Test, Periodic RF Transmission
+TEST_EVENTS = ['601', '602', '603']
+
+DAY = 24 * 60 * 60
+
+
+class RetentionPolicy(object):
+    """
+    Decides which events are moved out of the live history, configured by
+    the [Retention] section.  Nothing is archived without it.
+    """
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self):
+        settings = AlarmConfig.settings
+        self.max_age = settings.get('Retention', 'max_age_days', 0) * DAY
+        self.max_events = settings.get('Retention', 'max_events', 0)
+        self.test_max_age = settings.get('Retention', 'test_max_age_days',
+                                         0) * DAY
+        self.keep_alarms = settings.get('Retention', 'keep_alarms', True)
+        self.interval = settings.get('Retention', 'interval_minutes', 60) * 60
+        self.compression = settings.get('Retention', 'compression', 'gzip')
+        if self.compression not in ARCHIVE_FORMATS:
+            logging.error('Unknown archive compression %s, using gzip',
+                          self.compression)
+            self.compression = 'gzip'
+
+    def enabled(self):
+        return bool(self.max_age or self.max_events or self.test_max_age)
+
+    def select(self, events, now=None):
+        """
+        Flag each of `events`, oldest first, that should be archived.
+        Alarms are never archived when keep_alarms is set, and don't count
+        towards max_events.
+        """
+        now = now or time.time()
+        flags = bytearray()
+        candidates = array('L')
+        for index, event in enumerate(events):
+            expired = False
+            if not (self.keep_alarms and event['type'] == 'A'):
+                age = now - event['timestamp']
+                if self.max_age and age > self.max_age:
+                    expired = True
+                elif self.test_max_age and age > self.test_max_age and \
+                        event['event'][:3] in TEST_EVENTS:
+                    expired = True
+                else:
+                    candidates.append(index)
+
+            flags.append(expired)
+
+        if self.max_events:
+            for index in candidates[:max(len(candidates) -
+                                         self.max_events, 0)]:
+                flags[index] = True
+
+        return flags
+
+
+class Compactor(object):
+    """
+    Applies the retention policy to the history every interval_minutes.
+    The main loop's scheduler starts each pass, which runs in its own
+    thread so the main loop keeps answering calls.  The policy can be
+    turned on or off, and the interval changed, by a reload.
+    """
+
+    def __init__(self, history, policy):
+        self.history = history
+        self.policy = policy
+        self.thread = None
+
+    def schedule(self):
+        Scheduler().call_later(self.policy.interval, self.start)
+
+    def start(self):
+        if self.policy.enabled() and \
+                not (self.thread and self.thread.is_alive()):
+            self.thread = threading.Thread(target=self.run, name='compactor')
+            self.thread.daemon = True
+            self.thread.start()
+
+        self.schedule()
+
+    def run(self):
+        try:
+            start = time.time()
+            count = self.history.compact(self.policy.select,
+                                         self.policy.compression)
+            if count:
+                logging.info('Compacted history in %.2fs', time.time() - start)
+        except (IOError, OSError) as exc:
+            logging.error('History compaction failed: %s', str(exc))
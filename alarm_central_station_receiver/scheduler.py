@@ -0,0 +1,82 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import heapq
+import itertools
+import time
+
+from alarm_central_station_receiver.singleton import Singleton
+
+
+class Timer(object):
+    __slots__ = ['deadline', 'seq', 'callback', 'args', 'cancelled']
+
+    def __init__(self, deadline, seq, callback, args):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+@Singleton
+class Scheduler(object):
+    """
+    Timers run by the main loop, in a heap ordered by their absolute
+    deadline on the monotonic clock.  The loop sleeps in select for
+    `timeout()`, then calls `run_due()`, so a timer fires on time however
+    many requests come in meanwhile.
+
+    Only the main loop's thread may use the scheduler.  Cancelled timers
+    are left in the heap, and dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self.timers = []
+        self.seq = itertools.count()
+
+    def call_at(self, deadline, callback, *args):
+        timer = Timer(deadline, next(self.seq), callback, args)
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    @staticmethod
+    def cancel(timer):
+        timer.cancelled = True
+
+    def timeout(self):
+        """
+        Seconds until the next timer is due, None if there are none
+        """
+        while self.timers and self.timers[0].cancelled:
+            heapq.heappop(self.timers)
+
+        if not self.timers:
+            return None
+
+        return max(self.timers[0].deadline - time.monotonic(), 0)
+
+    def run_due(self):
+        now = time.monotonic()
+        while self.timers and self.timers[0].deadline <= now:
+            timer = heapq.heappop(self.timers)
+            if not timer.cancelled:
+                timer.callback(*timer.args)
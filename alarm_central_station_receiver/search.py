@@ -0,0 +1,269 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import json
+import logging
+import re
+import time
+
+from array import array
+from bisect import bisect_left
+from os import fstat, path, remove
+from shutil import move
+
+from alarm_central_station_receiver.history import decode
+
+WORD = re.compile(r'[a-z0-9]+')
+
+# Query terms of the form field:value
+FIELDS = ['event', 'zone', 'user', 'type']
+
+# Save the index after this many events have been added to it
+SNAPSHOT_EVERY = 1000
+
+
+def event_terms(event):
+    """
+    The terms `event` is found by: the words of its description, and
+    event:, type:, and zone: or user: fields.
+    """
+    code = event['event'] or ''
+    terms = set(WORD.findall(event['description'].lower()))
+    terms.add('event:' + code)
+    terms.add('event:' + code[:3])
+    terms.add('type:' + event['type'].lower())
+    if event['zone']:
+        terms.add('zone:' + event['zone'])
+    elif code[3:].strip('0'):
+        terms.add('user:' + code[3:])
+
+    return terms
+
+
+def query_terms(query):
+    """
+    Splits a search query into index terms.  Zone and user numbers are
+    padded to 3 digits, 'zone:5' finds zone 005.
+    """
+    terms = []
+    for word in query.lower().split():
+        field, sep, value = word.partition(':')
+        if sep and field in FIELDS and value:
+            if field in ['zone', 'user'] and value.isdigit():
+                value = value.zfill(3)
+
+            terms.append(field + ':' + value)
+        else:
+            terms.extend(WORD.findall(word))
+
+    return terms
+
+
+class SearchIndex(object):
+    """
+    Inverted index over the live event history, mapping each term to the
+    positions of the events that have it, oldest first.
+
+    The index is loaded from its snapshot on the first search, and then
+    caught up with the events appended to the history since.  From then
+    on events are indexed as the history is flushed, and the snapshot is
+    saved every SNAPSHOT_EVERY events and by `close()`.  When the
+    history file is replaced, its generation changes and the index is
+    rebuilt.  Positions and `size` count from the start of the generation,
+    so when compaction only trims the oldest events they're dropped from
+    the index instead.  `first` is the position of the oldest event left.
+    """
+
+    def __init__(self, history, file_path):
+        self.history = history
+        self.file_path = file_path
+        self.loaded = False
+        self.reset()
+        history.on_flush(self.flushed)
+
+    def reset(self, generation=None, first=0, size=0):
+        self.generation = generation
+        self.first = first
+        self.size = size
+        self.postings = {}
+        self.timestamps = array('d')
+        self.unsaved = 0
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r') as file_desc:
+                snapshot = json.load(file_desc)
+
+            self.generation = snapshot['generation']
+            self.first = snapshot.get('first', 0)
+            self.size = snapshot['size']
+            self.timestamps = array('d', snapshot['timestamps'])
+            self.postings = dict((term, array('L', positions))
+                                 for term, positions
+                                 in snapshot['postings'].items())
+        except (IOError, ValueError, KeyError):
+            self.reset()
+
+        self.loaded = True
+
+    def save(self):
+        tmp_path = '.'.join([self.file_path, 'tmp'])
+        try:
+            with open(tmp_path, 'w') as file_desc:
+                json.dump({
+                    'generation': self.generation,
+                    'first': self.first,
+                    'size': self.size,
+                    'timestamps': self.timestamps.tolist(),
+                    'postings': dict((term, positions.tolist())
+                                     for term, positions
+                                     in self.postings.items()),
+                }, file_desc)
+
+            move(tmp_path, self.file_path)
+            self.unsaved = 0
+        except (IOError, OSError) as exc:
+            logging.error('Unable to save search index: %s', str(exc))
+            if path.isfile(tmp_path):
+                remove(tmp_path)
+
+    def add(self, event):
+        position = self.first + len(self.timestamps)
+        self.timestamps.append(event['timestamp'])
+        for term in event_terms(event):
+            positions = self.postings.get(term)
+            if positions is None:
+                positions = self.postings[term] = array('L')
+
+            positions.append(position)
+
+        self.unsaved += 1
+
+    def trim(self, first):
+        """
+        Drop the positions before `first`, trimmed from the history
+        """
+        count = first - self.first
+        if count <= 0:
+            return
+
+        del self.timestamps[:count]
+        for term, positions in list(self.postings.items()):
+            del positions[:bisect_left(positions, first)]
+            if not positions:
+                del self.postings[term]
+
+        self.first = first
+        self.unsaved += count
+
+    def flushed(self, lines, start):
+        """
+        Index the events just flushed to the history, if the index is
+        caught up to where they start
+        """
+        if not self.loaded or start != self.size or \
+                self.generation != self.history.generation:
+            return
+
+        for line in lines:
+            self.add(decode(line))
+            self.size += len(line)
+
+        if self.unsaved >= SNAPSHOT_EVERY:
+            self.save()
+
+    def close(self):
+        """
+        Save the events indexed since the last snapshot, when alarmd exits
+        """
+        with self.history.lock:
+            if self.loaded and self.unsaved:
+                self.save()
+
+    def update(self):
+        """
+        Index the events appended to the history since the last update.
+        Call with the history lock held.
+        """
+        if not self.loaded:
+            self.load()
+
+        self.history.flush()
+        if not path.isfile(self.history.file_path):
+            return
+
+        start = time.time()
+        history = self.history
+        count = len(self.timestamps)
+        with open(history.file_path, 'rb') as file_desc:
+            offset = self.size - history.trimmed_bytes
+            if history.generation != self.generation or offset < 0 or \
+                    offset > fstat(file_desc.fileno()).st_size:
+                logging.info('Rebuilding search index')
+                self.reset(history.generation, history.trimmed,
+                           history.trimmed_bytes)
+                offset = 0
+            else:
+                self.trim(history.trimmed)
+
+            file_desc.seek(offset)
+            for line in file_desc:
+                self.add(decode(line))
+                self.size += len(line)
+
+        count = len(self.timestamps) - count
+        if count > 0:
+            logging.info('Indexed %d events for search in %.3fs',
+                         count, time.time() - start)
+
+        if self.unsaved >= SNAPSHOT_EVERY:
+            self.save()
+
+    def search(self, query, start=None, end=None, offset=0, limit=10):
+        """
+        Find the events having every term in `query`, with a timestamp
+        between `start` and `end` when given.
+
+        :returns: total number of matches, and up to `limit` of them newest
+                  first after skipping `offset`
+        """
+        with self.history.lock:
+            self.update()
+
+            terms = query_terms(query)
+            if terms:
+                postings = sorted((self.postings.get(term, array('L'))
+                                   for term in terms), key=len)
+                matches = set(postings[0])
+                for positions in postings[1:]:
+                    matches.intersection_update(positions)
+
+                matches = sorted(matches)
+            else:
+                matches = range(self.first,
+                                self.first + len(self.timestamps))
+
+            if start is not None or end is not None:
+                timestamps = self.timestamps
+                first = self.first
+                matches = [position for position in matches
+                           if (start is None or
+                               timestamps[position - first] >= start) and
+                           (end is None or
+                            timestamps[position - first] <= end)]
+
+            page = list(reversed(matches))[offset:offset + limit]
+            return len(matches), self.history.events_at(
+                [position - self.first for position in page])
@@ -0,0 +1,277 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Event statistics, rolled up as each event is added so that they can be
+answered without reading the history.  The rollups are a plain dict:
+
+    {
+        'hourly': {'2018-06-01T13': {'A': {'130001': 2}, ...}, ...},
+        'daily': {'2018-06-01': {'T': {'301000': 1}, ...}, ...},
+        'open': {'301000': <trouble start timestamp>, ...},
+        'durations': {'301000': {'count': 1, 'total': 62.0,
+                                 'mean': 62.0, 'max': 62.0}, ...},
+        'through': <timestamp of the newest event added>,
+    }
+
+Buckets are in local time, only the most recent are kept.  `EventStats`
+keeps them in their own file, apart from the alarm state.
+"""
+import json
+import logging
+import time
+
+from functools import lru_cache
+from os import path, remove
+from shutil import move
+
+from alarm_central_station_receiver.history import Replay
+from alarm_central_station_receiver.scheduler import Scheduler
+
+HOURLY_BUCKETS = 7 * 24
+DAILY_BUCKETS = 400
+
+GRANULARITIES = ['hourly', 'daily']
+
+# Buckets returned by a query, by default and at most
+QUERY_BUCKETS = 31
+MAX_QUERY_BUCKETS = 62
+
+# Seconds changed rollups are saved after.  Events added since the last
+# save are caught up from the history on the next start.
+SAVE_INTERVAL = 60
+
+# Report types timed from the first report until their restoral
+DURATION_TYPES = ['A', 'T', 'MA']
+
+
+def new_stats():
+    return {'hourly': {}, 'daily': {}, 'open': {}, 'durations': {},
+            'through': 0}
+
+
+def count_event(buckets, key, max_buckets, event):
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = {}
+        if len(buckets) > max_buckets:
+            del buckets[min(buckets)]
+
+    codes = bucket.setdefault(event['type'], {})
+    codes[event['event']] = codes.get(event['event'], 0) + 1
+
+
+def time_restoral(stats, event):
+    report_type = event['type']
+    report_code = event['event']
+    if not report_code:
+        # Imported from the log without their code, there's no telling
+        # which trouble a restoral ends
+        return
+
+    if report_type in DURATION_TYPES:
+        stats['open'].setdefault(report_code, event['timestamp'])
+    elif report_type == 'R' and report_code in stats['open']:
+        duration = max(event['timestamp'] - stats['open'].pop(report_code), 0)
+        timing = stats['durations'].setdefault(
+            report_code, {'count': 0, 'total': 0, 'max': 0})
+        timing['count'] += 1
+        timing['total'] += duration
+        timing['max'] = max(timing['max'], duration)
+        timing['mean'] = timing['total'] / timing['count']
+
+
+@lru_cache(maxsize=256)
+def bucket_keys(quarter_hour):
+    """
+    The hourly and daily bucket of a quarter hour since the epoch.  Every
+    time zone offset is a whole number of quarter hours.
+    """
+    local = time.localtime(quarter_hour * 900)
+    return time.strftime('%Y-%m-%dT%H', local), time.strftime('%Y-%m-%d', local)
+
+
+def add_event(stats, event):
+    """
+    Add `event` to the rollups in `stats`
+    """
+    hour, day = bucket_keys(int(event['timestamp'] // 900))
+    count_event(stats['hourly'], hour, HOURLY_BUCKETS, event)
+    count_event(stats['daily'], day, DAILY_BUCKETS, event)
+    time_restoral(stats, event)
+    stats['through'] = max(stats.get('through', 0), event['timestamp'])
+
+
+def query(stats, granularity='daily', since=None, limit=QUERY_BUCKETS):
+    """
+    The newest `limit` buckets of `granularity` in `stats`, from the one
+    holding time `since` on, with the open and timed restorals
+    """
+    buckets = stats[granularity]
+    keys = sorted(buckets, reverse=True)
+    if since is not None:
+        first = bucket_keys(int(since // 900))[GRANULARITIES.index(granularity)]
+        keys = [key for key in keys if key >= first]
+
+    return {
+        'granularity': granularity,
+        'buckets': dict((key, buckets[key]) for key in keys[:limit]),
+        'open': stats['open'],
+        'durations': stats['durations'],
+    }
+
+
+class EventStats(object):
+    """
+    The rollups of `history`, saved to their own file.  They change with
+    every event, so rather than on every flush of the alarm state they're
+    saved SAVE_INTERVAL after they first change.  The file records how far
+    into the history's generation they were saved, so the events added
+    after are caught up when loaded.
+
+    Without a saved file they're built from the history in the
+    background, and aren't `ready()` until then.
+    """
+
+    def __init__(self, history, file_path):
+        self.history = history
+        self.file_path = file_path
+        self.rollups = new_stats()
+        self.dirty = False
+        self.timer = None
+        self.replay = None
+
+    def load(self, migrated=None):
+        """
+        Load the saved rollups, or `migrated` ones kept in the alarm state
+        by earlier versions, or else start building them from the history
+        """
+        try:
+            with open(self.file_path, 'r') as file_desc:
+                saved = json.load(file_desc)
+
+            self.rollups = saved['rollups']
+            generation, end = saved['generation'], saved['end']
+        except (IOError, ValueError, KeyError):
+            if migrated is None:
+                self.rebuild(background=True)
+            else:
+                # Saved with the state, so they're as new as the history
+                latest = self.history.latest(0, 1)
+                migrated['through'] = latest[0]['timestamp'] if latest else 0
+                self.rollups = migrated
+                self.save()
+
+            return
+
+        end -= self.history.trimmed_bytes
+        if generation != self.history.generation or end < 0:
+            # The history was replaced since, e.g. re-decoded, or events
+            # not yet added were archived
+            self.rebuild(background=True)
+        else:
+            self.catch_up(end)
+
+    def catch_up(self, end):
+        """
+        Add the events after the first `end` bytes of the history that are
+        newer than the rollups
+        """
+        through = self.rollups.get('through', 0)
+        count = 0
+        for event in self.history.events_after(end):
+            if event['timestamp'] > through:
+                add_event(self.rollups, event)
+                count += 1
+
+        if count:
+            logging.info('Added %d events to the statistics', count)
+            self.changed()
+
+    def ready(self):
+        return self.replay is None
+
+    def wait(self):
+        replay = self.replay
+        if replay is not None:
+            replay.wait()
+
+    def rebuild(self, background=False):
+        """
+        Replay the archived and live history to build the rollups
+        """
+        self.wait()
+        logging.info('Building event statistics from history')
+        self.replay = Replay('event statistics', self.history, new_stats,
+                             add_event, self.replayed, archived=True)
+        if background:
+            self.replay.start()
+        else:
+            self.replay.run()
+
+    def replayed(self, rollups):
+        self.rollups = rollups
+        self.write(self.replay.generation, self.replay.end)
+        self.replay = None
+
+    def add(self, event):
+        replay = self.replay
+        if replay is None or not replay.hold(event):
+            add_event(self.rollups, event)
+
+    def changed(self):
+        """
+        Note the rollups have changed, they're saved in SAVE_INTERVAL
+        """
+        self.dirty = True
+        if self.timer is None:
+            self.timer = Scheduler().call_later(SAVE_INTERVAL, self.save)
+
+    def save(self):
+        if self.timer is not None:
+            Scheduler().cancel(self.timer)
+            self.timer = None
+
+        if not self.ready():
+            # Saved once built
+            return
+
+        try:
+            with self.history.lock:
+                self.history.flush()
+                generation = self.history.generation
+                end = self.history.trimmed_bytes
+                if path.isfile(self.history.file_path):
+                    end += path.getsize(self.history.file_path)
+        except (IOError, OSError) as exc:
+            logging.error('Unable to save event statistics: %s', str(exc))
+            return
+
+        self.write(generation, end)
+
+    def write(self, generation, end):
+        tmp_path = '.'.join([self.file_path, 'tmp'])
+        try:
+            # Rebuilt from the history if lost, no need to fsync
+            with open(tmp_path, 'w') as file_desc:
+                json.dump({'generation': generation,
+                           'end': end,
+                           'rollups': self.rollups}, file_desc)
+
+            move(tmp_path, self.file_path)
+            self.dirty = False
+        except (IOError, OSError) as exc:
+            logging.error('Unable to save event statistics: %s', str(exc))
+            if path.isfile(tmp_path):
+                remove(tmp_path)
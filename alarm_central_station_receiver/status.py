@@ -14,13 +14,20 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import logging
+import time
 
 from json import load, dump
-from os import remove, path, makedirs
+from os import remove, path, makedirs, fsync
 from shutil import move
 
 from alarm_central_station_receiver.singleton import Singleton
 from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.events import Event, to_json
+from alarm_central_station_receiver.stats import EventStats
+from alarm_central_station_receiver.history import EventHistory, Replay, fsync_dir, fsync_file
+from alarm_central_station_receiver.search import SearchIndex
+from alarm_central_station_receiver.scheduler import Scheduler
+from alarm_central_station_receiver.metrics import Metrics
 
 
 def log_event(event):
@@ -28,7 +35,48 @@ def log_event(event):
     if event['type'] in ['AO', 'AC']:
         skip = '- Automatic event, skipping notification'
 
-    logging.info('%s: %s %s', event['type'], event['description'], skip)
+    logging.info('%s: %s %s', event['type'], event['description'], skip,
+                 extra={'event': event, 'trace_id': event['trace_id']})
+
+
+# How state changes are made durable when flushed:
+#   none     - rely on the OS to write the files out
+#   fsync    - fsync on every flush
+#   periodic - fsync at most every fsync_interval_ms
+DURABILITY_MODES = ['none', 'fsync', 'periodic']
+
+
+# Zone state after each report type.  Status reports ('S') leave the
+# zone's state as it was.
+ZONE_STATES = {
+    'A': 'alarm',
+    'T': 'trouble',
+    'MA': 'trouble',
+    'R': 'restored',
+}
+
+
+def update_zone(zones, event):
+    """
+    Record `event` as the latest state of its zone in `zones`
+    """
+    zone = event['zone']
+    if not zone:
+        return
+
+    last = zones.get(zone, {})
+    if event['type'] == 'S':
+        state = last.get('state', 'open')
+    else:
+        state = ZONE_STATES.get(event['type'], 'open')
+
+    zones[zone] = {
+        'state': state,
+        'type': event['type'],
+        'event': event['event'],
+        'description': event['description'],
+        'timestamp': event['timestamp'],
+    }
 
 
 def should_notify(event):
@@ -41,8 +89,7 @@ def should_notify(event):
     these event notifiations can get noisy.
     """
     return event['type'] not in [
-        'AO', 'AC'] or AlarmConfig.config.getboolean(
-        'Main', 'notify_auto_events')
+        'AO', 'AC'] or AlarmConfig.settings.get('Main', 'notify_auto_events')
 
 
 @Singleton
@@ -55,9 +102,9 @@ class AlarmStatus(object):
             'arm_status',
             'arm_status_time',
             'auto_arm',
-            'history',
             'system_status',
-            'active_events']
+            'active_events',
+            'zones']
 
         if attr in attributes:
             self._datastore[attr] = value
@@ -65,19 +112,52 @@ class AlarmStatus(object):
             super(AlarmStatus._klass, self).__setattr__(attr, value)
 
     def __init__(self):
-        datastore_path = AlarmConfig.config.get('Main', 'data_file_path')
+        datastore_path = AlarmConfig.settings.get('Main', 'data_file_path')
         if not path.exists(datastore_path):
             makedirs(datastore_path, mode=0o755)
             logging.info('Created data directory %s', datastore_path)
 
+        self.configure()
+        self.dirty = False
+        self.unsynced_since = None
+
         self.datastore_file = path.join(datastore_path, 'alarmd.db')
+        self.history = EventHistory(path.join(datastore_path,
+                                              'alarmd.history'))
+        self.search = SearchIndex(self.history,
+                                  path.join(datastore_path, 'alarmd.search'))
+        self.stats = EventStats(self.history,
+                                path.join(datastore_path, 'alarmd.stats'))
+        self.zones_replay = None
         if not self.load_data():
             self.arm_status = 'disarmed'
             self.arm_status_time = 0
             self.auto_arm = False
             self.system_status = 'ok'
-            self.history = []
             self.active_events = {}
+            self.zones = {}
+
+        # Earlier versions kept the statistics in the state
+        migrated = self._datastore.pop('stats', None)
+        if migrated is not None:
+            self.mark_dirty()
+
+        self.stats.load(migrated)
+
+        self.active_types = {}
+        for event in self.active_events.values():
+            self.count_active_type(event['type'], 1)
+
+    def configure(self):
+        settings = AlarmConfig.settings
+        self.durability = settings.get('Durability', 'mode', 'none')
+        if self.durability not in DURABILITY_MODES:
+            logging.error('Unknown durability mode %s, using none',
+                          self.durability)
+            self.durability = 'none'
+
+        self.fsync_interval = settings.get('Durability', 'fsync_interval_ms',
+                                           1000) / 1000.0
 
     def load_data(self):
         """
@@ -86,37 +166,175 @@ class AlarmStatus(object):
         """
         try:
             logging.info('Loading config from %s', self.datastore_file)
+            start = time.time()
             with open(self.datastore_file, 'r') as file_desc:
                 self._datastore = load(file_desc)
-                return True
+
+            self.active_events = dict(
+                (code, Event.from_dict(event))
+                for code, event in self.active_events.items())
+
+            history = self._datastore.pop('history', None)
+            if history is not None:
+                self.migrate_history(history)
+
+            if self.zones is None:
+                self.rebuild_zones(background=True)
+
+            logging.info('Loaded alarm state in %.3fs', time.time() - start)
+            return True
         except (IOError, ValueError):
             self._datastore = {}
             return False
 
-    def save_data(self):
+    def mark_dirty(self):
+        """
+        Note the state has changed, it is written on the next `flush()`
+        """
+        self.dirty = True
+
+    def flush(self, sync=False):
+        """
+        Write out the history and state changed since the last flush, in
+        a single write each, and fsync them as the durability mode asks.
+        In periodic mode the first unsynced write schedules a flush with
+        `sync` set for fsync_interval_ms later.
+        """
+        if self.durability == 'periodic' and self.unsynced_since is None \
+                and (self.dirty or self.history.pending or
+                     self.history.unsynced):
+            self.unsynced_since = time.monotonic()
+            Scheduler().call_later(self.fsync_interval, self.flush, True)
+
+        sync = sync or self.durability == 'fsync'
+        catch_up = sync and self.unsynced_since is not None
+
         try:
-            logging.info('Saving config to %s', self.datastore_file)
+            # Syncs anything other threads flushed meanwhile too
+            self.history.flush(sync)
+        except (IOError, OSError) as exc:
+            logging.error('Unable to save alarm history: %s', str(exc))
+
+        if self.dirty:
+            self.save_data(sync)
+        elif catch_up:
+            try:
+                fsync_file(self.datastore_file)
+            except (IOError, OSError) as exc:
+                logging.error('Unable to sync alarm data: %s', str(exc))
+
+        if sync:
+            self.unsynced_since = None
+
+    def close(self):
+        """
+        Write out what's kept in memory, when alarmd exits
+        """
+        self.flush(sync=True)
+        self.stats.save()
+        self.search.close()
+
+    def save_data(self, sync=False):
+        try:
+            logging.debug('Saving config to %s', self.datastore_file)
+            start = time.monotonic()
             tmp_path = '.'.join([self.datastore_file, 'tmp'])
             with open(tmp_path, 'w') as file_desc:
-                dump(self._datastore, file_desc, sort_keys=True, indent=4)
+                dump(self._datastore, file_desc, sort_keys=True, indent=4,
+                     default=to_json)
+                if sync:
+                    file_desc.flush()
+                    fsync(file_desc.fileno())
 
+            Metrics().save_bytes.inc(path.getsize(tmp_path))
             move(tmp_path, self.datastore_file)
+            if sync:
+                fsync_dir(self.datastore_file)
+
+            self.dirty = False
+            Metrics().save_seconds.observe(time.monotonic() - start)
         except (IOError, OSError) as exc:
             logging.error('Unable to save alarm data: %s', str(exc))
             if path.isfile(tmp_path):
                 remove(tmp_path)
 
+    def migrate_history(self, history):
+        """
+        Data files written before the history had its own file, move the
+        history out so that it isn't read on every start.
+        """
+        logging.info('Moving %d history events to %s', len(history),
+                     self.history.file_path)
+        self.history.rewrite(Event.from_dict(event) for event in history)
+        self.save_data(sync=True)
+
+    def rebuild_zones(self, background=False):
+        """
+        Replay the history to build the zone table, for data files written
+        before zones were tracked and after the history is re-decoded.
+        """
+        # Imported here, the decoder is only needed for this one time upgrade
+        from alarm_central_station_receiver.contact_id import decoder, panels
+
+        def replay_zone(zones, event):
+            if not event['zone'] and len(event['id']) >= 15:
+                event['zone'] = decoder.zone_of(
+                    event['id'], panels.panel_for(event['id']))
+
+            update_zone(zones, event)
+
+        self.wait_ready()
+        logging.info('Building zone table from history')
+        if self.zones is None:
+            # Replaced when built, but saved in the meantime
+            self.zones = {}
+
+        self.zones_replay = Replay('zone table', self.history, dict,
+                                   replay_zone, self.zones_replayed)
+        if background:
+            self.zones_replay.start()
+        else:
+            self.zones_replay.run()
+
+    def zones_replayed(self, zones):
+        self.zones = zones
+        # Saved, so the replay isn't repeated on the next start
+        self.mark_dirty()
+        self.zones_replay = None
+
+    def zones_ready(self):
+        return self.zones_replay is None
+
+    def wait_ready(self):
+        """
+        Wait for the zone table and statistics to be built, if they're
+        being built in the background
+        """
+        replay = self.zones_replay
+        if replay is not None:
+            replay.wait()
+
+        self.stats.wait()
+
+    def rebuild_stats(self):
+        """
+        Rebuild the statistics, after the history is re-decoded
+        """
+        self.stats.rebuild()
+
+    def count_active_type(self, report_type, count):
+        self.active_types[report_type] = \
+            self.active_types.get(report_type, 0) + count
+
     def update_system_status(self):
         """
         Updates system status to be either: ok, alarm, or trouble
-        depending on the current outstanding events in the
-        `self.outstanding` list.
+        depending on the count of each type of outstanding event in
+        `self.active_events`.
         """
-        event_types = [item['type']
-                       for item in self.active_events.values()]
-        if 'A' in event_types:
+        if self.active_types.get('A'):
             self.system_status = 'alarm'
-        elif 'MA' in event_types or 'T' in event_types:
+        elif self.active_types.get('MA') or self.active_types.get('T'):
             self.system_status = 'trouble'
         else:
             self.system_status = 'ok'
@@ -161,9 +379,22 @@ class AlarmStatus(object):
 
         if report_type == 'R':
             # Restoral, clear any matching events
-            self.active_events.pop(report_code, None)
+            cleared = self.active_events.pop(report_code, None)
         else:
+            cleared = self.active_events.get(report_code)
             self.active_events[report_code] = event
+            self.count_active_type(report_type, 1)
+
+        if cleared:
+            self.count_active_type(cleared['type'], -1)
+
+    def update_zone(self, event):
+        """
+        Record `event` as the latest state of its zone
+        """
+        replay = self.zones_replay
+        if replay is None or not replay.hold(event):
+            update_zone(self.zones, event)
 
     def add_new_events(self, events):
         if not events:
@@ -178,11 +409,14 @@ class AlarmStatus(object):
             self.history.append(event)
             self.update_arm_status(event)
             self.update_active_events(event)
+            self.update_zone(event)
+            self.stats.add(event)
 
             if should_notify(event):
                 notify_events.append(event)
 
         self.update_system_status()
-        self.save_data()
+        self.mark_dirty()
+        self.stats.changed()
 
         return notify_events
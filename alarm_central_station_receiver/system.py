@@ -14,12 +14,14 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import logging
-import time
+
+from collections import deque
 
 from alarm_central_station_receiver.singleton import Singleton
 from alarm_central_station_receiver.config import AlarmConfig
 from alarm_central_station_receiver.status import AlarmStatus
 from alarm_central_station_receiver.events import create_event
+from alarm_central_station_receiver.scheduler import Scheduler
 
 
 try:
@@ -27,6 +29,50 @@ try:
 except ImportError:
     GPIO = None
 
+# Seconds the keyswitch is held, and then left alone before the next pulse
+PULSE_SECONDS = 2
+PULSE_GAP_SECONDS = 1
+
+# Keyswitch pin used by alarmd --simulate when none is configured
+SIMULATED_PIN = 15
+
+
+class SimulatedGPIO(object):
+    """
+    Stands in for RPi.GPIO when alarmd runs with --simulate, keeping the
+    pin states in memory
+    """
+    BOARD = 'board'
+    OUT = 'out'
+
+    def __init__(self):
+        self.pins = {}
+        self.pulses = 0
+
+    def setwarnings(self, _):
+        pass
+
+    def setmode(self, _):
+        pass
+
+    def setup(self, pin, _):
+        self.pins[pin] = False
+
+    def input(self, pin):
+        return self.pins.get(pin, False)
+
+    def output(self, pin, value):
+        logging.debug('Simulated GPIO pin %s %s', pin,
+                      'high' if value else 'low')
+        self.pins[pin] = bool(value)
+        if value:
+            self.pulses += 1
+
+
+def simulate_gpio():
+    global GPIO
+    GPIO = SimulatedGPIO()
+
 
 @Singleton
 class AlarmSystem(object):
@@ -41,16 +87,38 @@ class AlarmSystem(object):
 
         return True
 
-    def _trip_keyswitch(self):
+    def _trip_keyswitch(self, action):
         """
         This pin is connected to an I/O port on the PC9155 alarm.
         The I/O port is configured in the PC9155 as a 'temporary
         keyswitch'. Toggling this I/O port triggers the alarm
         to arm and disarm.
+
+        The pulse is run by the main loop's scheduler, one at a time.
+        Returns False, queuing nothing, while a pulse for the opposite
+        action is queued or running.
         """
+        if self.pulses and self.pulses[-1] != action:
+            return False
+
+        self.pulses.append(action)
+        if len(self.pulses) == 1:
+            self._start_pulse()
+
+        return True
+
+    def _start_pulse(self):
         GPIO.output(self.pin, not GPIO.input(self.pin))
-        time.sleep(2)
+        Scheduler().call_later(PULSE_SECONDS, self._end_pulse)
+
+    def _end_pulse(self):
         GPIO.output(self.pin, not GPIO.input(self.pin))
+        Scheduler().call_later(PULSE_GAP_SECONDS, self._next_pulse)
+
+    def _next_pulse(self):
+        self.pulses.popleft()
+        if self.pulses:
+            self._start_pulse()
 
     def _initialize_rpi_gpio(self):
         """
@@ -65,9 +133,12 @@ class AlarmSystem(object):
 
     def __init__(self):
         self.alarm = AlarmStatus()
-        self.pin = AlarmConfig.config.getint('RpiArmDisarm',
-                                             'gpio_pin',
-                                             fallback=None)
+        self.arm_timer = None
+        self.pulses = deque()
+        self.pin = AlarmConfig.settings.get('RpiArmDisarm', 'gpio_pin')
+        if self.pin is None and isinstance(GPIO, SimulatedGPIO):
+            self.pin = SIMULATED_PIN
+
         if not self.valid_setup():
             return
 
@@ -82,13 +153,17 @@ class AlarmSystem(object):
             logging.info(status)
             return status
 
+        if not self._trip_keyswitch('arm'):
+            status = 'Keyswitch busy disarming, ignoring arm request'
+            logging.info(status)
+            return status
+
         status = 'Arming system%s...' % (' in auto mode' if auto_arm else '')
         logging.info(status)
 
-        self._trip_keyswitch()
         self.alarm.arm_status = 'arming'
         self.alarm.auto_arm = auto_arm
-        self.alarm.save_data()
+        self.alarm.mark_dirty()
 
         return status
 
@@ -107,9 +182,13 @@ class AlarmSystem(object):
             logging.info(status)
             return status
 
+        if not self._trip_keyswitch('disarm'):
+            status = 'Keyswitch busy arming, ignoring disarm request'
+            logging.info(status)
+            return status
+
         status = 'Disarming system...'
         logging.info(status)
-        self._trip_keyswitch()
 
         # If the system wasn't fully armed, there won't be an event
         # from the alarm indicating arm/disarm
@@ -120,7 +199,7 @@ class AlarmSystem(object):
             self.alarm.arm_status = 'disarming'
             self.alarm.auto_arm = auto_arm
 
-        self.alarm.save_data()
+        self.alarm.mark_dirty()
 
         return status
 
@@ -139,7 +218,7 @@ class AlarmSystem(object):
                          self.alarm.arm_status)
             return []
 
-        self.alarm.save_data()
+        self.alarm.mark_dirty()
 
         events = [create_event('E', event_code, description, event_code)]
         return self.alarm.add_new_events(events)
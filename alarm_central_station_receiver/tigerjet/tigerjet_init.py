@@ -1,23 +1,56 @@
 import glob
+import logging
+import os.path
 import pytjapi
 
 TJ_ID = ''
+TJ_IDS = []
 
 
-def hidraw_path():
-    return '/dev/hidraw%s' % TJ_ID
+def hidraw_path(tj_id=None):
+    """
+    Return the hidraw device of the TigerJet `tj_id`, the one belonging to
+    the same USB device as its hiddev.  The numbers of the two only match
+    while no other HID device is plugged in, keyboards and the like get a
+    hidraw node but no hiddev.
+    """
+    tj_id = TJ_ID if tj_id is None else tj_id
+    usb_path = usb_device_path(tj_id)
+    for node in sorted(glob.glob('/sys/class/hidraw/hidraw*')):
+        # device is the HID device, under the USB interface
+        hid_device = os.path.realpath(os.path.join(node, 'device'))
+        if os.path.dirname(os.path.dirname(hid_device)) == usb_path:
+            return '/dev/%s' % os.path.basename(node)
+
+    logging.warning('No hidraw device found for TigerJet %s, assuming '
+                    'hidraw%s', tj_id, tj_id)
+    return '/dev/hidraw%s' % tj_id
+
+
+def usb_device_path(tj_id):
+    """
+    Return the sysfs path of the USB device the TigerJet `tj_id` HID
+    interface belongs to.  The TigerJet's HID and audio interfaces share
+    this parent device, which is how the two are paired up.
+    """
+    interface = os.path.realpath('/sys/class/usbmisc/hiddev%s/device' % tj_id)
+    return os.path.dirname(interface)
 
 
 def initialize():
     """
-    Initialize the TigerJet 560B USB device for use with the alarm.
+    Initialize every TigerJet 560B USB device for use with the alarm.
     This involves enabling the DTMF HID reports, and lowering the
     DTMF decoder threshold.  For some reason the default threshold
     is unable to detect the DTMF tones sent by the alarm.
 
+    :returns: list of the TigerJet device ids found
     :raises ValueError: if TigerJet not found
     """
-    for file_name in glob.glob('/dev/usb/hiddev*'):
+    global TJ_ID
+    del TJ_IDS[:]
+
+    for file_name in sorted(glob.glob('/dev/usb/hiddev*')):
         with open(file_name, 'rb') as fd:
             if not pytjapi.is_tigerjet(fd.fileno()):
                 continue
@@ -31,8 +64,10 @@ def initialize():
             pytjapi.write(fd.fileno(), 0x35, 0x50)
             pytjapi.write(fd.fileno(), 0x36, 0)
 
-            global TJ_ID
-            TJ_ID = file_name[15:]
-            break
-    else:
+            TJ_IDS.append(file_name[15:])
+
+    if not TJ_IDS:
         raise ValueError('Unable to find TigerJet Device')
+
+    TJ_ID = TJ_IDS[0]
+    return list(TJ_IDS)
@@ -0,0 +1,166 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import math
+import time
+
+from collections import OrderedDict
+
+from alarm_central_station_receiver.singleton import Singleton
+from alarm_central_station_receiver.events import call_trace_id, new_trace_id
+
+# Number of recent alarm calls kept for the phase summaries
+MAX_CALLS = 200
+
+# Slowest recent calls listed in the summary
+SLOWEST_CALLS = 5
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of the already sorted `values`
+    """
+    rank = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[max(0, min(rank, len(values) - 1))]
+
+
+class CallTimer(object):
+    """
+    Monotonic timestamps for each phase of a single alarm call
+    """
+
+    def __init__(self, line_name=None):
+        self.line_name = line_name
+        # The call's trace ID, its events' IDs are derived from it
+        self.call_id = new_trace_id()
+        self.phases = []
+        self.digit_times = []
+
+    def mark(self, phase, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        self.phases.append((phase, timestamp))
+
+    def digit(self):
+        self.digit_times.append(time.monotonic())
+
+    def mark_messages(self, code_str, codes):
+        """
+        Mark a 'message' phase at the time the last digit of each of the
+        `codes` parsed out of `code_str` was received.
+        """
+        pos = 0
+        for code, _ in codes:
+            end = pos + len(code)
+            # parse_alarm_codes may have appended a checksum digit the
+            # TigerJet was unable to detect
+            if code_str[pos:end] != code:
+                end -= 1
+
+            if 0 < end <= len(self.digit_times):
+                self.mark('message', self.digit_times[end - 1])
+
+            pos = end
+
+    def has_phase(self, phase):
+        return any(name == phase for name, _ in self.phases)
+
+    def durations(self):
+        """
+        Returns a list of (phase, seconds since the first phase) tuples
+        """
+        if not self.phases:
+            return []
+
+        start = self.phases[0][1]
+        return [(phase, timestamp - start)
+                for phase, timestamp in sorted(self.phases,
+                                               key=lambda p: p[1])]
+
+
+@Singleton
+class CallTimings(object):
+    """
+    Bounded record of the most recent alarm calls, by call ID: the timings
+    of each phase, the events decoded and the notifications sent for them.
+    """
+
+    def __init__(self):
+        self.calls = OrderedDict()
+
+    def record(self, timer, events):
+        self.calls[timer.call_id] = {
+            'call_id': timer.call_id,
+            'line': timer.line_name,
+            'timestamp': time.time(),
+            'phases': timer.durations(),
+            'events': [event.to_dict() for event in events],
+            'notifications': [],
+        }
+        while len(self.calls) > MAX_CALLS:
+            self.calls.popitem(last=False)
+
+    def add_notifications(self, trace_ids, outcomes, seconds):
+        """
+        Attach notifier `outcomes` to the calls the events traced by
+        `trace_ids` came from, `seconds` after they were queued
+        """
+        for call_id in set(call_trace_id(trace_id) for trace_id in trace_ids):
+            call = self.calls.get(call_id)
+            if call is None:
+                continue
+
+            call['notifications'].extend(
+                {'notifier': notifier,
+                 'outcome': outcome,
+                 'seconds': round(notifier_seconds, 3),
+                 'after_queued': round(seconds, 3)}
+                for notifier, outcome, notifier_seconds in outcomes)
+
+    def trace(self, trace_id):
+        """
+        The recorded call a call or event trace ID belongs to, or None
+        """
+        return self.calls.get(call_trace_id(trace_id))
+
+    def summary(self):
+        samples = {}
+        for call in self.calls.values():
+            for phase, seconds in call['phases']:
+                samples.setdefault(phase, []).append(seconds)
+
+        phases = {}
+        for phase, values in samples.items():
+            values.sort()
+            phases[phase] = {
+                'count': len(values),
+                'p50': round(percentile(values, 50), 3),
+                'p90': round(percentile(values, 90), 3),
+                'p99': round(percentile(values, 99), 3),
+                'max': round(values[-1], 3),
+            }
+
+        # Total time, from the first phase to the last
+        totals = [(call['phases'][-1][1], call)
+                  for call in self.calls.values() if call['phases']]
+        totals.sort(key=lambda total: total[0], reverse=True)
+        slowest = [{'call_id': call['call_id'],
+                    'line': call['line'],
+                    'seconds': round(seconds, 3)}
+                   for seconds, call in totals[:SLOWEST_CALLS]]
+
+        return {'calls': len(self.calls), 'phases': phases,
+                'slowest': slowest}
@@ -14,8 +14,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 import argparse
-from flask import Flask, jsonify, request, abort, make_response
-from alarm_central_station_receiver.json_ipc import send_client_msg
+from flask import Flask, Response, jsonify, request, abort, make_response
+from alarm_central_station_receiver.json_ipc import send_client_msg, send_client_stream
 
 app = Flask(__name__)
 debug_mode = False
@@ -79,6 +79,82 @@ def get_alarm_history():
     return jsonify(history=rsp)
 
 
+@app.route("/api/alarm/history/export", methods=['GET'])
+def export_alarm_history():
+    export_format = request.args.get('format', 'ndjson')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    rsp, chunks, serr = send_client_stream({
+        'command': 'export',
+        'options': {'format': export_format,
+                    'start': float(start) if start else None,
+                    'end': float(end) if end else None}
+    })
+    if serr:
+        abort_json(serr, 500)
+
+    if rsp.get('error'):
+        abort_json(rsp.get('error'), 422)
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(chunks, mimetype=mimetype)
+
+
+@app.route("/api/alarm/search", methods=['GET'])
+def search_alarm_history():
+    offset = int(request.args.get('offset', 0))
+    limit = int(request.args.get('limit', 10))
+    start = request.args.get('start')
+    end = request.args.get('end')
+    if offset < 0:
+        abort_json('offset must be 0 or greater', 422)
+
+    if limit < 1:
+        abort_json('limit must be 1 or greater', 422)
+
+    rsp = send_request({'command': 'search',
+                        'options': {'query': request.args.get('q', ''),
+                                    'start': float(start) if start else None,
+                                    'end': float(end) if end else None,
+                                    'offset': offset,
+                                    'limit': limit}
+                        })
+
+    return jsonify(search=rsp)
+
+
+@app.route("/api/alarm/zones", methods=['GET'])
+def get_alarm_zones():
+    return jsonify(zones=send_request({'command': 'zones'}))
+
+
+@app.route("/api/alarm/stats", methods=['GET'])
+def get_alarm_stats():
+    limit = request.args.get('limit')
+    since = request.args.get('since')
+    rsp = send_request({'command': 'stats',
+                        'options': {
+                            'granularity': request.args.get('granularity',
+                                                            'daily'),
+                            'since': float(since) if since else None,
+                            'limit': int(limit) if limit else None}
+                        })
+
+    return jsonify(stats=rsp)
+
+
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    rsp, chunks, serr = send_client_stream({'command': 'metrics'})
+    if serr:
+        abort_json(serr, 500)
+
+    if rsp.get('error'):
+        abort_json(rsp.get('error'), 422)
+
+    return Response(chunks, mimetype='text/plain; version=0.0.4')
+
+
 @app.before_request
 def before():
     if debug_mode:
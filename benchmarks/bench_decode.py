@@ -0,0 +1,140 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Per-message Contact ID decode cost, comparing the original lookup which
+probes the event table and configuration for every message with the
+compiled decode table.  The original lookup is copied here as it was,
+reading zone names through configparser, so later changes to the live
+code don't move the baseline.
+
+    python benchmarks/bench_decode.py --count 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.contact_id import dsc, panels
+
+from generators import synthetic_codes, write_config
+
+
+def baseline_event_description(event_type, event):
+    _, description = event.get('1')
+    if event_type == '1':
+        event_type_name = 'E'
+    elif event_type == '3':
+        event_type_name = 'R'
+        description += ' Restoral'
+    elif event_type == '6':
+        event_type_name = 'S'
+        description += ' Status'
+    else:
+        event_type_name = 'U'
+        description += 'Unknown Event Type (%s)' % event_type
+
+    return event_type_name, description
+
+
+def baseline_zone_name(sensor_code):
+    zone_name = AlarmConfig.config.get('ZoneMapping',
+                                       sensor_code,
+                                       fallback=None)
+    if not zone_name:
+        zone_name = 'Zone %s' % sensor_code
+
+    return zone_name
+
+
+def baseline_decode(code):
+    """
+    dsc.digits_to_alarmreport before the decode table was compiled
+    """
+    event_type = code[6]
+    event_code = code[7:10]
+    sensor_code = code[12:15]
+
+    event_type_name = 'U'
+    description = 'Unknown Event - %s' % code
+    extra_desc = ''
+
+    event = dsc.EVENTS.get(event_code + sensor_code)
+    if not event:
+        zone_event = dsc.EVENTS.get(event_code + 'ZZZ')
+        user_event = dsc.EVENTS.get(event_code + 'UUU')
+        if zone_event:
+            event = zone_event
+            zone_name = baseline_zone_name(sensor_code)
+            extra_desc = ' %s (%s)' % (zone_name, sensor_code)
+        elif user_event:
+            event = user_event
+            extra_desc = ' User %s' % sensor_code
+
+    if event:
+        if event_type in event:
+            event_type_name, description = event.get(event_type)
+        else:
+            event_type_name, description = \
+                baseline_event_description(event_type, event)
+
+        description += extra_desc
+
+    return event_type_name, event_code + sensor_code, description
+
+
+def bench(decode, codes):
+    start = time.perf_counter()
+    for code in codes:
+        decode(code)
+
+    return (time.perf_counter() - start) / len(codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='bench_decode')
+    parser.add_argument('--count', type=int, default=200000,
+                        help='number of synthetic messages to decode')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'alarmd_config.ini')
+        write_config(config_path)
+        AlarmConfig.load(config_path)
+
+        codes = synthetic_codes(args.count)
+
+        before = bench(baseline_decode, codes)
+
+        start = time.perf_counter()
+        panel = panels.get_panel('dsc')
+        panel.compile()
+        compile_time = time.perf_counter() - start
+        after = bench(panel.digits_to_alarmreport, codes)
+
+    sys.stdout.write('messages:          %d\n' % args.count)
+    sys.stdout.write('table compile:     %.2f ms\n' % (compile_time * 1e3))
+    sys.stdout.write('uncompiled decode: %.0f ns/message\n' % (before * 1e9))
+    sys.stdout.write('compiled decode:   %.0f ns/message\n' % (after * 1e9))
+    sys.stdout.write('speedup:           %.1fx\n' % (before / after))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
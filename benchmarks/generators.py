@@ -0,0 +1,103 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Synthetic, seeded data for the benchmarks, so every run measures the same
+work.
+"""
+import os
+import random
+
+ZONES = 64
+NAMED_ZONES = 32
+
+# One day of events per this many, spread evenly
+EVENTS_PER_DAY = 100
+
+
+def write_config(path, extra=''):
+    with open(path, 'w') as file_desc:
+        file_desc.write('[Main]\n'
+                        'phone_number = 123\n'
+                        'data_file_path = %s\n'
+                        'notify_auto_events = false\n'
+                        '[ZoneMapping]\n' % os.path.dirname(path))
+        for zone in range(1, NAMED_ZONES + 1):
+            file_desc.write('%03d = Zone Name %d\n' % (zone, zone))
+
+        file_desc.write(extra)
+
+
+def checksum(code):
+    """
+    Contact ID checksum digit making the sum of `code` a multiple of 15,
+    a 0 digit counts as 10
+    """
+    total = sum(int(digit, 16) or 10 for digit in code)
+    return '%x' % ((15 - total % 15) or 15)
+
+
+def synthetic_codes(count, seed=0, with_checksum=False):
+    """
+    A mix of zone alarms and restorals, user openings and closings,
+    troubles and periodic tests, like a busy panel would send.
+    """
+    rand = random.Random(seed)
+    codes = []
+    for _ in range(count):
+        kind = rand.random()
+        if kind < 0.4:
+            code = '1234181130%02d%03d' % (rand.randint(1, 8),
+                                           rand.randint(1, ZONES))
+            code = code[:6] + rand.choice('13') + code[7:]
+        elif kind < 0.7:
+            code = '123418%s40101%03d' % (rand.choice('13'),
+                                           rand.randint(1, 40))
+        elif kind < 0.9:
+            code = '123418%s30%d00000' % (rand.choice('13'),
+                                          rand.choice([0, 1, 2]))
+        else:
+            code = '123418160200000'
+
+        codes.append(code + (checksum(code) if with_checksum else '0'))
+
+    return codes
+
+
+def digit_string(count, seed=0):
+    """
+    The digits of a call carrying `count` messages, as collected from the
+    TigerJet
+    """
+    return ''.join(synthetic_codes(count, seed, with_checksum=True))
+
+
+def raw_events(count, seed=0):
+    return [(code, True)
+            for code in synthetic_codes(count, seed, with_checksum=True)]
+
+
+def synthetic_events(count, start, seed=0):
+    """
+    `count` decoded events, oldest first, from time `start`
+    """
+    from alarm_central_station_receiver.contact_id import decoder
+    from alarm_central_station_receiver.events import Event
+
+    step = 24 * 60 * 60.0 / EVENTS_PER_DAY
+    events = decoder.decode(raw_events(min(count, 10000), seed))
+    for index in range(count):
+        event = events[index % len(events)]
+        yield Event(start + index * step, event['type'], event['event'],
+                    event['description'], event['id'], event['zone'])
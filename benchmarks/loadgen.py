@@ -0,0 +1,272 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Load generator for alarmd's control socket and the web UI.  Runs a number
+of concurrent clients sending a weighted mix of requests, optionally
+injecting alarm calls at the same time, and reports throughput, latency
+percentiles and errors per request type.
+
+Start alarmd with --simulate so arm/disarm pulse a simulated keyswitch and
+calls can be injected:
+
+    sudo alarmd --no-fork --simulate
+    sudo python benchmarks/loadgen.py --clients 20 --duration 30 \\
+        --mix status=70,history=25,arm=2,disarm=3 --calls-per-minute 30
+    python benchmarks/loadgen.py --webui http://localhost:5000 ...
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import generators
+
+from alarm_central_station_receiver import json_ipc
+from alarm_central_station_receiver.timing import percentile
+
+COMMANDS = ['status', 'history', 'arm', 'disarm']
+
+# Messages in each injected call
+CALL_MESSAGES = 4
+
+
+def parse_mix(spec):
+    """
+    Parse 'status=70,history=25,...' into a list of (command, weight)
+    """
+    mix = []
+    for part in spec.split(','):
+        command, weight = part.split('=')
+        if command not in COMMANDS:
+            raise argparse.ArgumentTypeError(
+                'Unknown command %s, expected one of %s' %
+                (command, ', '.join(COMMANDS)))
+
+        mix.append((command, float(weight)))
+
+    return mix
+
+
+class Results(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, command, seconds, error=None):
+        with self.lock:
+            if error:
+                errors = self.errors.setdefault(command, {})
+                errors[error] = errors.get(error, 0) + 1
+            else:
+                self.latencies.setdefault(command, []).append(seconds)
+
+    def summary(self, duration):
+        summary = {}
+        for command in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(command, []))
+            errors = self.errors.get(command, {})
+            entry = {
+                'requests': len(latencies),
+                'per_sec': len(latencies) / duration,
+                'errors': sum(errors.values()),
+                'error_types': errors,
+            }
+            if latencies:
+                entry.update({
+                    'p50_ms': percentile(latencies, 50) * 1e3,
+                    'p90_ms': percentile(latencies, 90) * 1e3,
+                    'p99_ms': percentile(latencies, 99) * 1e3,
+                    'max_ms': latencies[-1] * 1e3,
+                })
+
+            summary[command] = entry
+
+        return summary
+
+
+def socket_request(command):
+    request = {'command': command}
+    if command == 'history':
+        request['options'] = {'offset': 0, 'limit': 10}
+
+    rsp, serr = json_ipc.send_client_msg(request)
+    if serr:
+        return 'socket'
+
+    if rsp.get('error'):
+        return 'response'
+
+    return None
+
+
+def webui_request(base_url, command):
+    if command == 'status':
+        request = urllib.request.Request(base_url + '/api/alarm')
+    elif command == 'history':
+        request = urllib.request.Request(
+            base_url + '/api/alarm/history?offset=0&limit=10')
+    else:
+        request = urllib.request.Request(
+            base_url + '/api/alarm', method='PUT',
+            data=json.dumps({'arm_status': command}).encode(),
+            headers={'Content-Type': 'application/json'})
+
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        return 'HTTP %d' % exc.code
+    except (urllib.error.URLError, socket.error):
+        return 'connection'
+
+    return None
+
+
+class Client(threading.Thread):
+    def __init__(self, index, args, deadline, results):
+        super(Client, self).__init__(name='client-%d' % index)
+        self.daemon = True
+        self.rand = random.Random(index)
+        self.args = args
+        self.deadline = deadline
+        self.results = results
+        self.commands = [command for command, _ in args.mix]
+        self.weights = [weight for _, weight in args.mix]
+
+    def request(self, command):
+        if self.args.webui:
+            return webui_request(self.args.webui, command)
+
+        return socket_request(command)
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            command = self.rand.choices(self.commands, self.weights)[0]
+            start = time.perf_counter()
+            error = self.request(command)
+            self.results.record(command, time.perf_counter() - start, error)
+            if self.args.think_ms:
+                time.sleep(self.rand.expovariate(1000.0 / self.args.think_ms))
+
+
+class CallInjector(threading.Thread):
+    """
+    Injects synthetic alarm calls into alarmd --simulate at a steady rate
+    """
+
+    def __init__(self, calls_per_minute, deadline, results):
+        super(CallInjector, self).__init__(name='injector')
+        self.daemon = True
+        self.interval = 60.0 / calls_per_minute
+        self.deadline = deadline
+        self.results = results
+
+    def run(self):
+        seed = 0
+        next_call = time.monotonic()
+        while next_call < self.deadline:
+            time.sleep(max(next_call - time.monotonic(), 0))
+            digits = generators.digit_string(CALL_MESSAGES, seed)
+            start = time.perf_counter()
+            rsp, serr = json_ipc.send_client_msg(
+                {'command': 'inject', 'options': {'digits': digits}})
+            error = None
+            if serr:
+                error = 'socket'
+            elif rsp.get('error'):
+                error = 'response'
+
+            self.results.record('inject', time.perf_counter() - start,
+                                error)
+            seed += 1
+            next_call += self.interval
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='loadgen')
+    parser.add_argument('--clients', type=int, default=10,
+                        help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='seconds to run for')
+    parser.add_argument('--mix', type=parse_mix,
+                        default=parse_mix('status=70,history=25,arm=2,'
+                                          'disarm=3'),
+                        help='weighted request mix, default '
+                             'status=70,history=25,arm=2,disarm=3')
+    parser.add_argument('--think-ms', type=float, default=0,
+                        help='mean pause between a client\'s requests')
+    parser.add_argument('--calls-per-minute', type=float, default=0,
+                        help='alarm calls to inject meanwhile, needs alarmd '
+                             '--simulate')
+    parser.add_argument('--socket', default=json_ipc.SOCKFILE,
+                        help='alarmd control socket')
+    parser.add_argument('--webui',
+                        help='web UI base URL, e.g. http://localhost:5000, '
+                             'to load it rather than the control socket')
+    parser.add_argument('--output',
+                        help='file to write the results to as JSON')
+    args = parser.parse_args()
+
+    json_ipc.SOCKFILE = args.socket
+    results = Results()
+    deadline = time.monotonic() + args.duration
+    threads = [Client(index, args, deadline, results)
+               for index in range(args.clients)]
+    if args.calls_per_minute:
+        threads.append(CallInjector(args.calls_per_minute, deadline,
+                                    results))
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    duration = time.monotonic() - start
+    summary = results.summary(duration)
+
+    sys.stdout.write('%-8s %9s %9s %9s %9s %9s %9s %7s\n' %
+                     ('request', 'count', 'per sec', 'p50 ms', 'p90 ms',
+                      'p99 ms', 'max ms', 'errors'))
+    for command, entry in sorted(summary.items()):
+        sys.stdout.write('%-8s %9d %9.1f %9.2f %9.2f %9.2f %9.2f %7d\n' % (
+            command, entry['requests'], entry['per_sec'],
+            entry.get('p50_ms', 0), entry.get('p90_ms', 0),
+            entry.get('p99_ms', 0), entry.get('max_ms', 0),
+            entry['errors']))
+
+    if args.output:
+        with open(args.output, 'w') as file_desc:
+            json.dump({'timestamp': time.time(),
+                       'duration': duration,
+                       'args': dict(vars(args), mix=args.mix),
+                       'results': summary},
+                      file_desc, sort_keys=True, indent=4)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
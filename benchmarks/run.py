@@ -0,0 +1,350 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Benchmark suite: Contact ID parsing and decoding, alarm state updates and
+saves over histories of several sizes, IPC round trips and history
+pagination.  Results are written as JSON, and compared against an earlier
+run's to catch regressions.
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --compare before.json --sizes 10000,1000000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import generators
+
+from alarm_central_station_receiver import json_ipc, stats
+from alarm_central_station_receiver.config import AlarmConfig
+from alarm_central_station_receiver.contact_id import callup, decoder
+
+# Fail a comparison when a benchmark's median is this much slower
+THRESHOLD = 0.25
+
+# Events per call in the state update benchmark, a typical alarm call
+CALL_EVENTS = 4
+
+
+def measure(func, repeat, number=1):
+    """
+    Time `repeat` samples of `number` calls of `func`
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+
+        samples.append(time.perf_counter() - start)
+
+    return samples
+
+
+def result(samples, ops, unit):
+    """
+    Summarize timing `samples` of `ops` operations each
+    """
+    median = statistics.median(samples)
+    return {
+        'unit': unit,
+        'ops': ops,
+        'samples': len(samples),
+        'min': min(samples) / ops,
+        'median': median / ops,
+        'ops_per_sec': ops / median if median else None,
+    }
+
+
+def bench_parse(args):
+    digits = generators.digit_string(args.call_messages)
+    samples = measure(lambda: callup.parse_alarm_codes(digits), args.repeat)
+    return {'parse_alarm_codes': result(samples, args.call_messages,
+                                        'message')}
+
+
+def bench_decode(args):
+    raw_events = generators.raw_events(args.batch)
+    decoder.decode(raw_events[:1])
+    samples = measure(lambda: decoder.decode(raw_events), args.repeat)
+    return {'decode': result(samples, args.batch, 'message')}
+
+
+def bench_ipc(args):
+    response = {'error': False,
+                'response': list(generators.synthetic_events(10, time.time()))}
+    server, client = socket.socketpair()
+
+    def round_trip():
+        json_ipc.send(client, {'command': 'history',
+                               'options': {'offset': 0, 'limit': 10}})
+        json_ipc.recv(server)
+        json_ipc.send(server, response)
+        json_ipc.recv(client)
+
+    try:
+        samples = measure(round_trip, args.repeat, args.round_trips)
+    finally:
+        server.close()
+        client.close()
+
+    return {'ipc_round_trip': result(samples, args.round_trips,
+                                     'round trip')}
+
+
+class HistoryServer(threading.Thread):
+    """
+    Answers history requests on the control socket the way alarmd does
+    """
+
+    def __init__(self, history):
+        super(HistoryServer, self).__init__(name='history-server')
+        self.daemon = True
+        self.history = history
+        self.ready = threading.Event()
+
+    def run(self):
+        with json_ipc.ServerSock() as sockfd:
+            self.ready.set()
+            while True:
+                conn, _ = sockfd.accept()
+                options = json_ipc.recv(conn)['options']
+                json_ipc.send(conn, {
+                    'error': False,
+                    'response': self.history.latest(options['offset'],
+                                                    options['limit'])
+                })
+                conn.close()
+
+
+def history_pages(size, pages):
+    step = max(size // pages, 1)
+    return [offset for offset in range(0, size, step)][:pages]
+
+
+def bench_pagination(args, alarm, size):
+    server = HistoryServer(alarm.history)
+    server.start()
+    server.ready.wait()
+    offsets = history_pages(size, args.pages)
+
+    try:
+        from alarm_central_station_receiver import webui
+        client = webui.app.test_client()
+
+        def page(offset):
+            client.get('/api/alarm/history?offset=%d&limit=10' % offset)
+        via = 'webui'
+    except ImportError:
+        # Without flask, from the client call the web UI makes
+        def page(offset):
+            json_ipc.send_client_msg({'command': 'history',
+                                      'options': {'offset': offset,
+                                                  'limit': 10}})
+        via = 'ipc'
+
+    def pages():
+        for offset in offsets:
+            page(offset)
+
+    samples = measure(pages, args.repeat)
+    rsp = result(samples, len(offsets), 'page')
+    rsp['via'] = via
+    return rsp
+
+
+def build_history(alarm, size):
+    """
+    Replace the history with `size` synthetic events, up to now
+    """
+    step = 24 * 60 * 60.0 / generators.EVENTS_PER_DAY
+    alarm.wait_ready()
+    alarm.zones = {}
+    alarm.stats.rollups = stats.new_stats()
+
+    def replayed(events):
+        for event in events:
+            alarm.update_zone(event)
+            alarm.stats.add(event)
+            yield event
+
+    alarm.history.rewrite(replayed(generators.synthetic_events(
+        size, time.time() - size * step)))
+    alarm.mark_dirty()
+    alarm.flush()
+    alarm.stats.save()
+
+
+def bench_state(args, tmp_dir, size):
+    from alarm_central_station_receiver.status import AlarmStatus
+
+    data_dir = os.path.join(tmp_dir, str(size))
+    os.makedirs(data_dir)
+    config_path = os.path.join(data_dir, 'alarmd_config.ini')
+    generators.write_config(config_path,
+                            '[Durability]\nmode = %s\n' % args.durability)
+    AlarmConfig.load(config_path)
+    json_ipc.SOCKFILE = os.path.join(data_dir, 'alarm_socket')
+
+    AlarmStatus._instance = None
+    start = time.perf_counter()
+    build_history(AlarmStatus(), size)
+    build_time = time.perf_counter() - start
+
+    def load():
+        AlarmStatus._instance = None
+        return AlarmStatus()
+
+    load_samples = measure(load, 3)
+    alarm = AlarmStatus()
+
+    calls = [generators.raw_events(CALL_EVENTS, seed)
+             for seed in range(args.calls)]
+    call_iter = iter(calls * args.repeat)
+
+    def add_and_save():
+        alarm.add_new_events(decoder.decode(next(call_iter)))
+        alarm.flush()
+
+    results = {
+        'build_history[%d]' % size: result([build_time], size, 'event'),
+        'load_state[%d]' % size: result(load_samples, 1, 'load'),
+        'add_events_flush[%d]' % size: result(
+            measure(add_and_save, args.repeat, args.calls), args.calls,
+            'call'),
+        'history_page[%d]' % size: bench_pagination(args, alarm, size),
+    }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Print each benchmark's change from the baseline, returns the names of
+    any slower than `threshold`
+    """
+    with open(baseline_path) as file_desc:
+        baseline = json.load(file_desc)['results']
+
+    regressions = []
+    sys.stdout.write('\n%-32s %12s %12s %8s\n' %
+                     ('benchmark', 'baseline', 'current', 'change'))
+    for name, current in sorted(results.items()):
+        before = baseline.get(name)
+        if not before or not before['median']:
+            continue
+
+        change = current['median'] / before['median'] - 1
+        if change > threshold:
+            regressions.append(name)
+
+        sys.stdout.write('%-32s %10.2fus %10.2fus %+7.0f%%%s\n' %
+                         (name, before['median'] * 1e6,
+                          current['median'] * 1e6, change * 100,
+                          ' !' if change > threshold else ''))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='run')
+    parser.add_argument('--sizes', default='10000,100000',
+                        help='comma separated history sizes for the state '
+                             'benchmarks, e.g. 10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timed samples per benchmark')
+    parser.add_argument('--call-messages', type=int, default=5000,
+                        help='messages in the parsed digit string')
+    parser.add_argument('--batch', type=int, default=10000,
+                        help='messages per decode batch')
+    parser.add_argument('--round-trips', type=int, default=1000,
+                        help='IPC round trips per sample')
+    parser.add_argument('--calls', type=int, default=50,
+                        help='alarm calls added and saved per sample')
+    parser.add_argument('--pages', type=int, default=50,
+                        help='history pages fetched per sample')
+    parser.add_argument('--durability', default='none',
+                        choices=['none', 'fsync', 'periodic'],
+                        help='durability mode of the state benchmarks')
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help='file to write the results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='results of an earlier run to compare against, '
+                             'exits 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown counted as a regression, default '
+                             '%.2f' % THRESHOLD)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'alarmd_config.ini')
+        generators.write_config(config_path)
+        AlarmConfig.load(config_path)
+
+        for bench in [bench_parse, bench_decode, bench_ipc]:
+            results.update(bench(args))
+
+        for size in [int(size) for size in args.sizes.split(',')]:
+            results.update(bench_state(args, tmp_dir, size))
+
+    for name, bench_result in sorted(results.items()):
+        sys.stdout.write('%-32s %12.2f us/%s\n' % (
+            name, bench_result['median'] * 1e6, bench_result['unit']))
+
+    report = {
+        'timestamp': time.time(),
+        'revision': git_revision(),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'args': vars(args),
+        'results': results,
+    }
+    with open(args.output, 'w') as file_desc:
+        json.dump(report, file_desc, sort_keys=True, indent=4)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            sys.stdout.write('Regressions: %s\n' % ', '.join(regressions))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,6 +27,8 @@ setup(
         'console_scripts': [
             'alarmd=alarm_central_station_receiver.main:main',
             'alarm-ctl=alarm_central_station_receiver.alarm_ctl:main',
+            'alarmd-decode=alarm_central_station_receiver.decode_ctl:main',
+            'alarmd-import=alarm_central_station_receiver.import_ctl:main',
             'alarmd-webui=alarm_central_station_receiver.webui:main'
         ]
     },
@@ -0,0 +1,36 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import configparser
+
+from alarm_central_station_receiver.config import AlarmConfig, Settings
+
+
+def use_settings(text=''):
+    """
+    Make the config file contents `text` the current settings
+    """
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    AlarmConfig.config = config
+    AlarmConfig.settings = Settings(config)
+
+
+def checksum(code):
+    """
+    Append the Contact ID checksum digit to the 15 digit `code`
+    """
+    total = sum(int(digit, 16) or 10 for digit in code)
+    return code + '%x' % ((15 - total % 15) or 15)
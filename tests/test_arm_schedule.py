@@ -0,0 +1,114 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import os
+import time
+import unittest
+
+from datetime import datetime, time as day_time
+from itertools import islice
+
+from helpers import use_settings
+
+from alarm_central_station_receiver.arm_schedule import ArmSchedule, parse_days, parse_rule
+
+
+def local(*fields):
+    return time.mktime(datetime(*fields).timetuple())
+
+
+class ParseTest(unittest.TestCase):
+    def test_days(self):
+        self.assertEqual(parse_days('mon'), {0})
+        self.assertEqual(parse_days('mon-fri'), {0, 1, 2, 3, 4})
+        self.assertEqual(parse_days('Sat, sun'), {5, 6})
+
+    def test_wraparound(self):
+        self.assertEqual(parse_days('sun-thu'), {6, 0, 1, 2, 3})
+        self.assertEqual(parse_days('fri-mon'), {4, 5, 6, 0})
+
+    def test_groups(self):
+        self.assertEqual(parse_days('daily'), set(range(7)))
+        self.assertEqual(parse_days('weekdays'), {0, 1, 2, 3, 4})
+        self.assertEqual(parse_days('weekends,wed'), {2, 5, 6})
+
+    def test_invalid_day(self):
+        self.assertRaises(ValueError, parse_days, 'someday')
+
+    def test_rule(self):
+        self.assertEqual(parse_rule('night', 'Arm weekdays 22:30'),
+                         (day_time(22, 30), 'night', 'arm',
+                          {0, 1, 2, 3, 4}))
+
+    def test_invalid_rules(self):
+        for value in ['arm weekdays', 'open daily 07:00',
+                      'disarm daily 25:00', 'arm daily 07:00 extra']:
+            self.assertRaises(ValueError, parse_rule, 'rule', value)
+
+
+class EntriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'America/New_York'
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = self.tz
+
+        time.tzset()
+
+    def schedule(self, text):
+        use_settings('[Schedule]\n' + text)
+        ArmSchedule._instance = None
+        return ArmSchedule()
+
+    def test_order(self):
+        schedule = self.schedule('morning = disarm weekdays 07:00\n'
+                                 'night = arm daily 22:30\n')
+        # Friday June 1st 2018, noon
+        entries = list(islice(schedule.entries(local(2018, 6, 1, 12)), 4))
+        self.assertEqual(
+            [(entry['time'], entry['action'], entry['rule'])
+             for entry in entries],
+            [(local(2018, 6, 1, 22, 30), 'arm', 'night'),
+             (local(2018, 6, 2, 22, 30), 'arm', 'night'),
+             (local(2018, 6, 3, 22, 30), 'arm', 'night'),
+             (local(2018, 6, 4, 7), 'disarm', 'morning')])
+
+    def test_holidays(self):
+        schedule = self.schedule('morning = disarm weekdays 07:00\n'
+                                 'holidays = 2018-06-04, 2018-06-05\n')
+        entry = next(schedule.entries(local(2018, 6, 1, 12)))
+        self.assertEqual(entry['time'], local(2018, 6, 6, 7))
+
+    def test_invalid_holiday_ignored(self):
+        schedule = self.schedule('morning = disarm weekdays 07:00\n'
+                                 'holidays = 2018-06-04, June 5th\n')
+        self.assertEqual(schedule.holidays, {datetime(2018, 6, 4).date()})
+
+    def test_dst_day(self):
+        # Clocks go forward at 2am on Sunday March 11th 2018
+        schedule = self.schedule('night = arm daily 22:00\n')
+        entries = list(islice(schedule.entries(local(2018, 3, 10, 12)), 2))
+        first, second = [entry['time'] for entry in entries]
+        self.assertEqual(second - first, 23 * 60 * 60)
+        self.assertEqual(time.localtime(second)[:5], (2018, 3, 11, 22, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
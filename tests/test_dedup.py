@@ -0,0 +1,63 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+from helpers import checksum, use_settings
+
+from alarm_central_station_receiver.dedup import DuplicateFilter
+
+ALARM = checksum('123418113001003')
+RESTORAL = checksum('123418313001003')
+OTHER_ZONE = checksum('123418113001004')
+
+
+class DuplicateFilterTest(unittest.TestCase):
+    def setUp(self):
+        use_settings()
+        DuplicateFilter._instance = None
+        self.dedup = DuplicateFilter()
+
+    def codes(self, *codes):
+        return [code for code, _ in
+                self.dedup.filter([(code, True) for code in codes])]
+
+    def test_retransmission_suppressed(self):
+        self.assertEqual(self.codes(ALARM, OTHER_ZONE), [ALARM, OTHER_ZONE])
+        self.assertEqual(self.codes(ALARM, OTHER_ZONE), [])
+        self.assertEqual(self.dedup.suppressed, 2)
+
+    def test_realarm_after_restoral(self):
+        self.assertEqual(self.codes(ALARM), [ALARM])
+        self.assertEqual(self.codes(RESTORAL), [RESTORAL])
+        self.assertEqual(self.codes(ALARM), [ALARM])
+        self.assertEqual(self.dedup.suppressed, 0)
+
+    def test_realarm_in_one_call(self):
+        self.assertEqual(self.codes(ALARM, RESTORAL, ALARM, ALARM),
+                         [ALARM, RESTORAL, ALARM])
+
+    def test_restoral_keeps_other_zones(self):
+        self.codes(ALARM, OTHER_ZONE, RESTORAL)
+        self.assertEqual(self.codes(OTHER_ZONE), [])
+
+    def test_invalid_checksum_passed_on(self):
+        self.dedup.filter([(ALARM, True)])
+        self.assertEqual(self.dedup.filter([(ALARM, False)]),
+                         [(ALARM, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import shutil
+import tempfile
+import unittest
+
+from os import path
+
+from alarm_central_station_receiver.events import Event
+from alarm_central_station_receiver.history import EventHistory
+from alarm_central_station_receiver.search import SearchIndex
+
+
+def event(timestamp, zone='001'):
+    return Event(float(timestamp), 'A', '130' + zone, 'Burglary',
+                 '1234181130' + zone, zone)
+
+
+def older_than(timestamp):
+    return lambda events: bytearray(event['timestamp'] < timestamp
+                                    for event in events)
+
+
+class CompactTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.history = self.open_history()
+        for timestamp in range(10):
+            self.history.append(event(timestamp, '%03d' % (timestamp % 2)))
+
+        self.history.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def open_history(self):
+        return EventHistory(path.join(self.data_dir, 'alarmd.history'))
+
+    def timestamps(self, events):
+        return [event['timestamp'] for event in events]
+
+    def test_trim_keeps_generation(self):
+        self.assertEqual(len(self.history), 10)
+        self.assertEqual(self.history.compact(older_than(4)), 4)
+        self.assertEqual(self.history.generation, 0)
+        self.assertEqual(self.history.trimmed, 4)
+        self.assertEqual(self.timestamps(self.history.latest(5, 2)),
+                         [4.0, 3.0])
+
+        reopened = self.open_history()
+        self.assertEqual((reopened.generation, reopened.trimmed,
+                          reopened.trimmed_bytes),
+                         (0, 4, self.history.trimmed_bytes))
+
+    def test_archive_between_bumps_generation(self):
+        self.history.compact(lambda events: bytearray(
+            event['timestamp'] == 5 for event in events))
+        self.assertEqual(self.history.generation, 1)
+        self.assertEqual(self.history.trimmed, 0)
+
+    def test_search_after_trim(self):
+        search = SearchIndex(self.history,
+                             path.join(self.data_dir, 'alarmd.search'))
+        self.assertEqual(search.search('zone:1')[0], 5)
+
+        self.history.compact(older_than(4))
+        self.history.append(event(10, '001'))
+        total, events = search.search('zone:1')
+        self.assertEqual(total, 4)
+        self.assertEqual(self.timestamps(events), [10.0, 9.0, 7.0, 5.0])
+        self.assertEqual(search.first, 4)
+
+    def test_latest_archived(self):
+        self.history.compact(older_than(4))
+        self.assertEqual(self.timestamps(self.history.latest(6, 10)),
+                         [3.0, 2.0, 1.0, 0.0])
+        self.assertEqual(self.timestamps(self.history.latest(7, 2)),
+                         [2.0, 1.0])
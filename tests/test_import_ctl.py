@@ -0,0 +1,96 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+from collections import Counter
+
+from alarm_central_station_receiver.events import Event
+from alarm_central_station_receiver.import_ctl import EVENT_LINE, event_key, new_events
+
+PREFIX = 'Jun 01 18 01:02:03 PM alarmd[123]: [status.INFO] '
+
+
+def event(timestamp, description='Zone Alarm Door (001)'):
+    return Event(timestamp, 'A', '', description, '', '001')
+
+
+class EventLineTest(unittest.TestCase):
+    def test_event(self):
+        match = EVENT_LINE.match(PREFIX + 'A: Zone Alarm Door (001) ')
+        self.assertEqual(match.group('date'), 'Jun 01 18')
+        self.assertEqual((match.group('hour'), match.group('minute'),
+                          match.group('second'), match.group('ampm')),
+                         ('01', '02', '03', 'PM'))
+        self.assertEqual(match.group('type'), 'A')
+        self.assertEqual(match.group('description'), 'Zone Alarm Door (001)')
+
+    def test_automatic_event(self):
+        match = EVENT_LINE.match(
+            PREFIX + 'AC: Automatic System Armed User 001 - Automatic '
+            'event, skipping notification')
+        self.assertEqual(match.group('type'), 'AC')
+        self.assertEqual(match.group('description'),
+                         'Automatic System Armed User 001')
+
+    def test_other_lines(self):
+        for message in ['New Events', 'No new events found!',
+                        'Loaded alarm state in 0.001s']:
+            self.assertIsNone(EVENT_LINE.match(PREFIX + message))
+
+        self.assertIsNone(EVENT_LINE.match(
+            'Jun 01 18 01:02:03 PM alarmd[123]: [notify.INFO] A: Zone'))
+
+
+class DuplicateTest(unittest.TestCase):
+    def imported(self, history, events):
+        present = Counter(event_key(past) for past in history)
+        counts = Counter()
+        return list(new_events(events, present, counts)), counts
+
+    def test_same_second(self):
+        imported, counts = self.imported([event(100.2)], [event(100)])
+        self.assertEqual(imported, [])
+        self.assertEqual(counts['duplicate'], 1)
+
+    def test_logged_next_second(self):
+        imported, counts = self.imported([event(100.9)], [event(101)])
+        self.assertEqual(imported, [])
+        self.assertEqual(counts['duplicate'], 1)
+
+    def test_second_before(self):
+        imported, _ = self.imported([event(101.1)], [event(100)])
+        self.assertEqual(imported, [])
+
+    def test_seconds_apart(self):
+        new = event(102)
+        imported, counts = self.imported([event(100)], [new])
+        self.assertEqual(imported, [new])
+        self.assertEqual(counts['imported'], 1)
+
+    def test_each_matched_once(self):
+        repeated = [event(100), event(101)]
+        imported, counts = self.imported([event(100.5)], repeated)
+        self.assertEqual(imported, [repeated[1]])
+        self.assertEqual(counts['duplicate'], 1)
+
+    def test_different_description(self):
+        new = event(100, 'Zone Alarm Window (002)')
+        imported, _ = self.imported([event(100)], [new])
+        self.assertEqual(imported, [new])
+
+
+if __name__ == '__main__':
+    unittest.main()
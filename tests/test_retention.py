@@ -0,0 +1,81 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+from helpers import use_settings
+
+from alarm_central_station_receiver.events import Event
+from alarm_central_station_receiver.retention import DAY, RetentionPolicy
+
+NOW = 1000 * DAY
+
+
+def event(days_ago, rtype='O', code='401001'):
+    return Event(NOW - days_ago * DAY, rtype, code, 'Event', '')
+
+
+class SelectTest(unittest.TestCase):
+    def policy(self, text=''):
+        use_settings('[Retention]\n' + text)
+        return RetentionPolicy()
+
+    def select(self, policy, events):
+        return list(policy.select(events, NOW))
+
+    def test_disabled(self):
+        policy = self.policy()
+        self.assertFalse(policy.enabled())
+        self.assertEqual(self.select(policy, [event(1000), event(1)]),
+                         [False, False])
+
+    def test_max_age(self):
+        policy = self.policy('max_age_days = 30\n')
+        self.assertEqual(self.select(policy, [event(31), event(30),
+                                              event(1)]),
+                         [True, False, False])
+
+    def test_keep_alarms(self):
+        events = [event(100, 'A', '130001'), event(100)]
+        self.assertEqual(self.select(self.policy('max_age_days = 30\n'),
+                                     events),
+                         [False, True])
+        self.assertEqual(self.select(self.policy('max_age_days = 30\n'
+                                                 'keep_alarms = false\n'),
+                                     events),
+                         [True, True])
+
+    def test_test_max_age(self):
+        policy = self.policy('test_max_age_days = 7\n')
+        events = [event(8, 'S', '602000'), event(8), event(6, 'S', '602000')]
+        self.assertEqual(self.select(policy, events), [True, False, False])
+
+    def test_max_events(self):
+        policy = self.policy('max_events = 2\n')
+        events = [event(5), event(4, 'A', '130001'), event(3), event(2),
+                  event(1)]
+        # Alarms are kept, and not counted
+        self.assertEqual(self.select(policy, events),
+                         [True, False, True, False, False])
+
+    def test_max_events_with_age(self):
+        policy = self.policy('max_age_days = 30\nmax_events = 2\n')
+        events = [event(40), event(3), event(2), event(1)]
+        self.assertEqual(self.select(policy, events),
+                         [True, True, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
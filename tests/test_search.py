@@ -0,0 +1,56 @@
+"""
+Copyright (2018) Chris Scuderi
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+import unittest
+
+from alarm_central_station_receiver.events import Event
+from alarm_central_station_receiver.search import event_terms, query_terms
+
+
+class QueryTermsTest(unittest.TestCase):
+    def test_words(self):
+        self.assertEqual(query_terms('Front  DOOR'), ['front', 'door'])
+
+    def test_punctuation(self):
+        self.assertEqual(query_terms('door(001), alarm!'),
+                         ['door', '001', 'alarm'])
+
+    def test_fields(self):
+        self.assertEqual(query_terms('type:A event:130'),
+                         ['type:a', 'event:130'])
+
+    def test_numbers_padded(self):
+        self.assertEqual(query_terms('zone:5 user:12 zone:005'),
+                         ['zone:005', 'user:012', 'zone:005'])
+
+    def test_unknown_field(self):
+        self.assertEqual(query_terms('line:main'), ['line', 'main'])
+
+    def test_empty_value(self):
+        self.assertEqual(query_terms('zone:'), ['zone'])
+
+    def test_empty(self):
+        self.assertEqual(query_terms(''), [])
+
+    def test_finds_event_terms(self):
+        event = Event(0, 'A', '130005', 'Zone Alarm Front Door (005)',
+                      '123418113001005c', '005')
+        terms = event_terms(event)
+        for term in query_terms('front door zone:5 event:130 type:a'):
+            self.assertIn(term, terms)
+
+
+if __name__ == '__main__':
+    unittest.main()